@@ -1,34 +1,166 @@
-from flask import Flask, request, jsonify
+import logging
+import os
+import threading
+import weakref
+from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+from config import config
+from models import db, init_db, Session
+from models.engine import is_memory_sqlite_url
+from routes import register_routes
+from services import (FlashcardService, HealthMonitor, IdempotencyService, ImportService, SessionFilterSync,
+                      SessionReaper, SessionService, SessionTokenService, StudyRollup)
+from utils import (ContentValidator, FastJSONProvider, QueryProfiler, RateLimiter, RequestMetrics,
+                   ResponseCompressor, create_cache_backend)
 
-app = Flask(__name__)
-CORS(app)  # This allows your frontend to make requests to this server
+logger = logging.getLogger(__name__)
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """A simple health check endpoint."""
-    return jsonify({'status': 'ok', 'message': 'Backend is running!'})
+def _dispose_engine_after_fork(app):
+    """Drop pooled connections inherited from the parent; the child opens its own."""
+    if is_memory_sqlite_url(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    with app.app_context():
+        # close=False leaves the parent's sockets alone instead of closing them under it
+        db.engine.dispose(close=False)
 
-@app.route('/api/process-notes', methods=['POST'])
-def process_notes():
-    """Processes notes and returns flashcards."""
-    data = request.json
-    notes = data.get('notes', '')
+# Apps whose inherited connections are dropped in forked children; held weakly
+# so processes that build many apps (tests, benchmarks) do not keep them alive
+_fork_safe_apps = weakref.WeakSet()
 
-    if len(notes) < 50:
-        return jsonify({'error': 'Notes must be at least 50 characters long'}), 400
+def _dispose_engines_after_fork():
+    for app in list(_fork_safe_apps):
+        _dispose_engine_after_fork(app)
 
-    # This is a mock flashcard generation. In a real app, this would
-    # be replaced by a call to an AI service like Hugging Face.
-    flashcards = []
-    # Create simple questions and answers from the notes
-    lines = notes.strip().split('\n')
-    for i, line in enumerate(lines[:5]): # Limit to 5 flashcards
-        question = f"Question {i+1}: What is the main point of this note: '{line.strip()[:30]}...'?"
-        answer = f"Answer {i+1}: The note discusses '{line.strip()}'."
-        flashcards.append({"question": question, "answer": answer})
+# Registered once per process; create_app only adds its app to the set
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_engines_after_fork)
 
-    return jsonify({"flashcards": flashcards})
+def _start_workers_once(app):
+    """Start background workers on the first request served by this process.
+
+    With a preloading server the app is created in the master before
+    fork; threads started there would not survive into the workers, so
+    they are started lazily (once per pid) instead.
+    """
+    lock = threading.Lock()
+    started_pid = [None]
+
+    @app.before_request
+    def start_background_workers():
+        if started_pid[0] == os.getpid():
+            return
+        with lock:
+            if started_pid[0] == os.getpid():
+                return
+            for worker in app.extensions['background_workers']:
+                worker.start()
+            started_pid[0] = os.getpid()
+
+def create_app(config_name=None):
+    """Application factory.
+
+    Everything that is expensive and read-only (imports, compiled regexes,
+    serializers, the session id filter) is built here so a preloading
+    server shares it copy-on-write across workers. Per-process state is
+    created after fork: database connections are dropped in the child and
+    background threads start on the first request.
+    """
+    config_name = config_name or os.environ.get('FLASK_CONFIG', 'default')
+
+    app = Flask(__name__)
+    app.config.from_object(config[config_name])
+    if app.config['TRUSTED_PROXY_COUNT'] > 0:
+        # request.remote_addr becomes the client address the proxies report
+        proxies = app.config['TRUSTED_PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+    app.json = FastJSONProvider(app)
+    # Registered first so its timing wraps every other hook (after_request runs in reverse)
+    RequestMetrics(app)
+    CORS(app)  # This allows your frontend to make requests to this server
+    ResponseCompressor(app)
+    rate_limiter = RateLimiter(app)
+
+    init_db(app)
+    QueryProfiler(app)
+    with app.app_context():
+        db.create_all()
+        Session.configure_validation_cache(
+            max_entries=app.config['SESSION_CACHE_SIZE'],
+            ttl=app.config['SESSION_CACHE_TTL_SECONDS'],
+            activity_update_interval=app.config['SESSION_ACTIVITY_UPDATE_SECONDS']
+        )
+        if app.config['SESSION_FILTER_ENABLED']:
+            Session.build_id_filter(
+                capacity=app.config['SESSION_FILTER_CAPACITY'],
+                error_rate=app.config['SESSION_FILTER_ERROR_RATE']
+            )
+        # Connections opened during start-up must not be shared with forked workers
+        if not is_memory_sqlite_url(app.config['SQLALCHEMY_DATABASE_URI']):
+            db.engine.dispose()
+
+    set_cache = create_cache_backend(app.config['SET_CACHE_URL'], app.config['SET_CACHE_MAX_BYTES'])
+    token_service = None
+    if app.config['SESSION_TOKENS_ENABLED']:
+        token_service = SessionTokenService(app.config['SECRET_KEY'],
+                                            refresh_interval=app.config['SESSION_REVOCATION_REFRESH_SECONDS'])
+    validator = ContentValidator(
+        min_length=app.config['MIN_NOTES_LENGTH'],
+        max_length=app.config['MAX_NOTES_LENGTH'],
+        token_signer=token_service.signer if token_service else None
+    )
+
+    # The AI client is created on first use, inside the worker that needs it
+    flashcard_service = FlashcardService(set_cache=set_cache, validator=validator)
+    import_service = ImportService(
+        flashcard_service,
+        max_workers=app.config['IMPORT_CONCURRENCY'],
+        max_files=app.config['IMPORT_MAX_FILES'],
+        max_entry_bytes=app.config['IMPORT_MAX_ENTRY_BYTES'],
+        max_documents=app.config['IMPORT_MAX_DOCUMENTS']
+    )
+    idempotency_service = None
+    if app.config['IDEMPOTENCY_ENABLED']:
+        idempotency_service = IdempotencyService(
+            ttl=app.config['IDEMPOTENCY_TTL_SECONDS'],
+            wait_timeout=app.config['IDEMPOTENCY_WAIT_SECONDS'],
+            poll_interval=app.config['IDEMPOTENCY_POLL_SECONDS'],
+            lock_timeout=app.config['IDEMPOTENCY_LOCK_SECONDS']
+        )
+    session_reaper = SessionReaper(app)
+    session_filter_sync = SessionFilterSync(app)
+    study_rollup = StudyRollup(app)
+    health_monitor = HealthMonitor(app, session_reaper=session_reaper, set_cache=set_cache,
+                                   import_service=import_service)
+
+    register_routes(
+        app,
+        flashcard_service=flashcard_service,
+        session_service=SessionService(token_service=token_service),
+        validator=validator,
+        health_monitor=health_monitor,
+        set_cache=set_cache,
+        token_service=token_service,
+        import_service=import_service,
+        idempotency_service=idempotency_service,
+        rate_limiter=rate_limiter
+    )
+
+    workers = []
+    if app.config['SESSION_REAPER_ENABLED']:
+        workers.append(session_reaper)
+    if app.config['SESSION_FILTER_ENABLED'] and app.config['SESSION_FILTER_SYNC_SECONDS'] > 0:
+        workers.append(session_filter_sync)
+    if app.config['STUDY_ROLLUP_ENABLED']:
+        workers.append(study_rollup)
+    if app.config['HEALTH_MONITOR_ENABLED']:
+        workers.append(health_monitor)
+    app.extensions['background_workers'] = workers
+    _start_workers_once(app)
+
+    _fork_safe_apps.add(app)
+
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    create_app('development').run(port=5000)
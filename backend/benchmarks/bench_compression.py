@@ -0,0 +1,91 @@
+"""Benchmark: bytes on the wire and CPU cost of response compression.
+
+Payloads: a flashcard set response (JSON), a session statistics response
+(JSON), a CSV export streamed in 64KB chunks and an import progress stream
+of small NDJSON events. Streams go through compress_stream, which flushes
+after every chunk. Brotli rows appear when the brotli package is installed.
+Run from the backend/ directory:
+
+    python -m benchmarks.bench_compression --cards 1000
+"""
+import argparse
+import random
+import time
+from flask import Flask
+
+from benchmarks.bench_serializers import make_cards
+from models import Flashcard
+from utils import compression, json_codec
+from utils.compression import ResponseCompressor, compress_stream
+from utils.exporters import export_chunks
+
+WORDS = ('cell membrane protein energy reaction enzyme molecule function variable loop array '
+         'class method theory experiment analysis empire revolution century culture economy').split()
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+def payloads(card_count):
+    rng = random.Random(7)
+    cards = make_cards(card_count)
+    for card in cards:
+        card.question = sentence(rng, 8) + '?'
+        card.answer = sentence(rng, 18) + '.'
+    serialize = Flashcard.__serializer__.for_object()
+
+    set_body = json_codec.dumps({'success': True, 'data': {
+        'id': cards[0].set_id, 'title': 'Benchmark set', 'flashcards': [serialize(c) for c in cards]
+    }})
+    stats_body = json_codec.dumps({'success': True, 'data': {'card_statistics': [
+        {'id': c.id, 'question': c.question[:50] + '...', 'times_studied': c.times_studied,
+         'success_rate': 66.7, 'last_studied': c.last_studied} for c in cards
+    ]}})
+    rows = [(c.set_id, 'Benchmark set', c.id, c.question, c.answer, 'medium', c.card_order) for c in cards]
+    export = list(export_chunks(rows, 'csv'))
+    events = [json_codec.dumps({'event': 'file', 'file': f'notes/{i}.md', 'status': 'completed',
+                                'documents': 1, 'sets_created': 1, 'set_ids': [c.set_id], 'errors': []}) + b'\n'
+              for i, c in enumerate(cards[:200])]
+    return [
+        (f'set response ({card_count} cards)', [set_body]),
+        (f'statistics ({card_count} cards)', [stats_body]),
+        (f'csv export, {len(export)} chunks', export),
+        (f'import events, {len(events)} chunks', events),
+    ]
+
+def measure(chunks, make_encoder, repeat):
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if len(chunks) == 1:
+            encoder = make_encoder()
+            size = len(encoder.compress(chunks[0]) + encoder.finish())
+        else:
+            size = sum(len(part) for part in compress_stream(iter(chunks), make_encoder()))
+        best = min(best, time.perf_counter() - start)
+    return size, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    settings = [('gzip', level) for level in (1, 6, 9)]
+    if compression.brotli is not None:
+        settings += [('br', quality) for quality in (1, 4, 11)]
+    else:
+        print("brotli not installed, gzip only")
+
+    for label, chunks in payloads(args.cards):
+        raw = sum(len(chunk) for chunk in chunks)
+        print(f"\n{label}: {raw:,} bytes")
+        for encoding, level in settings:
+            app = Flask('bench')
+            app.config.update(COMPRESSION_GZIP_LEVEL=level, COMPRESSION_BROTLI_QUALITY=level)
+            compressor = ResponseCompressor(app)
+            size, seconds = measure(chunks, lambda: compressor.make_encoder(encoding), args.repeat)
+            print(f"  {encoding:<4} level {level:<2} {size:>10,} bytes  {raw / size:5.1f}x  {seconds * 1000:7.2f} ms")
+
+if __name__ == '__main__':
+    main()
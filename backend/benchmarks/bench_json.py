@@ -0,0 +1,88 @@
+"""Benchmark: encoding a 1k-card flashcard set response with each JSON path.
+
+Compares the previous path (datetimes pre-converted with isoformat, stdlib
+jsonify with sorted keys) against FastJSONProvider on native datetimes,
+with orjson and with its stdlib fallback. Run from the backend/ directory:
+
+    python -m benchmarks.bench_json --cards 1000
+"""
+import argparse
+from datetime import datetime
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.bench_serializers import make_cards, timed
+from models import Flashcard
+from utils import json_codec
+from utils.helpers import create_json_response, format_response
+
+def set_payload(cards, serialize):
+    now = datetime.utcnow()
+    return {
+        'id': cards[0].set_id,
+        'session_id': cards[0].session_id,
+        'title': 'Benchmark set',
+        'created_at': now,
+        'updated_at': now,
+        'flashcard_count': len(cards),
+        'flashcards': [serialize(card) for card in cards]
+    }
+
+DATETIME_FIELDS = ('created_at', 'updated_at', 'last_studied', 'due_at')
+
+def iso_payload(payload):
+    """The payload as to_dict used to build it: every datetime already a string."""
+    def iso(record):
+        record = dict(record)
+        for name in DATETIME_FIELDS:
+            if record.get(name) is not None:
+                record[name] = record[name].isoformat()
+        return record
+    return {**iso(payload), 'flashcards': [iso(card) for card in payload['flashcards']]}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    cards = make_cards(args.cards)
+    native = set_payload(cards, Flashcard.__serializer__.for_object())
+    print(f"{args.cards} cards, fast encoder: {json_codec.BACKEND}")
+
+    baseline_app = Flask('baseline')
+    baseline_app.json = DefaultJSONProvider(baseline_app)
+    fast_app = Flask('fast')
+    fast_app.json = json_codec.FastJSONProvider(fast_app)
+
+    def old_path():
+        # isoformat per datetime in the serializer and in format_response, then stdlib jsonify
+        data = iso_payload(set_payload(cards, Flashcard.__serializer__.for_object()))
+        response = format_response(True, data=data)
+        response['timestamp'] = response['timestamp'].isoformat()
+        return baseline_app.json.response(response).get_data()
+
+    def new_path():
+        return create_json_response(True, data=set_payload(cards, Flashcard.__serializer__.for_object()))[0].get_data()
+
+    with baseline_app.app_context():
+        timed('isoformat + stdlib jsonify', old_path, args.repeat)
+
+    with fast_app.app_context():
+        timed(f'native + FastJSONProvider ({json_codec.BACKEND})', new_path, args.repeat)
+
+        # Same provider with orjson unavailable
+        orjson, json_codec.orjson = json_codec.orjson, None
+        try:
+            timed('native + FastJSONProvider (json)', new_path, args.repeat)
+        finally:
+            json_codec.orjson = orjson
+
+        timed(f'encode only: {json_codec.BACKEND}', lambda: json_codec.dumps(native), args.repeat)
+
+    iso = iso_payload(native)
+    with baseline_app.app_context():
+        timed('encode only: stdlib jsonify dumps', lambda: baseline_app.json.dumps(iso), args.repeat)
+
+if __name__ == '__main__':
+    main()
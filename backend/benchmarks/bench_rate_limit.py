@@ -0,0 +1,92 @@
+"""Benchmark: overhead the rate limiter adds to each request.
+
+Times backend.acquire() for the lock-free memory backend and for the
+shared backend over LocalCounterStore (the in-process stand-in for Redis,
+so this excludes the network round trip), single-threaded and from
+several threads, then the end-to-end cost per request through the test
+client with the limiter on and off. Run from the backend/ directory:
+
+    python -m benchmarks.bench_rate_limit --requests 20000 --threads 8
+"""
+import argparse
+import threading
+import time
+from flask import Flask, jsonify
+
+from utils.rate_limit import (LocalCounterStore, MemoryRateLimitBackend, RateLimiter,
+                              SharedRateLimitBackend, parse_limits, rate_limit)
+
+# The process-notes shape: default per-IP limit plus per-session and per-IP route limits
+LIMITS = parse_limits('1000000/minute;100000000/day')
+
+def request_hits(i, sessions):
+    session = f"session:{i % sessions}"
+    return [(f"default:ip:10.0.0.{i % 250}", LIMITS[0])] + \
+           [(f"api.process_notes:{session}", limit) for limit in LIMITS] + \
+           [(f"api.process_notes:ip:10.0.0.{i % 250}", limit) for limit in LIMITS]
+
+def bench_backend(label, backend, requests, threads, sessions):
+    hits = [request_hits(i, sessions) for i in range(requests)]
+
+    start = time.perf_counter()
+    for request in hits:
+        backend.acquire(request, time.time())
+    single = time.perf_counter() - start
+
+    def worker(offset):
+        for request in hits[offset::threads]:
+            backend.acquire(request, time.time())
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    threaded = time.perf_counter() - start
+
+    print(f"{label:<28} {single / requests * 1e6:7.2f} us/request   "
+          f"{threads} threads: {requests / threaded:>10,.0f} requests/s")
+
+def make_app(enabled):
+    app = Flask('bench')
+    app.config.update(RATELIMIT_ENABLED=enabled, RATELIMIT_DEFAULT='1000000/minute',
+                      RATELIMIT_ROUTE='1000000/minute;100000000/day')
+
+    @app.route('/ping', methods=['POST'])
+    @rate_limit('RATELIMIT_ROUTE')
+    def ping():
+        return jsonify(ok=True)
+
+    RateLimiter(app)
+    return app
+
+def bench_requests(requests, rounds=5):
+    clients = {enabled: make_app(enabled).test_client() for enabled in (False, True)}
+    timings = {False: float('inf'), True: float('inf')}
+    # Alternate on/off rounds and keep the best of each so machine noise cancels out
+    for _ in range(rounds):
+        for enabled, client in clients.items():
+            start = time.perf_counter()
+            for i in range(requests):
+                client.post('/ping', headers={'X-Session-ID': f"s{i % 100}"})
+            timings[enabled] = min(timings[enabled], (time.perf_counter() - start) / requests * 1e6)
+
+    for enabled in (False, True):
+        print(f"{'request, limiter ' + ('on' if enabled else 'off'):<28} {timings[enabled]:7.2f} us/request")
+    print(f"{'limiter overhead':<28} {timings[True] - timings[False]:7.2f} us/request")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--sessions', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, 5 limits each, {args.sessions} sessions")
+    bench_backend('memory (lock-free)', MemoryRateLimitBackend(), args.requests, args.threads, args.sessions)
+    bench_backend('shared (local store)', SharedRateLimitBackend(LocalCounterStore()),
+                  args.requests, args.threads, args.sessions)
+    bench_requests(min(args.requests, 2000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Full-text search latency against a large FTS5 index, compared to LIKE scans.
+
+Seeds a temporary SQLite database with --cards flashcards spread over
+--sessions sessions (one "heavy" session owns --heavy-share of all sets),
+using a Zipf-distributed synthetic vocabulary so query terms range from
+very common to rare. Then times session-scoped searches for a typical and
+for the heavy session. Run from the backend/ directory:
+
+    python -m benchmarks.bench_search --cards 1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import text
+
+from config import Config
+from models import db, init_db, SearchIndex, Flashcard
+
+SYLLABLES = ['ka', 'lo', 'mi', 'nu', 'pe', 'ri', 'sa', 'to', 've', 'zu', 'bra', 'cle', 'dro', 'fen', 'gli', 'tor']
+VOCABULARY = [''.join(parts) for parts in itertools.product(SYLLABLES, repeat=3)][:4000]
+ZIPF_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+
+def make_app(path):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    init_db(app)
+    return app
+
+def sentence(rng, words):
+    return ' '.join(rng.choices(VOCABULARY, cum_weights=ZIPF_WEIGHTS, k=words))
+
+def seed(cards, sessions, cards_per_set, heavy_share, batch_size=20000):
+    """Insert sessions, sets, cards and their index rows with Core executemany."""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    session_ids = [str(uuid.uuid4()) for _ in range(sessions)]
+    db.session.execute(
+        text("INSERT INTO sessions (id, created_at, updated_at, last_active, expires_at, is_active) "
+             "VALUES (:id, :now, :now, :now, :expires, 1)"),
+        [{'id': session_id, 'now': now, 'expires': now + timedelta(days=30)} for session_id in session_ids]
+    )
+
+    card_rows = []
+    index_rows = []
+    created = 0
+    while created < cards:
+        session_id = session_ids[0] if rng.random() < heavy_share else rng.choice(session_ids)
+        set_id = str(uuid.uuid4())
+        title = sentence(rng, 4)
+        notes = sentence(rng, 60)
+        db.session.execute(
+            text("INSERT INTO flashcard_sets (id, session_id, title, content_hash, content_length, "
+                 "generation_method, version, created_at, updated_at) "
+                 "VALUES (:id, :session_id, :title, :hash, :length, 'ai', 1, :now, :now)"),
+            {'id': set_id, 'session_id': session_id, 'title': title, 'hash': 'bench',
+             'length': len(notes), 'now': now}
+        )
+        cards_in_set = []
+        for order in range(min(cards_per_set, cards - created)):
+            card = (str(uuid.uuid4()), f"What is {sentence(rng, 6)}?", sentence(rng, 12))
+            cards_in_set.append(card)
+            card_rows.append({'id': card[0], 'set_id': set_id, 'session_id': session_id,
+                              'question': card[1], 'answer': card[2], 'order': order + 1, 'now': now})
+        index_rows.extend(SearchIndex._rows_for_set(session_id, set_id, title, notes, cards_in_set))
+        created += len(cards_in_set)
+
+        if len(card_rows) >= batch_size or created >= cards:
+            db.session.execute(
+                text("INSERT INTO flashcards (id, set_id, session_id, question, answer, card_order, "
+                     "difficulty_level, times_studied, times_correct, ease_factor, interval_days, "
+                     "repetitions, due_at, created_at, updated_at) "
+                     "VALUES (:id, :set_id, :session_id, :question, :answer, :order, 'medium', 0, 0, "
+                     "2.5, 0, 0, :now, :now, :now)"),
+                card_rows
+            )
+            SearchIndex._insert(index_rows)
+            db.session.commit()
+            card_rows, index_rows = [], []
+            print(f"  seeded {created}/{cards} cards", end='\r', flush=True)
+
+    db.session.execute(text("INSERT INTO search_index(search_index) VALUES ('optimize')"))
+    db.session.commit()
+    print()
+    return session_ids
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+def like_search(session_id, term):
+    pattern = f"%{term}%"
+    return db.session.query(Flashcard.id).filter(
+        Flashcard.session_id == session_id,
+        (Flashcard.question.like(pattern)) | (Flashcard.answer.like(pattern))
+    ).all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', type=int, default=1000000)
+    parser.add_argument('--sessions', type=int, default=1000)
+    parser.add_argument('--cards-per-set', type=int, default=20)
+    parser.add_argument('--heavy-share', type=float, default=0.1)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'search.db'))
+        with app.app_context():
+            db.create_all()
+            start = time.perf_counter()
+            session_ids = seed(args.cards, args.sessions, args.cards_per_set, args.heavy_share)
+            print(f"Seeded {args.cards} cards in {time.perf_counter() - start:.1f}s")
+
+            common, medium, rare = VOCABULARY[5], VOCABULARY[200], VOCABULARY[3000]
+            rng = random.Random(7)
+            typical = lambda: rng.choice(session_ids[1:])
+            heavy = lambda: session_ids[0]
+            queries = [
+                ('common word', lambda pick: SearchIndex.search(pick(), common)),
+                ('medium word', lambda pick: SearchIndex.search(pick(), medium)),
+                ('rare word', lambda pick: SearchIndex.search(pick(), rare)),
+                ('two words', lambda pick: SearchIndex.search(pick(), f"{medium} {common}")),
+                ('prefix', lambda pick: SearchIndex.search(pick(), medium[:4])),
+                ('page 5', lambda pick: SearchIndex.search(pick(), common, offset=80)),
+                ('LIKE medium (unranked)', lambda pick: like_search(pick(), medium)),
+            ]
+            for label, pick in (('typical session', typical), ('heavy session', heavy)):
+                print(f"\n{label:<24}{'median':>10}{'p95':>10}")
+                for name, fn in queries:
+                    median, p95 = timed(lambda: fn(pick), args.repeat)
+                    print(f"{name:<24}{median:>8.2f}ms{p95:>8.2f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Micro-benchmark: serializing 10k flashcards with reflective vs compiled serializers.
+
+Run from the backend/ directory:
+
+    python -m benchmarks.bench_serializers --cards 10000
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime
+from sqlalchemy import create_engine, insert
+
+from models import db, Flashcard
+
+def reflective_to_dict(obj):
+    """The previous BaseModel.to_dict implementation, kept as the baseline."""
+    result = {}
+    for column in obj.__table__.columns:
+        value = getattr(obj, column.name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        result[column.name] = value
+    return result
+
+def make_cards(count):
+    now = datetime.utcnow()
+    set_id = str(uuid.uuid4())
+    session_id = str(uuid.uuid4())
+    cards = []
+    for i in range(count):
+        card = Flashcard(set_id=set_id, session_id=session_id, question=f"Question number {i}?",
+                         answer=f"Answer number {i}", card_order=i + 1)
+        card.id = str(uuid.uuid4())
+        card.created_at = card.updated_at = now
+        card.times_studied = i % 7
+        card.times_correct = i % 3
+        card.last_studied = now if i % 2 else None
+        card.ease_factor, card.interval_days, card.repetitions, card.due_at = 2.5, i % 5, i % 4, now
+        card.schedule_version = i % 4
+        cards.append(card)
+    return cards
+
+def timed(label, fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<34} {best * 1000:8.2f} ms")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    cards = make_cards(args.cards)
+    serialize = Flashcard.__serializer__.for_object()
+
+    timed('reflective to_dict (ORM objects)', lambda: [reflective_to_dict(c) for c in cards], args.repeat)
+    timed('compiled serializer (ORM objects)', lambda: [serialize(c) for c in cards], args.repeat)
+
+    # Core rows skip ORM object construction entirely
+    engine = create_engine('sqlite://')
+    db.metadata.create_all(engine)
+    columns, serialize_row = Flashcard.__serializer__.for_rows()
+    with engine.begin() as conn:
+        conn.execute(insert(Flashcard.__table__), [
+            {name: getattr(card, name) for name in Flashcard.__serializer__.column_names}
+            for card in cards
+        ])
+
+    with engine.connect() as conn:
+        def load_orm_style():
+            from sqlalchemy.orm import Session as OrmSession
+            with OrmSession(bind=conn) as orm_session:
+                return [reflective_to_dict(c) for c in orm_session.query(Flashcard).all()]
+
+        def load_core_rows():
+            return [serialize_row(row) for row in conn.execute(db.select(*columns))]
+
+        timed('query + reflective (ORM load)', load_orm_style, args.repeat)
+        timed('query + compiled (Core rows)', load_core_rows, args.repeat)
+
+if __name__ == '__main__':
+    main()
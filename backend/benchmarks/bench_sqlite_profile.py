@@ -0,0 +1,111 @@
+"""Concurrent read/write throughput on SQLite with and without the tuning profile.
+
+Run from the backend/ directory:
+
+    python -m benchmarks.bench_sqlite_profile --seconds 10 --readers 8 --writers 2
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from config import Config
+from models import db
+from models.engine import build_engine_options, attach_sqlite_pragmas
+
+def setup_engine(path, tuned):
+    url = f"sqlite:///{path}"
+    if tuned:
+        engine = create_engine(url, **build_engine_options(url, vars(Config)))
+        attach_sqlite_pragmas(engine, Config.SQLITE_PRAGMAS)
+    else:
+        engine = create_engine(url, connect_args={'check_same_thread': False})
+    db.metadata.create_all(engine)
+    return engine
+
+def seed(engine, rows):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO sessions (id, created_at, updated_at, last_active, expires_at, is_active) "
+                 "VALUES (:id, :now, :now, :now, :expires, 1)"),
+            [{'id': str(uuid.uuid4()), 'now': now, 'expires': now + timedelta(days=30)} for _ in range(rows)]
+        )
+
+def run(engine, seconds, readers, writers):
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def reader():
+        done = errors = 0
+        while not stop.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT id, expires_at FROM sessions WHERE is_active = 1 "
+                                      "ORDER BY created_at DESC LIMIT 20")).fetchall()
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts['reads'] += done
+            counts['errors'] += errors
+
+    def writer():
+        done = errors = 0
+        while not stop.is_set():
+            now = datetime.utcnow()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO sessions (id, created_at, updated_at, last_active, expires_at, is_active) "
+                             "VALUES (:id, :now, :now, :now, :expires, 1)"),
+                        {'id': str(uuid.uuid4()), 'now': now, 'expires': now + timedelta(days=30)}
+                    )
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts['writes'] += done
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'reads_per_sec': round(counts['reads'] / seconds),
+        'writes_per_sec': round(counts['writes'] / seconds),
+        'lock_errors': counts['errors']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    for tuned in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = setup_engine(os.path.join(tmp, 'bench.db'), tuned)
+            seed(engine, args.rows)
+            result = run(engine, args.seconds, args.readers, args.writers)
+            engine.dispose()
+        label = 'tuned profile' if tuned else 'default     '
+        print(f"{label}: {result['reads_per_sec']:>7} reads/s  {result['writes_per_sec']:>6} writes/s  "
+              f"{result['lock_errors']} lock errors")
+
+if __name__ == '__main__':
+    main()
@@ -13,16 +13,90 @@ class Config:
     DATABASE_URL = os.environ.get('DATABASE_URL', 'sqlite:///flashcards.db')
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
     
+    # Engine pool settings (applied to SQLite files and server databases alike)
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 5))
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW', 10))
+    DATABASE_POOL_TIMEOUT = int(os.environ.get('DATABASE_POOL_TIMEOUT', 30))
+    DATABASE_POOL_RECYCLE = int(os.environ.get('DATABASE_POOL_RECYCLE', 1800))
+    DATABASE_POOL_PRE_PING = True
+    
+    # SQLite performance profile, applied on every new connection
+    SQLITE_TUNING_ENABLED = os.environ.get('SQLITE_TUNING_ENABLED', 'true').lower() == 'true'
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,       # milliseconds
+        'cache_size': -16000,       # negative = KiB, so ~16MB
+        'mmap_size': 134217728,     # 128MB
+        'temp_store': 'MEMORY'
+    }
+    
     # Hugging Face API configuration
     HUGGING_FACE_API_TOKEN = os.environ.get('HUGGING_FACE_API_TOKEN')
     
-    # API rate limiting
-    RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL', 'memory://')
+    # API rate limiting: memory:// counts per process, redis:// is shared by all workers.
+    # Limits are 'N/unit' (second, minute, hour, day) separated by ';'. The default
+    # applies per client IP to every API route; per-route limits count per session and IP.
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', os.environ.get('REDIS_URL', 'memory://'))
+    RATELIMIT_HEADERS_ENABLED = os.environ.get('RATELIMIT_HEADERS_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_DEFAULT = os.environ.get('RATELIMIT_DEFAULT', '600/minute')
+    RATELIMIT_PROCESS_NOTES = os.environ.get('RATELIMIT_PROCESS_NOTES', '10/minute;200/day')
+    RATELIMIT_IMPORT = os.environ.get('RATELIMIT_IMPORT', '5/minute;50/day')
+    
+    # Number of reverse proxies in front of the app. Behind a proxy every request
+    # comes from the proxy's address, so per-IP rate limits and anonymous
+    # idempotency keys would be shared by all clients; set this to the number of
+    # proxies that append X-Forwarded-For/-Proto to use the client address they
+    # report. Leave at 0 when clients connect directly: the headers are then
+    # client-controlled and trusting them lets anyone pick their own IP.
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
     
     # Session configuration
     SESSION_TIMEOUT_DAYS = 30
     
+    # Signed session tokens (<id>.<expiry>.<HMAC>); plain UUID session ids stay valid
+    SESSION_TOKENS_ENABLED = os.environ.get('SESSION_TOKENS_ENABLED', 'false').lower() == 'true'
+    SESSION_REVOCATION_REFRESH_SECONDS = int(os.environ.get('SESSION_REVOCATION_REFRESH_SECONDS', 30))
+    
+    # Bloom filter of live session ids (rejects unknown ids without a query). Sessions
+    # created by other workers are added by a sync every SESSION_FILTER_SYNC_SECONDS
+    # (0 disables it, for single-process servers); until then they are rejected here
+    SESSION_FILTER_ENABLED = os.environ.get('SESSION_FILTER_ENABLED', 'true').lower() == 'true'
+    SESSION_FILTER_CAPACITY = int(os.environ.get('SESSION_FILTER_CAPACITY', 100000))
+    SESSION_FILTER_ERROR_RATE = float(os.environ.get('SESSION_FILTER_ERROR_RATE', 0.01))
+    SESSION_FILTER_SYNC_SECONDS = float(os.environ.get('SESSION_FILTER_SYNC_SECONDS', 1.0))
+    
+    # Validated-session cache in front of Session.get_active_session. It is per
+    # process, so reads may accept a session revoked on another worker for up to
+    # SESSION_CACHE_TTL_SECONDS; writes always re-check the database
+    SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 10000))
+    SESSION_CACHE_TTL_SECONDS = int(os.environ.get('SESSION_CACHE_TTL_SECONDS', 60))
+    SESSION_ACTIVITY_UPDATE_SECONDS = int(os.environ.get('SESSION_ACTIVITY_UPDATE_SECONDS', 60))
+    
+    # Expired session reaper (runs in the background, off the request path)
+    SESSION_REAPER_ENABLED = os.environ.get('SESSION_REAPER_ENABLED', 'true').lower() == 'true'
+    SESSION_REAPER_INTERVAL_SECONDS = int(os.environ.get('SESSION_REAPER_INTERVAL_SECONDS', 300))
+    SESSION_REAPER_BATCH_SIZE = int(os.environ.get('SESSION_REAPER_BATCH_SIZE', 500))
+    SESSION_REAPER_BATCH_PAUSE_SECONDS = float(os.environ.get('SESSION_REAPER_BATCH_PAUSE_SECONDS', 0.05))
+    SESSION_REAPER_MAX_BATCHES = int(os.environ.get('SESSION_REAPER_MAX_BATCHES', 100))
+    
+    # Idempotency-Key support for POST /api/process-notes: responses are replayed
+    # for the TTL; a concurrent retry waits up to IDEMPOTENCY_WAIT_SECONDS for the
+    # first request, and a claim older than IDEMPOTENCY_LOCK_SECONDS is treated as abandoned
+    IDEMPOTENCY_ENABLED = os.environ.get('IDEMPOTENCY_ENABLED', 'true').lower() == 'true'
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400))
+    IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 60))
+    IDEMPOTENCY_POLL_SECONDS = float(os.environ.get('IDEMPOTENCY_POLL_SECONDS', 0.25))
+    IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', 300))
+    
     # AI model configuration
+    AI_REQUEST_TIMEOUT_SECONDS = int(os.environ.get('AI_REQUEST_TIMEOUT_SECONDS', 30))
+    
+    # Async inference: coroutines on one event loop per process (needs aiohttp)
+    ASYNC_INFERENCE_ENABLED = os.environ.get('ASYNC_INFERENCE_ENABLED', 'false').lower() == 'true'
+    AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', 100))
+    AI_RACE_MODELS = os.environ.get('AI_RACE_MODELS', 'true').lower() == 'true'
     AVAILABLE_MODELS = [
         "https://api-inference.huggingface.co/models/gpt2",
         "https://api-inference.huggingface.co/models/facebook/bart-large-cnn",
@@ -30,11 +104,72 @@ class Config:
         "https://api-inference.huggingface.co/models/google/flan-t5-small"
     ]
     
-    # Content limits
-    MIN_CONTENT_LENGTH = 50
-    MAX_CONTENT_LENGTH = 2000
+    # Content limits (notes length; MAX_CONTENT_LENGTH is Flask's request body cap)
+    MIN_NOTES_LENGTH = 50
+    MAX_NOTES_LENGTH = 2000
     DEFAULT_FLASHCARD_COUNT = 5
     
+    # Bulk note import (POST /api/import, zip/tar of .txt/.md)
+    IMPORT_MAX_ARCHIVE_BYTES = int(os.environ.get('IMPORT_MAX_ARCHIVE_BYTES', 50 * 1024 * 1024))
+    IMPORT_MAX_ENTRY_BYTES = int(os.environ.get('IMPORT_MAX_ENTRY_BYTES', 5 * 1024 * 1024))
+    IMPORT_MAX_FILES = int(os.environ.get('IMPORT_MAX_FILES', 500))
+    IMPORT_MAX_DOCUMENTS = int(os.environ.get('IMPORT_MAX_DOCUMENTS', 200))
+    IMPORT_CONCURRENCY = int(os.environ.get('IMPORT_CONCURRENCY', 4))
+    MAX_CONTENT_LENGTH = IMPORT_MAX_ARCHIVE_BYTES
+    
+    # Study event rollup (folds the append-only study_events log into aggregates)
+    STUDY_ROLLUP_ENABLED = os.environ.get('STUDY_ROLLUP_ENABLED', 'true').lower() == 'true'
+    STUDY_ROLLUP_INTERVAL_SECONDS = float(os.environ.get('STUDY_ROLLUP_INTERVAL_SECONDS', 5))
+    STUDY_ROLLUP_BATCH_SIZE = int(os.environ.get('STUDY_ROLLUP_BATCH_SIZE', 5000))
+    STUDY_ROLLUP_MAX_BATCHES = int(os.environ.get('STUDY_ROLLUP_MAX_BATCHES', 20))
+    # Age an event must reach before the rollup moves past it; unset means 0 on
+    # SQLite (ids commit in order) and 60s on databases with concurrent writers
+    STUDY_ROLLUP_SETTLE_SECONDS = (float(os.environ['STUDY_ROLLUP_SETTLE_SECONDS'])
+                                   if 'STUDY_ROLLUP_SETTLE_SECONDS' in os.environ else None)
+    
+    # Health checks (a background prober; the health endpoints serve its last snapshot)
+    HEALTH_MONITOR_ENABLED = os.environ.get('HEALTH_MONITOR_ENABLED', 'true').lower() == 'true'
+    HEALTH_CHECK_INTERVAL_SECONDS = float(os.environ.get('HEALTH_CHECK_INTERVAL_SECONDS', 15))
+    HEALTH_PROBE_TIMEOUT_SECONDS = float(os.environ.get('HEALTH_PROBE_TIMEOUT_SECONDS', 3))
+    HEALTH_STALE_SECONDS = float(os.environ.get('HEALTH_STALE_SECONDS', 60))
+    HEALTH_QUEUE_BACKLOG_WARNING = int(os.environ.get('HEALTH_QUEUE_BACKLOG_WARNING', 50))
+    
+    # Serialized flashcard set cache (memory:// per process, or redis:// shared)
+    SET_CACHE_URL = os.environ.get('SET_CACHE_URL', 'memory://')
+    SET_CACHE_MAX_BYTES = int(os.environ.get('SET_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    
+    # Response compression (brotli when installed, else gzip) of text responses that are not already encoded
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 500))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+    
+    # Prometheus metrics at /metrics (per worker process) and Server-Timing response headers
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    
+    # Opt-in SQL profiling: slow query log, N+1 warnings and per-view @query_budget checks
+    QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'false').lower() == 'true'
+    QUERY_SLOW_MS = float(os.environ.get('QUERY_SLOW_MS', 100))
+    QUERY_N_PLUS_ONE_THRESHOLD = int(os.environ.get('QUERY_N_PLUS_ONE_THRESHOLD', 5))
+    QUERY_BUDGET_ENFORCE = os.environ.get('QUERY_BUDGET_ENFORCE', 'false').lower() == 'true'
+    
+    # Conditional GET for sets and the set list (ETag + Cache-Control: private);
+    # 0 means browsers keep responses but revalidate them on every use
+    HTTP_CACHE_MAX_AGE_SECONDS = int(os.environ.get('HTTP_CACHE_MAX_AGE_SECONDS', 0))
+    
+    # Flashcard set listing (keyset pagination)
+    FLASHCARD_SETS_PAGE_SIZE = 20
+    FLASHCARD_SETS_MAX_PAGE_SIZE = 100
+    
+    # Spaced-repetition study queue (GET /api/study/next)
+    STUDY_QUEUE_PAGE_SIZE = 20
+    STUDY_QUEUE_MAX_PAGE_SIZE = 100
+    
+    # Full-text search (GET /api/search, SQLite FTS5)
+    SEARCH_PAGE_SIZE = 20
+    SEARCH_MAX_PAGE_SIZE = 100
+    
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
@@ -44,12 +179,31 @@ class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
     SQLALCHEMY_ECHO = False
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 10))
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW', 20))
+    SQLITE_PRAGMAS = {
+        **Config.SQLITE_PRAGMAS,
+        'cache_size': -64000,
+        'mmap_size': 268435456
+    }
 
 class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    SQLITE_PRAGMAS = {
+        **Config.SQLITE_PRAGMAS,
+        'journal_mode': 'MEMORY',
+        'mmap_size': 0
+    }
+    SESSION_REAPER_ENABLED = False
+    SESSION_FILTER_SYNC_SECONDS = 0
+    STUDY_ROLLUP_ENABLED = False
+    HEALTH_MONITOR_ENABLED = False
+    RATELIMIT_STORAGE_URL = 'local://'
+    QUERY_PROFILER_ENABLED = True
+    QUERY_BUDGET_ENFORCE = True
 
 # Configuration dictionary
 config = {
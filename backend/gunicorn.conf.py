@@ -0,0 +1,35 @@
+# Gunicorn settings for the production deployment:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Sizing: requests spend most of their time waiting on the database or the
+# Hugging Face API, so each worker runs a thread pool rather than relying on
+# processes alone. Start with one worker per core plus one (more workers only
+# add memory) and raise GUNICORN_THREADS until the CPU is busy. Each thread
+# may hold a database connection, so keep DATABASE_POOL_SIZE +
+# DATABASE_MAX_OVERFLOW >= threads; with SQLite every worker writes to the
+# same file, so prefer fewer workers with more threads.
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Import the app (models, compiled patterns, serializers, session filter) once
+# in the master and share it copy-on-write; create_app drops inherited
+# database connections in each worker and starts background threads there.
+preload_app = True
+
+# AI generation can take up to AI_REQUEST_TIMEOUT_SECONDS per model attempt
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth from caches
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = 500
+
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,143 @@
+"""Move flashcard_sets.original_content into deduplicated, compressed content_blobs.
+
+Run from the backend/ directory against the configured DATABASE_URL:
+
+    python -m migrations.content_blobs --dry-run   # report the savings only
+    python -m migrations.content_blobs             # migrate and report
+    python -m migrations.content_blobs --vacuum    # also reclaim SQLite file space
+"""
+import argparse
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import bindparam, create_engine, inspect, text
+
+from config import Config
+from models import ContentBlob
+
+def _format_bytes(count):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if count < 1024 or unit == 'GB':
+            return f"{count:.1f} {unit}" if unit != 'B' else f"{count} B"
+        count /= 1024
+
+def migrate(engine, batch_size=1000, dry_run=False, vacuum=False):
+    """Deduplicate existing notes into content_blobs; returns a space report."""
+
+    columns = {column['name'] for column in inspect(engine).get_columns('flashcard_sets')}
+    if 'original_content' not in columns:
+        print("flashcard_sets.original_content already migrated, nothing to do")
+        return None
+
+    blobs_table = ContentBlob.__table__
+    if not dry_run:
+        blobs_table.create(engine, checkfirst=True)
+        if 'content_hash' not in columns:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE flashcard_sets ADD COLUMN content_hash VARCHAR(64)"))
+
+    # Rows already pointing at a blob were handled by an earlier, interrupted run
+    pending_filter = "AND content_hash IS NULL " if (not dry_run or 'content_hash' in columns) else ""
+
+    logical_bytes = 0
+    stored = {}  # hash -> compressed size, for blobs created in this run
+    refs = Counter()
+    last_id = ''
+
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT id, original_content FROM flashcard_sets "
+                     "WHERE id > :last_id " + pending_filter + "ORDER BY id LIMIT :limit"),
+                {'last_id': last_id, 'limit': batch_size}
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            batch_refs = Counter()
+            new_blobs = []
+            assignments = []
+            for set_id, content in rows:
+                content = content or ''
+                content_hash = ContentBlob.hash_text(content)
+                logical_bytes += len(content.encode('utf-8'))
+                batch_refs[content_hash] += 1
+                assignments.append({'b_id': set_id, 'b_hash': content_hash})
+                if content_hash not in stored:
+                    data = ContentBlob.compress(content)
+                    stored[content_hash] = len(data)
+                    new_blobs.append({
+                        'hash': content_hash,
+                        'codec': 'zlib',
+                        'data': data,
+                        'original_size': len(content.encode('utf-8')),
+                        'compressed_size': len(data),
+                        'ref_count': 0,
+                        'created_at': datetime.utcnow()
+                    })
+            refs.update(batch_refs)
+
+            if dry_run:
+                continue
+
+            existing = {
+                row[0] for row in conn.execute(
+                    blobs_table.select().with_only_columns(blobs_table.c.hash)
+                    .where(blobs_table.c.hash.in_([blob['hash'] for blob in new_blobs]))
+                )
+            } if new_blobs else set()
+            missing = [blob for blob in new_blobs if blob['hash'] not in existing]
+            if missing:
+                conn.execute(blobs_table.insert(), missing)
+
+            conn.execute(
+                blobs_table.update()
+                .where(blobs_table.c.hash == bindparam('b_hash'))
+                .values(ref_count=blobs_table.c.ref_count + bindparam('b_count')),
+                [{'b_hash': content_hash, 'b_count': count} for content_hash, count in batch_refs.items()]
+            )
+            conn.execute(
+                text("UPDATE flashcard_sets SET content_hash = :b_hash WHERE id = :b_id"),
+                assignments
+            )
+
+    if not dry_run:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_flashcard_sets_content_hash "
+                              "ON flashcard_sets (content_hash)"))
+            conn.execute(text("ALTER TABLE flashcard_sets DROP COLUMN original_content"))
+        if vacuum and engine.dialect.name == 'sqlite':
+            with engine.connect() as conn:
+                conn.execution_options(isolation_level='AUTOCOMMIT').execute(text("VACUUM"))
+
+    stored_bytes = sum(stored.values())
+    return {
+        'flashcard_sets': sum(refs.values()),
+        'unique_blobs': len(stored),
+        'logical_bytes': logical_bytes,
+        'stored_bytes': stored_bytes,
+        'bytes_saved': logical_bytes - stored_bytes,
+        'savings_ratio': round(1 - stored_bytes / logical_bytes, 4) if logical_bytes else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=Config.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--vacuum', action='store_true')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    report = migrate(engine, batch_size=args.batch_size, dry_run=args.dry_run, vacuum=args.vacuum)
+    if report is None:
+        return
+
+    print(f"Flashcard sets:   {report['flashcard_sets']}")
+    print(f"Unique notes:     {report['unique_blobs']}")
+    print(f"Notes as stored before: {_format_bytes(report['logical_bytes'])}")
+    print(f"Notes as stored after:  {_format_bytes(report['stored_bytes'])}")
+    print(f"Space saved:      {_format_bytes(report['bytes_saved'])} ({report['savings_ratio']:.1%})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Add the columns and indexes the models define but an existing database lacks.
+
+db.create_all() creates missing tables but never alters existing ones;
+this brings older databases up to date. It is idempotent, so it is safe
+to run on every deploy. Run from the backend/ directory against the
+configured DATABASE_URL:
+
+    python -m migrations.schema --dry-run   # print the statements only
+    python -m migrations.schema
+"""
+import argparse
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.schema import CreateIndex
+
+from config import Config
+from models import db
+
+# Columns with no constant server default: the SQL default ADD COLUMN fills
+# in, then the statement that sets the real value for existing rows
+BACKFILLS = {
+    ('flashcards', 'session_id'): (
+        "''",
+        "UPDATE flashcards SET session_id = "
+        "(SELECT flashcard_sets.session_id FROM flashcard_sets WHERE flashcard_sets.id = flashcards.set_id)"
+    ),
+    # Existing cards are due straight away
+    ('flashcards', 'due_at'): ("'1970-01-01 00:00:00'", "UPDATE flashcards SET due_at = created_at")
+}
+
+# Columns added by a dedicated migration that also moves data into them
+HANDLED_ELSEWHERE = {
+    ('flashcard_sets', 'content_hash'): 'migrations.content_blobs'
+}
+
+def _default_sql(column):
+    backfill = BACKFILLS.get((column.table.name, column.name))
+    if backfill is not None:
+        return backfill[0]
+    if column.server_default is None:
+        return None
+    default = column.server_default.arg
+    if hasattr(default, 'text'):
+        return default.text
+    return "'" + str(default).replace("'", "''") + "'"
+
+def _column_ddl(column, dialect) -> str:
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+    default = _default_sql(column)
+    if default is not None:
+        ddl += f" DEFAULT {default}"
+    if not column.nullable:
+        if default is None:
+            raise ValueError(f"{column.table.name}.{column.name} is NOT NULL without a server default or backfill")
+        ddl += " NOT NULL"
+    return ddl
+
+def plan(engine):
+    """The statements needed to bring the database up to the models, in order."""
+
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    columns, backfills, indexes = [], [], []
+
+    for table in db.metadata.sorted_tables:
+        # New tables come from db.create_all()
+        if table.name not in existing_tables:
+            continue
+
+        present = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            owner = HANDLED_ELSEWHERE.get((table.name, column.name))
+            if owner is not None:
+                raise RuntimeError(f"{table.name}.{column.name} is missing; run python -m {owner} first")
+            columns.append(f"ALTER TABLE {table.name} ADD COLUMN {_column_ddl(column, engine.dialect)}")
+            backfill = BACKFILLS.get((table.name, column.name))
+            if backfill is not None:
+                backfills.append(backfill[1])
+
+        present_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in present_indexes:
+                indexes.append(str(CreateIndex(index).compile(dialect=engine.dialect)).strip())
+
+    return columns + backfills + indexes
+
+def migrate(engine, dry_run=False):
+    """Apply (or with dry_run only return) the statements from plan()."""
+
+    statements = plan(engine)
+    if not dry_run and statements:
+        with engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+    return statements
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=Config.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    statements = migrate(create_engine(args.database_url), dry_run=args.dry_run)
+    if not statements:
+        print("Schema is up to date, nothing to do")
+        return
+    for statement in statements:
+        print(f"{statement};")
+    if not args.dry_run:
+        print(f"Applied {len(statements)} statements")
+
+if __name__ == '__main__':
+    main()
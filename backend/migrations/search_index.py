@@ -0,0 +1,39 @@
+"""Rebuild the SQLite FTS5 search index from the flashcard_sets and flashcards tables.
+
+Run from the backend/ directory against the configured DATABASE_URL:
+
+    python -m migrations.search_index
+    python -m migrations.search_index --database-url sqlite:///flashcards.db --batch-size 1000
+"""
+import argparse
+import time
+from flask import Flask
+
+from config import Config
+from models import SearchIndex, init_db
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=Config.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database_url
+    init_db(app)
+
+    with app.app_context():
+        if not SearchIndex.is_available():
+            print("Full-text search needs SQLite with FTS5, nothing to do")
+            return
+
+        start = time.perf_counter()
+        report = SearchIndex.rebuild(batch_size=args.batch_size)
+
+    print(f"Flashcard sets indexed: {report['sets']}")
+    print(f"Flashcards indexed:     {report['cards']}")
+    print(f"Took {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
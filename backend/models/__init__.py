@@ -1,5 +1,15 @@
 from .base import db
 from .session import Session
 from .flashcard import FlashcardSet, Flashcard
+from .content_blob import ContentBlob
+from .study import StudyEvent, RollupState
+from .search import SearchIndex
+from .idempotency import IdempotencyKey
+from .engine import init_db
+from .serializers import build_serializers
 
-__all__ = ['db', 'Session', 'FlashcardSet', 'Flashcard']
\ No newline at end of file
+# Compile per-model serializers once at import time
+build_serializers(Session, FlashcardSet, Flashcard)
+
+__all__ = ['db', 'Session', 'FlashcardSet', 'Flashcard', 'ContentBlob',
+           'StudyEvent', 'RollupState', 'SearchIndex', 'IdempotencyKey', 'init_db']
\ No newline at end of file
@@ -22,15 +22,12 @@ class BaseModel:
         db.session.delete(self)
         db.session.commit()
     
-    def to_dict(self):
-        """Convert model to dictionary."""
-        result = {}
-        for column in self.__table__.columns:
-            value = getattr(self, column.name)
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            result[column.name] = value
-        return result
+    def to_dict(self, fields=None, exclude=None):
+        """Convert model to dictionary, optionally limited to the given column names.
+        
+        Uses the serializer compiled for this model class in models/__init__.py.
+        """
+        return type(self).__serializer__.for_object(fields, exclude)(self)
     
     def update(self, **kwargs):
         """Update model attributes."""
@@ -0,0 +1,143 @@
+import hashlib
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from .base import db
+
+class ContentBlob(db.Model):
+    """Compressed, content-addressed storage for original study notes.
+
+    Identical notes share one row keyed by their SHA-256; ref_count tracks
+    how many flashcard sets point at it and the row is removed at zero.
+    """
+
+    __tablename__ = 'content_blobs'
+
+    hash = db.Column(db.String(64), primary_key=True)
+    codec = db.Column(db.String(10), default='zlib', nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    original_size = db.Column(db.Integer, nullable=False)
+    compressed_size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, default=1, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    COMPRESSION_LEVEL = 6
+
+    @staticmethod
+    def hash_text(text):
+        """Get the content address for a piece of text."""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def compress(text):
+        return zlib.compress(text.encode('utf-8'), ContentBlob.COMPRESSION_LEVEL)
+
+    @staticmethod
+    def decompress(data, codec='zlib'):
+        if codec != 'zlib':
+            raise ValueError(f"Unsupported content codec: {codec}")
+        return zlib.decompress(data).decode('utf-8')
+
+    @classmethod
+    def acquire(cls, text):
+        """Store text (or add a reference to an identical stored copy) and return its hash.
+
+        Runs as a single upsert in the current transaction; the caller commits.
+        """
+        content_hash = cls.hash_text(text)
+        data = cls.compress(text)
+        values = {
+            'hash': content_hash,
+            'codec': 'zlib',
+            'data': data,
+            'original_size': len(text.encode('utf-8')),
+            'compressed_size': len(data),
+            'ref_count': 1,
+            'created_at': datetime.utcnow()
+        }
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            statement = sqlite_insert(cls.__table__).values(**values).on_conflict_do_update(
+                index_elements=['hash'], set_={'ref_count': cls.__table__.c.ref_count + 1}
+            )
+        elif dialect == 'postgresql':
+            statement = postgresql_insert(cls.__table__).values(**values).on_conflict_do_update(
+                index_elements=['hash'], set_={'ref_count': cls.__table__.c.ref_count + 1}
+            )
+        elif dialect in ('mysql', 'mariadb'):
+            statement = mysql_insert(cls.__table__).values(**values).on_duplicate_key_update(
+                ref_count=cls.__table__.c.ref_count + 1
+            )
+        else:
+            updated = cls.query.filter_by(hash=content_hash).update(
+                {cls.ref_count: cls.ref_count + 1}, synchronize_session=False
+            )
+            if not updated:
+                db.session.add(cls(**values))
+            return content_hash
+
+        db.session.execute(statement)
+        return content_hash
+
+    @classmethod
+    def release(cls, counts: Dict[str, int]):
+        """Drop references ({hash: count}) and delete blobs nobody points at.
+
+        Runs in the current transaction; the caller commits.
+        """
+        if not counts:
+            return 0
+
+        table = cls.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.hash == db.bindparam('b_hash'))
+            .values(ref_count=table.c.ref_count - db.bindparam('b_count')),
+            [{'b_hash': content_hash, 'b_count': count} for content_hash, count in counts.items()]
+        )
+        return cls.query.filter(cls.hash.in_(list(counts)), cls.ref_count <= 0) \
+            .delete(synchronize_session=False)
+
+    @classmethod
+    def get_text(cls, content_hash):
+        """Load and decompress one blob."""
+        row = db.session.query(cls.data, cls.codec).filter_by(hash=content_hash).first()
+        return cls.decompress(row[0], row[1]) if row else None
+
+    @classmethod
+    def get_texts(cls, hashes: Iterable[str]):
+        """Load and decompress several blobs with one query."""
+        hashes = list(set(hashes))
+        if not hashes:
+            return {}
+        rows = db.session.query(cls.hash, cls.data, cls.codec).filter(cls.hash.in_(hashes)).all()
+        return {content_hash: cls.decompress(data, codec) for content_hash, data, codec in rows}
+
+    @classmethod
+    def get_storage_report(cls):
+        """Summarize logical vs stored size of all notes."""
+        from .flashcard import FlashcardSet
+
+        logical_bytes = db.session.query(
+            db.func.coalesce(db.func.sum(cls.original_size * cls.ref_count), 0)
+        ).scalar()
+        unique_bytes, stored_bytes, blobs = db.session.query(
+            db.func.coalesce(db.func.sum(cls.original_size), 0),
+            db.func.coalesce(db.func.sum(cls.compressed_size), 0),
+            db.func.count(cls.hash)
+        ).one()
+        sets = db.session.query(db.func.count(FlashcardSet.id)).scalar()
+
+        return {
+            'flashcard_sets': sets,
+            'unique_blobs': blobs,
+            'logical_bytes': int(logical_bytes),
+            'unique_bytes': int(unique_bytes),
+            'stored_bytes': int(stored_bytes),
+            'bytes_saved': int(logical_bytes) - int(stored_bytes),
+            'savings_ratio': round(1 - stored_bytes / logical_bytes, 4) if logical_bytes else 0.0
+        }
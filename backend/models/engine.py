@@ -0,0 +1,81 @@
+import logging
+from typing import Dict, Mapping
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from .base import db
+
+logger = logging.getLogger(__name__)
+
+# Pragmas are applied in this order; journal_mode goes first so later settings
+# apply to the WAL connection.
+PRAGMA_ORDER = ['journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size', 'temp_store']
+
+def is_sqlite_url(url: str) -> bool:
+    """Check if a database URL points at SQLite."""
+    return make_url(url).get_backend_name() == 'sqlite'
+
+def is_memory_sqlite_url(url: str) -> bool:
+    """Check if a database URL is an in-memory SQLite database."""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == 'sqlite' and parsed.database in (None, '', ':memory:')
+
+def build_engine_options(url: str, settings: Mapping) -> Dict:
+    """Build SQLAlchemy engine options (pool sizing etc.) for a database URL."""
+
+    options = {}
+
+    # In-memory SQLite uses a single shared connection; pool sizing does not apply
+    if is_memory_sqlite_url(url):
+        return options
+
+    options['pool_size'] = settings.get('DATABASE_POOL_SIZE', 5)
+    options['max_overflow'] = settings.get('DATABASE_MAX_OVERFLOW', 10)
+    options['pool_timeout'] = settings.get('DATABASE_POOL_TIMEOUT', 30)
+
+    if is_sqlite_url(url):
+        # SQLite file connections never go stale, and busy_timeout handles waiting
+        options['connect_args'] = {'check_same_thread': False}
+    else:
+        options['pool_recycle'] = settings.get('DATABASE_POOL_RECYCLE', 1800)
+        options['pool_pre_ping'] = settings.get('DATABASE_POOL_PRE_PING', True)
+
+    return options
+
+def attach_sqlite_pragmas(engine, pragmas: Mapping):
+    """Run the configured PRAGMA statements on every new SQLite connection."""
+
+    statements = []
+    for name in PRAGMA_ORDER:
+        if pragmas.get(name) is not None:
+            statements.append(f"PRAGMA {name}={pragmas[name]}")
+    for name, value in pragmas.items():
+        if name not in PRAGMA_ORDER and value is not None:
+            statements.append(f"PRAGMA {name}={value}")
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return statements
+
+def init_db(app):
+    """Initialize the database extension with the tuning profile for this config."""
+
+    url = app.config['SQLALCHEMY_DATABASE_URI']
+    engine_options = build_engine_options(url, app.config)
+    engine_options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
+    db.init_app(app)
+
+    if is_sqlite_url(url) and app.config.get('SQLITE_TUNING_ENABLED', True):
+        with app.app_context():
+            statements = attach_sqlite_pragmas(db.engine, app.config.get('SQLITE_PRAGMAS', {}))
+        logger.info(f"Applied SQLite profile: {', '.join(statements)}")
+
+    return db
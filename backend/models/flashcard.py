@@ -1,5 +1,12 @@
 from .base import db, BaseModel
-from datetime import datetime
+from .content_blob import ContentBlob
+from .study import StudyEvent
+from .search import SearchIndex
+from .session import Session
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import load_only
+from utils.spaced_repetition import DEFAULT_EASE, next_schedule
 
 class FlashcardSet(BaseModel, db.Model):
     """Flashcard set model to group related flashcards."""
@@ -8,13 +15,23 @@ class FlashcardSet(BaseModel, db.Model):
     
     session_id = db.Column(db.String(36), db.ForeignKey('sessions.id'), nullable=False)
     title = db.Column(db.String(255), nullable=True)
-    original_content = db.Column(db.Text, nullable=False)
+    content_hash = db.Column(db.String(64), db.ForeignKey('content_blobs.hash'), nullable=False, index=True)
     content_length = db.Column(db.Integer, nullable=False)
     generation_method = db.Column(db.String(50), default='ai', nullable=False)  # 'ai' or 'fallback'
+    version = db.Column(db.Integer, default=1, server_default='1', nullable=False)  # bumped on every change to the set or its cards
     
     # Relationship with flashcards
     flashcards = db.relationship('Flashcard', backref='flashcard_set', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # Supports keyset pagination of a session's sets, newest first
+        db.Index('ix_flashcard_sets_session_created', 'session_id', 'created_at', 'id'),
+    )
+    
+    # Columns returned by the list endpoint unless fields= asks for more
+    LIST_FIELDS = ('id', 'session_id', 'title', 'content_length', 'generation_method',
+                   'version', 'created_at', 'updated_at', 'flashcard_count')
+    
     def __init__(self, session_id, original_content, title=None, **kwargs):
         super().__init__(**kwargs)
         self.session_id = session_id
@@ -22,6 +39,31 @@ class FlashcardSet(BaseModel, db.Model):
         self.content_length = len(original_content)
         self.title = title or self._generate_title()
     
+    @property
+    def original_content(self):
+        """The notes text, decompressed from content_blobs on first access."""
+        text = self.__dict__.get('_original_content')
+        if text is None and self.content_hash:
+            text = ContentBlob.get_text(self.content_hash)
+            self.__dict__['_original_content'] = text
+        return text
+    
+    @original_content.setter
+    def original_content(self, text):
+        previous_hash = self.content_hash
+        self.content_hash = ContentBlob.acquire(text)
+        if previous_hash:
+            ContentBlob.release({previous_hash: 1})
+        self.__dict__['_original_content'] = text
+    
+    def delete(self):
+        """Delete the set, its study history and its reference to the stored notes."""
+        ContentBlob.release({self.content_hash: 1})
+        StudyEvent.delete_for_sets([self.id])
+        SearchIndex.delete_for_sets([self.id])
+        Session.bump_sets_version(self.session_id)
+        super().delete()
+    
     def _generate_title(self):
         """Generate a title from the content."""
         words = self.original_content.split()
@@ -36,6 +78,7 @@ class FlashcardSet(BaseModel, db.Model):
         
         flashcard = Flashcard(
             set_id=self.id,
+            session_id=self.session_id,
             question=question,
             answer=answer,
             difficulty_level=difficulty,
@@ -47,34 +90,142 @@ class FlashcardSet(BaseModel, db.Model):
         """Get flashcards in order."""
         return Flashcard.query.filter_by(set_id=self.id).order_by(Flashcard.card_order).all()
     
-    def to_dict(self, include_flashcards=False):
+    def to_dict(self, include_flashcards=False, fields=None, flashcard_count=None):
         """Convert flashcard set to dictionary."""
-        data = super().to_dict()
-        data['flashcard_count'] = len(self.flashcards)
+        data = super().to_dict(fields=fields)
+        
+        if fields is None or 'original_content' in fields:
+            data['original_content'] = self.original_content
+        
+        flashcards = Flashcard.serialize_for_set(self.id) if include_flashcards else None
+        if fields is None or 'flashcard_count' in fields:
+            if flashcard_count is None:
+                flashcard_count = len(flashcards) if flashcards is not None else self.count_flashcards()
+            data['flashcard_count'] = flashcard_count
         
         if include_flashcards:
-            data['flashcards'] = [card.to_dict() for card in self.get_flashcards_ordered()]
+            data['flashcards'] = flashcards
         
         return data
     
+    def count_flashcards(self):
+        """Number of cards in the set, counted in SQL unless the cards are already loaded."""
+        if 'flashcards' in self.__dict__:
+            return len(self.flashcards)
+        return db.session.query(func.count(Flashcard.id)).filter(Flashcard.set_id == self.id).scalar()
+    
+    @classmethod
+    def get_version(cls, set_id, session_id):
+        """Get the current version of a session's set, or None if it does not exist."""
+        row = db.session.query(cls.version).filter_by(id=set_id, session_id=session_id).first()
+        return row[0] if row else None
+    
+    @classmethod
+    def bump_version(cls, set_id):
+        """Atomically increment a set's version so cached copies are no longer used."""
+        cls.query.filter_by(id=set_id).update(
+            {cls.version: cls.version + 1, cls.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        Session.bump_sets_version_for_set(set_id)
+        db.session.commit()
+    
+    @classmethod
+    def get_session_statistics(cls, session_id):
+        """Per-set study totals for every set in a session, from one grouped query."""
+        pending = StudyEvent.pending_card_totals(session_id=session_id)
+        times_studied, times_correct, _ = Flashcard._statistics_columns(pending)
+        
+        return db.session.query(
+            cls.id,
+            cls.title,
+            func.count(Flashcard.id),
+            func.coalesce(func.sum(db.case((times_studied > 0, 1), else_=0)), 0),
+            func.coalesce(func.sum(times_studied), 0),
+            func.coalesce(func.sum(times_correct), 0)
+        ).join(Flashcard, Flashcard.set_id == cls.id) \
+            .outerjoin(pending, pending.c.card_id == Flashcard.id) \
+            .filter(cls.session_id == session_id) \
+            .group_by(cls.id, cls.title, cls.created_at) \
+            .order_by(cls.created_at.desc()) \
+            .all()
+    
+    @classmethod
+    def get_page_for_session(cls, session_id, limit, after=None, fields=None):
+        """Get one keyset page of a session's sets, newest first.
+        
+        `after` is the (created_at, id) of the last row of the previous page.
+        Only the requested columns are loaded, so original_content stays on
+        disk unless it is asked for. Returns (sets, counts_by_set_id, has_more).
+        """
+        fields = fields or cls.LIST_FIELDS
+        columns = [getattr(cls, name) for name in fields
+                   if name in cls.__table__.columns.keys()]
+        # Keyset columns are always needed to build the next cursor
+        columns += [cls.id, cls.created_at]
+        if 'original_content' in fields:
+            columns.append(cls.content_hash)
+        
+        query = cls.query.options(load_only(*columns)).filter(cls.session_id == session_id)
+        if after is not None:
+            created_at, set_id = after
+            query = query.filter(or_(
+                cls.created_at < created_at,
+                and_(cls.created_at == created_at, cls.id < set_id)
+            ))
+        
+        rows = query.order_by(cls.created_at.desc(), cls.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        if rows and 'original_content' in fields:
+            texts = ContentBlob.get_texts(row.content_hash for row in rows)
+            for row in rows:
+                row.__dict__['_original_content'] = texts.get(row.content_hash)
+        
+        counts = {}
+        if rows and 'flashcard_count' in fields:
+            counts = dict(
+                db.session.query(Flashcard.set_id, func.count(Flashcard.id))
+                .filter(Flashcard.set_id.in_([row.id for row in rows]))
+                .group_by(Flashcard.set_id)
+                .all()
+            )
+        
+        return rows, counts, has_more
+    
     @classmethod
     def create_set_with_flashcards(cls, session_id, original_content, flashcards_data, title=None, generation_method='ai'):
-        """Create a flashcard set with flashcards in one transaction."""
+        """Create a flashcard set with flashcards in one transaction.
+        
+        The cards go in with one flush (a single executemany INSERT), so the
+        set is not committed and reloaded once per card.
+        """
         flashcard_set = cls(
             session_id=session_id,
             original_content=original_content,
             title=title,
             generation_method=generation_method
-        ).save()
+        )
+        db.session.add(flashcard_set)
+        db.session.flush()
         
-        for i, card_data in enumerate(flashcards_data):
-            flashcard_set.add_flashcard(
+        db.session.add_all([
+            Flashcard(
+                set_id=flashcard_set.id,
+                session_id=session_id,
                 question=card_data['question'],
                 answer=card_data['answer'],
-                difficulty=card_data.get('difficulty', 'medium'),
+                difficulty_level=card_data.get('difficulty', 'medium'),
                 card_order=i + 1
             )
+            for i, card_data in enumerate(flashcards_data)
+        ])
+        db.session.flush()
         
+        SearchIndex.index_set(flashcard_set)
+        Session.bump_sets_version(session_id)
+        db.session.commit()
         return flashcard_set
 
 class Flashcard(BaseModel, db.Model):
@@ -83,6 +234,7 @@ class Flashcard(BaseModel, db.Model):
     __tablename__ = 'flashcards'
     
     set_id = db.Column(db.String(36), db.ForeignKey('flashcard_sets.id'), nullable=False)
+    session_id = db.Column(db.String(36), nullable=False)  # copied from the set for the due-card index
     question = db.Column(db.Text, nullable=False)
     answer = db.Column(db.Text, nullable=False)
     card_order = db.Column(db.Integer, nullable=False)
@@ -94,9 +246,22 @@ class Flashcard(BaseModel, db.Model):
     times_correct = db.Column(db.Integer, default=0, nullable=False)
     last_studied = db.Column(db.DateTime, nullable=True)
     
-    def __init__(self, set_id, question, answer, card_order, difficulty_level='medium', **kwargs):
+    # SM-2 schedule
+    ease_factor = db.Column(db.Float, default=DEFAULT_EASE, server_default=str(DEFAULT_EASE), nullable=False)
+    interval_days = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    repetitions = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    due_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    schedule_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # bumped by every SM-2 write
+    
+    __table_args__ = (
+        db.Index('ix_flashcards_session_due', 'session_id', 'due_at'),
+        db.Index('ix_flashcards_set_order', 'set_id', 'card_order'),
+    )
+    
+    def __init__(self, set_id, question, answer, card_order, difficulty_level='medium', session_id=None, **kwargs):
         super().__init__(**kwargs)
         self.set_id = set_id
+        self.session_id = session_id
         self.question = question.strip()
         self.answer = answer.strip()
         self.card_order = card_order
@@ -122,10 +287,204 @@ class Flashcard(BaseModel, db.Model):
         data['success_rate'] = self.get_success_rate()
         return data
     
+    @classmethod
+    def serialize_for_set(cls, set_id, include=None, exclude=None):
+        """Serialize a set's cards in order straight from Core rows, without ORM objects."""
+        columns, serialize = cls.__serializer__.for_rows(include, exclude)
+        rows = db.session.execute(
+            db.select(*columns).where(cls.set_id == set_id).order_by(cls.card_order)
+        )
+        
+        cards = []
+        for row in rows:
+            data = serialize(row)
+            if 'times_studied' in data and 'times_correct' in data:
+                studied = data['times_studied']
+                data['success_rate'] = (data['times_correct'] / studied) * 100 if studied else 0
+            cards.append(data)
+        return cards
+    
+    @classmethod
+    def _statistics_columns(cls, pending):
+        """Card counters with not-yet-rolled-up events folded in, as SQL expressions."""
+        times_studied = cls.times_studied + func.coalesce(pending.c.attempts, 0)
+        times_correct = cls.times_correct + func.coalesce(pending.c.correct, 0)
+        last_studied = db.case(
+            (pending.c.last_studied.is_(None), cls.last_studied),
+            (cls.last_studied.is_(None), pending.c.last_studied),
+            (pending.c.last_studied > cls.last_studied, pending.c.last_studied),
+            else_=cls.last_studied
+        )
+        return times_studied, times_correct, last_studied
+    
+    @classmethod
+    def get_set_statistics(cls, set_id, question_length=50):
+        """Set totals from one aggregate query, plus a lazy stream of per-card tuples.
+        
+        Returns (totals, rows) where rows yields (id, question, times_studied,
+        times_correct, last_studied) in card order, with questions already
+        truncated by the database.
+        """
+        pending = StudyEvent.pending_card_totals(set_id=set_id)
+        times_studied, times_correct, last_studied = cls._statistics_columns(pending)
+        
+        total_cards, studied_cards, total_attempts, total_correct = db.session.query(
+            func.count(cls.id),
+            func.coalesce(func.sum(db.case((times_studied > 0, 1), else_=0)), 0),
+            func.coalesce(func.sum(times_studied), 0),
+            func.coalesce(func.sum(times_correct), 0)
+        ).outerjoin(pending, pending.c.card_id == cls.id).filter(cls.set_id == set_id).one()
+        
+        question = db.case(
+            (func.length(cls.question) > question_length,
+             func.substr(cls.question, 1, question_length, type_=db.Text) + '...'),
+            else_=cls.question
+        )
+        rows = db.session.execute(
+            db.select(cls.id, question, times_studied, times_correct, last_studied)
+            .outerjoin(pending, pending.c.card_id == cls.id)
+            .where(cls.set_id == set_id)
+            .order_by(cls.card_order)
+            .execution_options(yield_per=500)
+        )
+        
+        totals = {
+            'total_cards': total_cards,
+            'studied_cards': studied_cards,
+            'total_attempts': total_attempts,
+            'total_correct': total_correct
+        }
+        return totals, rows
+    
+    @classmethod
+    def schedule_answers(cls, set_id, answers, now=None, max_attempts=5):
+        """Apply SM-2 to (card_id, quality) answers, normally with one executemany UPDATE.
+        
+        New values, due date included, are computed in Python from each
+        card's current values, so no dialect-specific date arithmetic is
+        needed. The set version (and the owning session's sets_version) is
+        bumped first, which locks the set row until commit, so concurrent
+        submissions to a set queue behind each other. Cards are still written
+        with a compare-and-set UPDATE on their integer schedule_version, not
+        on the values read: a FLOAT ease (single precision on MySQL) or a
+        DATETIME with truncated microseconds would not compare equal. A card
+        that changed anyway is re-read and retried instead of overwritten.
+        Runs in the current transaction and the caller commits.
+        """
+        if not answers:
+            return 0
+        
+        now = now or datetime.utcnow()
+        qualities = {}
+        for card_id, quality in answers:
+            qualities.setdefault(card_id, []).append(quality)
+        
+        # Bumping the set first takes its row lock (SQLite: the write lock)
+        # before any card is read, so submissions to one set run in turn
+        FlashcardSet.query.filter_by(id=set_id).update(
+            {FlashcardSet.version: FlashcardSet.version + 1, FlashcardSet.updated_at: now},
+            synchronize_session=False
+        )
+        Session.bump_sets_version_for_set(set_id)
+        
+        cards = cls.__table__
+        compare_and_set = cards.update().where(
+            cards.c.id == db.bindparam('b_card_id'),
+            cards.c.set_id == set_id,
+            cards.c.schedule_version == db.bindparam('b_old_version')
+        ).values(
+            ease_factor=db.bindparam('b_ease'),
+            interval_days=db.bindparam('b_interval'),
+            repetitions=db.bindparam('b_repetitions'),
+            due_at=db.bindparam('b_due'),
+            schedule_version=cards.c.schedule_version + 1
+        )
+        state = db.select(cards.c.id, cards.c.ease_factor, cards.c.interval_days, cards.c.repetitions,
+                          cards.c.schedule_version).where(cards.c.set_id == set_id)
+        sane_rowcount = db.session.get_bind().dialect.supports_sane_multi_rowcount
+        
+        pending = set(qualities)
+        for _ in range(max_attempts):
+            updates = []
+            for card_id, ease, interval, repetitions, version in db.session.execute(
+                    state.where(cards.c.id.in_(pending))):
+                new_ease, new_interval, new_repetitions = ease, interval, repetitions
+                for quality in qualities[card_id]:
+                    new_ease, new_interval, new_repetitions = next_schedule(new_ease, new_interval,
+                                                                            new_repetitions, quality)
+                updates.append({
+                    'b_card_id': card_id, 'b_old_version': version, 'b_ease': new_ease,
+                    'b_interval': new_interval, 'b_repetitions': new_repetitions,
+                    'b_due': now + timedelta(days=new_interval)
+                })
+            if not updates:
+                break
+            
+            result = db.session.execute(compare_and_set, updates)
+            if sane_rowcount and result.rowcount == len(updates):
+                break
+            
+            # Keep the cards now one version past what we read (with the set
+            # locked, nobody else can have moved them there) and retry the rest
+            expected = {update['b_card_id']: update['b_old_version'] + 1 for update in updates}
+            pending = {
+                card_id for card_id, version in db.session.execute(
+                    db.select(cards.c.id, cards.c.schedule_version).where(cards.c.id.in_(expected)))
+                if version != expected[card_id]
+            }
+            if not pending:
+                break
+        else:
+            raise RuntimeError("Cards were updated concurrently too many times, try again")
+        
+        return len(answers)
+    
+    @classmethod
+    def get_due(cls, session_id, limit, now=None, include=None):
+        """The session's most overdue cards, oldest due date first.
+        
+        Served by a range scan of ix_flashcards_session_due that stops after
+        limit rows; no sort over the session's cards.
+        """
+        columns, serialize = cls.__serializer__.for_rows(include)
+        rows = db.session.execute(
+            db.select(*columns)
+            .where(cls.session_id == session_id, cls.due_at <= (now or datetime.utcnow()))
+            .order_by(cls.due_at)
+            .limit(limit)
+        )
+        return [serialize(row) for row in rows]
+    
+    @classmethod
+    def stream_for_session(cls, session_id, batch_size=1000):
+        """Stream (set_id, set_title, card_id, question, answer, difficulty_level, card_order)
+        for every card of a session, sets oldest first and cards in order.
+        
+        Rows come from a server-side cursor in batches of batch_size. The order
+        follows ix_flashcard_sets_session_created and ix_flashcards_set_order,
+        so the database never sorts and the first rows arrive immediately.
+        """
+        return db.session.execute(
+            db.select(FlashcardSet.id, FlashcardSet.title, cls.id, cls.question, cls.answer,
+                      cls.difficulty_level, cls.card_order)
+            .join(cls, cls.set_id == FlashcardSet.id)
+            .where(FlashcardSet.session_id == session_id)
+            .order_by(FlashcardSet.created_at, FlashcardSet.id, cls.card_order)
+            .execution_options(yield_per=batch_size)
+        )
+    
+    @classmethod
+    def filter_ids_in_set(cls, set_id, card_ids):
+        """Return the subset of card_ids that belong to the set, with one query."""
+        if not card_ids:
+            return set()
+        rows = db.session.query(cls.id).filter(cls.set_id == set_id, cls.id.in_(card_ids)).all()
+        return {row[0] for row in rows}
+    
     @classmethod
     def get_by_set(cls, set_id, ordered=True):
         """Get all flashcards for a set."""
         query = cls.query.filter_by(set_id=set_id)
         if ordered:
             query = query.order_by(cls.card_order)
-        return query.all()
\ No newline at end of file
+        return query.all()
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from .base import db
+
+class IdempotencyKey(db.Model):
+    """Outcome of a request made with an Idempotency-Key header.
+
+    A row is inserted as 'in_progress' when the first request claims the
+    key and completed with the response it produced; retries replay that
+    response. Rows are keyed by a hash of (scope, key) and expire after
+    a TTL.
+    """
+
+    __tablename__ = 'idempotency_keys'
+
+    IN_PROGRESS = 'in_progress'
+    COMPLETED = 'completed'
+
+    id = db.Column(db.String(64), primary_key=True)  # sha256 of scope + client key
+    session_id = db.Column(db.String(36), nullable=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(16), nullable=False)
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.LargeBinary, nullable=True)
+    response_type = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_idempotency_keys_expires_at', 'expires_at'),
+    )
+
+    @classmethod
+    def get_state(cls, record_id):
+        """Current (fingerprint, status, response_status, response_body, response_type, expires_at), or None.
+
+        Read with a Core select so repeated polls never see a stale ORM instance.
+        """
+        table = cls.__table__
+        return db.session.execute(
+            db.select(table.c.fingerprint, table.c.status, table.c.response_status,
+                      table.c.response_body, table.c.response_type, table.c.expires_at)
+            .where(table.c.id == record_id)
+        ).first()
+
+    @classmethod
+    def claim(cls, record_id, fingerprint, session_id=None, ttl=86400, lock_timeout=300, now=None):
+        """Try to claim a key for a new request. Returns True if this caller owns it.
+
+        An existing row is taken over only when it has expired or when its
+        owner has held it in progress for longer than lock_timeout seconds
+        (a crashed worker); otherwise the caller must wait or replay.
+        """
+        now = now or datetime.utcnow()
+        table = cls.__table__
+        values = {
+            'fingerprint': fingerprint,
+            'session_id': session_id,
+            'status': cls.IN_PROGRESS,
+            'response_status': None,
+            'response_body': None,
+            'response_type': None,
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=ttl)
+        }
+
+        try:
+            db.session.execute(table.insert().values(id=record_id, **values))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+
+        stale = now - timedelta(seconds=lock_timeout)
+        taken = db.session.execute(
+            table.update()
+            .where(table.c.id == record_id)
+            .where(db.or_(table.c.expires_at < now,
+                          db.and_(table.c.status == cls.IN_PROGRESS, table.c.created_at < stale)))
+            .values(**values)
+        ).rowcount
+        db.session.commit()
+        return taken == 1
+
+    @classmethod
+    def complete(cls, record_id, status_code, body, content_type):
+        """Store the response of a claimed key so retries can replay it."""
+        table = cls.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.id == record_id, table.c.status == cls.IN_PROGRESS)
+            .values(status=cls.COMPLETED, response_status=status_code,
+                    response_body=body, response_type=content_type)
+        )
+        db.session.commit()
+
+    @classmethod
+    def release(cls, record_id):
+        """Drop a claim whose request failed, so a retry runs the request again."""
+        table = cls.__table__
+        db.session.execute(
+            table.delete().where(table.c.id == record_id, table.c.status == cls.IN_PROGRESS)
+        )
+        db.session.commit()
+
+    @classmethod
+    def delete_expired_batch(cls, batch_size=500, now=None):
+        """Delete up to batch_size expired keys; returns the number deleted."""
+        now = now or datetime.utcnow()
+        expired = db.session.query(cls.id).filter(cls.expires_at < now).limit(batch_size).scalar_subquery()
+        deleted = cls.query.filter(cls.id.in_(expired)).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    @classmethod
+    def delete_for_sessions(cls, session_ids):
+        """Delete the keys recorded for the given sessions; the caller commits."""
+        return cls.query.filter(cls.session_id.in_(session_ids)).delete(synchronize_session=False)
@@ -0,0 +1,239 @@
+import html
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import DDL, event, text
+from .base import db
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+class SearchIndex:
+    """SQLite FTS5 index over set titles and notes and card questions and answers.
+
+    One row per set (title + decompressed notes) and one per card
+    (question + answer). Notes are stored compressed in content_blobs, so
+    triggers cannot see their text; the model layer keeps the index in sync
+    instead (set creation, title changes, set deletion and the session
+    reaper). The scope column holds one token per owning session and set
+    ("s<hex>" and "t<hex>"), so session scoping and deletes are index
+    lookups rather than scans of the UNINDEXED columns.
+
+    On other databases the index is absent: writes are no-ops and searching
+    is reported as unavailable.
+    """
+
+    table_name = 'search_index'
+
+    CREATE_SQL = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "scope, title, body, kind UNINDEXED, set_id UNINDEXED, ref_id UNINDEXED, "
+        "tokenize = 'porter unicode61')"
+    )
+
+    # bm25 column weights: scope, title, body
+    RANK_SQL = "bm25(search_index, 0.0, 2.0, 1.0)"
+
+    SNIPPET_TOKENS = 12
+    HIGHLIGHT_OPEN = '<mark>'
+    HIGHLIGHT_CLOSE = '</mark>'
+
+    # FTS5 wraps matches in these control characters; the text is HTML-escaped
+    # before they are swapped for the highlight tags
+    _MATCH_OPEN = '\x02'
+    _MATCH_CLOSE = '\x03'
+
+    @staticmethod
+    def is_available() -> bool:
+        return db.session.get_bind().dialect.name == 'sqlite'
+
+    @staticmethod
+    def session_token(session_id: str) -> str:
+        return 's' + session_id.replace('-', '')
+
+    @staticmethod
+    def set_token(set_id: str) -> str:
+        return 't' + set_id.replace('-', '')
+
+    @staticmethod
+    def build_match_query(query: str) -> Optional[str]:
+        """Turn free text into an FTS5 query: all words must match, the last one as a prefix.
+
+        Every word is quoted, so user input can never be parsed as FTS5
+        syntax. Returns None if the text has no searchable words.
+        """
+        terms = TOKEN_PATTERN.findall(query or '')
+        if not terms:
+            return None
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return '{title body}: (' + ' '.join(quoted) + ')'
+
+    @classmethod
+    def _scope_match(cls, tokens: Iterable[str]) -> str:
+        return 'scope: (' + ' OR '.join(tokens) + ')'
+
+    @classmethod
+    def _rows_for_set(cls, session_id, set_id, title, notes, cards):
+        scope = f"{cls.session_token(session_id)} {cls.set_token(set_id)}"
+        rows = [{'scope': scope, 'title': title or '', 'body': notes or '',
+                 'kind': 'set', 'set_id': set_id, 'ref_id': set_id}]
+        rows.extend(
+            {'scope': scope, 'title': question, 'body': answer,
+             'kind': 'card', 'set_id': set_id, 'ref_id': card_id}
+            for card_id, question, answer in cards
+        )
+        return rows
+
+    @classmethod
+    def _insert(cls, rows: List[Dict]):
+        if rows:
+            db.session.execute(
+                text("INSERT INTO search_index (scope, title, body, kind, set_id, ref_id) "
+                     "VALUES (:scope, :title, :body, :kind, :set_id, :ref_id)"),
+                rows
+            )
+
+    @classmethod
+    def _delete_matching(cls, tokens: List[str]) -> int:
+        if not tokens or not cls.is_available():
+            return 0
+        result = db.session.execute(
+            text("DELETE FROM search_index WHERE rowid IN "
+                 "(SELECT rowid FROM search_index WHERE search_index MATCH :scope)"),
+            {'scope': cls._scope_match(tokens)}
+        )
+        return result.rowcount
+
+    @classmethod
+    def index_set(cls, flashcard_set):
+        """(Re)index a set and its cards; runs in the current transaction and the caller commits."""
+        if not cls.is_available():
+            return 0
+
+        from .flashcard import Flashcard
+
+        cls._delete_matching([cls.set_token(flashcard_set.id)])
+        cards = db.session.execute(
+            db.select(Flashcard.id, Flashcard.question, Flashcard.answer)
+            .where(Flashcard.set_id == flashcard_set.id)
+        ).all()
+        rows = cls._rows_for_set(flashcard_set.session_id, flashcard_set.id, flashcard_set.title,
+                                 flashcard_set.original_content, cards)
+        cls._insert(rows)
+        return len(rows)
+
+    @classmethod
+    def update_set_title(cls, set_id: str, title: str):
+        """Replace the indexed title of a set."""
+        if not cls.is_available():
+            return
+        db.session.execute(
+            text("UPDATE search_index SET title = :title WHERE rowid IN "
+                 "(SELECT rowid FROM search_index WHERE search_index MATCH :scope) AND kind = 'set'"),
+            {'title': title or '', 'scope': cls._scope_match([cls.set_token(set_id)])}
+        )
+        db.session.commit()
+
+    @classmethod
+    def delete_for_sets(cls, set_ids: List[str]) -> int:
+        """Remove sets and their cards from the index; the caller commits."""
+        return cls._delete_matching([cls.set_token(set_id) for set_id in set_ids])
+
+    @classmethod
+    def delete_for_sessions(cls, session_ids: List[str]) -> int:
+        """Remove everything owned by the sessions from the index; the caller commits."""
+        return cls._delete_matching([cls.session_token(session_id) for session_id in session_ids])
+
+    @classmethod
+    def _highlight(cls, value: str) -> str:
+        return html.escape(value or '', quote=False) \
+            .replace(cls._MATCH_OPEN, cls.HIGHLIGHT_OPEN).replace(cls._MATCH_CLOSE, cls.HIGHLIGHT_CLOSE)
+
+    @classmethod
+    def search(cls, session_id: str, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict], bool]:
+        """Ranked, highlighted matches within a session. Returns (results, has_more)."""
+        match = cls.build_match_query(query)
+        if match is None:
+            return [], False
+
+        rows = db.session.execute(
+            text(
+                "SELECT kind, set_id, ref_id, "
+                "highlight(search_index, 1, :open, :close), "
+                "snippet(search_index, 2, :open, :close, '...', :tokens), "
+                f"{cls.RANK_SQL} AS score "
+                "FROM search_index WHERE search_index MATCH :match "
+                "ORDER BY score LIMIT :limit OFFSET :offset"
+            ),
+            {
+                'open': cls._MATCH_OPEN,
+                'close': cls._MATCH_CLOSE,
+                'tokens': cls.SNIPPET_TOKENS,
+                'match': f"{cls._scope_match([cls.session_token(session_id)])} AND {match}",
+                'limit': limit + 1,
+                'offset': offset
+            }
+        ).all()
+
+        results = [
+            {
+                'type': kind,
+                'set_id': set_id,
+                'card_id': ref_id if kind == 'card' else None,
+                'title': cls._highlight(title),
+                'snippet': cls._highlight(snippet),
+                'score': round(-score, 4)
+            }
+            for kind, set_id, ref_id, title, snippet, score in rows[:limit]
+        ]
+        return results, len(rows) > limit
+
+    @classmethod
+    def rebuild(cls, batch_size: int = 500) -> Dict:
+        """Drop and repopulate the index from the sets and cards tables, then merge its segments."""
+        from .content_blob import ContentBlob
+        from .flashcard import FlashcardSet, Flashcard
+
+        db.session.execute(text("DROP TABLE IF EXISTS search_index"))
+        db.session.execute(text(cls.CREATE_SQL))
+
+        sets_indexed = 0
+        cards_indexed = 0
+        last_id = ''
+        while True:
+            batch = db.session.execute(
+                db.select(FlashcardSet.id, FlashcardSet.session_id, FlashcardSet.title, FlashcardSet.content_hash)
+                .where(FlashcardSet.id > last_id)
+                .order_by(FlashcardSet.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            notes = ContentBlob.get_texts(row[3] for row in batch)
+            cards_by_set = {}
+            for set_id, card_id, question, answer in db.session.execute(
+                db.select(Flashcard.set_id, Flashcard.id, Flashcard.question, Flashcard.answer)
+                .where(Flashcard.set_id.in_([row[0] for row in batch]))
+            ):
+                cards_by_set.setdefault(set_id, []).append((card_id, question, answer))
+
+            rows = []
+            for set_id, session_id, title, content_hash in batch:
+                cards = cards_by_set.get(set_id, [])
+                rows.extend(cls._rows_for_set(session_id, set_id, title, notes.get(content_hash), cards))
+                cards_indexed += len(cards)
+            cls._insert(rows)
+            db.session.commit()
+            sets_indexed += len(batch)
+
+        db.session.execute(text("INSERT INTO search_index(search_index) VALUES ('optimize')"))
+        db.session.commit()
+        logger.info(f"Rebuilt search index with {sets_indexed} sets and {cards_indexed} cards")
+        return {'sets': sets_indexed, 'cards': cards_indexed}
+
+# Created alongside the regular tables by db.create_all() on SQLite
+event.listen(db.metadata, 'after_create', DDL(SearchIndex.CREATE_SQL).execute_if(dialect='sqlite'))
@@ -0,0 +1,67 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+class ModelSerializer:
+    """Specialized dict serializers for one model class.
+
+    The column list is inspected once; each distinct field selection is
+    compiled into a flat function (no per-row reflection) and memoized.
+    Values are returned as loaded, datetimes included: the JSON encoder
+    (utils.json_codec) formats them.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.column_names = [column.name for column in model.__table__.columns]
+        self._object_serializers = {}
+        self._row_serializers = {}
+
+        # Compile the default (all columns) serializers up front
+        self.for_object()
+        self.for_rows()
+
+    def select_fields(self, include: Optional[Iterable[str]] = None,
+                      exclude: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+        """Resolve include/exclude lists to an ordered tuple of column names."""
+        names = self.column_names
+        if include is not None:
+            include = set(include)
+            names = [name for name in names if name in include]
+        if exclude:
+            exclude = set(exclude)
+            names = [name for name in names if name not in exclude]
+        return tuple(names)
+
+    def for_object(self, include=None, exclude=None) -> Callable[[object], Dict]:
+        """Get a serializer that reads attributes from a model instance."""
+        fields = self.select_fields(include, exclude)
+        serializer = self._object_serializers.get(fields)
+        if serializer is None:
+            serializer = self._compile(fields, 'obj', lambda name, i: f"obj.{name}")
+            self._object_serializers[fields] = serializer
+        return serializer
+
+    def for_rows(self, include=None, exclude=None) -> Tuple[List, Callable[[tuple], Dict]]:
+        """Get (columns, serializer) for Core rows selected with exactly those columns."""
+        fields = self.select_fields(include, exclude)
+        serializer = self._row_serializers.get(fields)
+        if serializer is None:
+            serializer = self._compile(fields, 'row', lambda name, i: f"row[{i}]")
+            self._row_serializers[fields] = serializer
+        columns = [self.model.__table__.c[name] for name in fields]
+        return columns, serializer
+
+    def _compile(self, fields: Tuple[str, ...], argument: str, accessor: Callable) -> Callable:
+        lines = [f"def serialize({argument}):"]
+        items = []
+        for i, name in enumerate(fields):
+            items.append(f"{name!r}: {accessor(name, i)}")
+        lines.append("    return {" + ", ".join(items) + "}")
+
+        namespace = {}
+        exec(compile("\n".join(lines), f"<serializer {self.model.__name__}>", 'exec'), namespace)
+        return namespace['serialize']
+
+def build_serializers(*models):
+    """Compile and attach a ModelSerializer to each model class."""
+    for model in models:
+        model.__serializer__ = ModelSerializer(model)
@@ -1,5 +1,8 @@
 from datetime import datetime, timedelta
+from sqlalchemy import func
 from .base import db, BaseModel
+from utils.cache import TTLCache
+from .session_filter import SessionIdFilter
 
 class Session(BaseModel, db.Model):
     """User session model for tracking anonymous users."""
@@ -9,10 +12,23 @@ class Session(BaseModel, db.Model):
     last_active = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     expires_at = db.Column(db.DateTime, nullable=False)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    sets_version = db.Column(db.Integer, default=1, server_default='1', nullable=False)  # bumped when any of the session's sets changes
     
     # Relationship with flashcard sets
     flashcard_sets = db.relationship('FlashcardSet', backref='session', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        # Supports the incremental scan that keeps the session id filter in sync
+        db.Index('ix_sessions_created_at', 'created_at'),
+    )
+    
+    # Optional Bloom filter of live ids; None until build_id_filter() runs
+    _id_filter = None
+    
+    # Validated sessions (id -> expires_at, is_active, last_active) kept in front of the database
+    _validation_cache = TTLCache(max_entries=10000, ttl=60)
+    activity_update_interval = 60  # seconds between last_active writes for a session
+    
     def __init__(self, timeout_days=30, **kwargs):
         super().__init__(**kwargs)
         self.expires_at = datetime.utcnow() + timedelta(days=timeout_days)
@@ -30,37 +46,209 @@ class Session(BaseModel, db.Model):
         """Extend session expiration."""
         self.expires_at = datetime.utcnow() + timedelta(days=days)
         db.session.commit()
+        self._cache_validation()
     
     def deactivate(self):
         """Deactivate the session."""
         self.is_active = False
         db.session.commit()
+        self._validation_cache.delete(self.id)
+    
+    def _cache_validation(self):
+        self._validation_cache.set(self.id, {
+            'expires_at': self.expires_at,
+            'is_active': self.is_active,
+            'last_active': self.last_active
+        })
     
     @classmethod
     def create_session(cls, timeout_days=30):
         """Create a new session."""
-        session = cls(timeout_days=timeout_days)
-        return session.save()
+        session = cls(timeout_days=timeout_days).save()
+        if cls._id_filter is not None:
+            cls._id_filter.add(session.id)
+        return session
+    
+    @classmethod
+    def build_id_filter(cls, capacity=100000, error_rate=0.01):
+        """Build the Bloom filter used to reject unknown session ids before querying."""
+        id_filter = SessionIdFilter(cls, capacity=capacity, error_rate=error_rate)
+        id_filter.build()
+        cls._id_filter = id_filter
+        return id_filter
+    
+    @classmethod
+    def configure_validation_cache(cls, max_entries=10000, ttl=60, activity_update_interval=60):
+        """Resize the validated-session cache (called once at app start-up)."""
+        cls._validation_cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        cls.activity_update_interval = activity_update_interval
     
     @classmethod
     def get_active_session(cls, session_id):
         """Get active session by ID."""
+        if cls._id_filter is not None and not cls._id_filter.might_exist(session_id):
+            return None
+        
         session = cls.query.filter_by(id=session_id, is_active=True).first()
         if session and not session.is_expired():
             session.update_activity()
+            session._cache_validation()
             return session
         elif session:
             session.deactivate()
         return None
     
     @classmethod
-    def cleanup_expired_sessions(cls):
-        """Remove expired sessions from database."""
-        expired_sessions = cls.query.filter(cls.expires_at < datetime.utcnow()).all()
-        for session in expired_sessions:
-            db.session.delete(session)
+    def is_session_active(cls, session_id, fresh=False):
+        """Check that a session is active, answering from the validation cache when possible.
+        
+        Expiry is always checked against the cached expires_at, so a cached
+        entry never outlives the session itself. The cache is per process:
+        a logout handled by another worker is only seen here once the entry's
+        TTL runs out, so writes pass fresh=True to read the database instead.
+        """
+        if fresh:
+            return cls._revalidate(session_id)
+        
+        entry = cls._validation_cache.get(session_id)
+        if entry is not None:
+            if entry['is_active'] and datetime.utcnow() <= entry['expires_at']:
+                return True
+            cls._validation_cache.delete(session_id)
+        
+        return cls.get_active_session(session_id) is not None
+    
+    @classmethod
+    def _revalidate(cls, session_id):
+        """Check a session against the database (one indexed read) and refresh its cache entry."""
+        row = db.session.query(cls.expires_at, cls.is_active, cls.last_active).filter(cls.id == session_id).first()
+        if row is None or not row.is_active or datetime.utcnow() > row.expires_at:
+            cls._validation_cache.delete(session_id)
+            return False
+        
+        cls._validation_cache.set(session_id, {
+            'expires_at': row.expires_at,
+            'is_active': True,
+            'last_active': row.last_active
+        })
+        return True
+    
+    @classmethod
+    def remember_validation(cls, session_id, expires_at):
+        """Cache a session validated elsewhere (e.g. by a signed token)."""
+        entry = cls._validation_cache.get(session_id)
+        if entry is None or not entry['is_active']:
+            cls._validation_cache.set(session_id, {
+                'expires_at': expires_at,
+                'is_active': True,
+                'last_active': None
+            })
+    
+    @classmethod
+    def forget_validation(cls, session_id):
+        """Drop a session from the validation cache."""
+        cls._validation_cache.delete(session_id)
+    
+    @classmethod
+    def get_revoked_ids(cls):
+        """Get ids of deactivated sessions that have not yet expired."""
+        rows = db.session.query(cls.id).filter(
+            cls.is_active.is_(False),
+            cls.expires_at > datetime.utcnow()
+        ).all()
+        return [row[0] for row in rows]
+    
+    @classmethod
+    def get_sets_version(cls, session_id):
+        """Version of the session's set collection (for list ETags), or None if unknown."""
+        row = db.session.query(cls.sets_version).filter_by(id=session_id).first()
+        return row[0] if row else None
+    
+    @classmethod
+    def bump_sets_version(cls, session_id):
+        """Mark the session's set collection as changed; the caller commits."""
+        cls.query.filter_by(id=session_id).update(
+            {cls.sets_version: cls.sets_version + 1}, synchronize_session=False
+        )
+    
+    @classmethod
+    def bump_sets_version_for_set(cls, set_id):
+        """bump_sets_version for the session owning set_id, in one UPDATE; the caller commits."""
+        cls.bump_sets_version_for_sets([set_id])
+    
+    @classmethod
+    def bump_sets_version_for_sets(cls, set_ids):
+        """bump_sets_version for every session owning one of set_ids, in one UPDATE; the caller commits."""
+        from .flashcard import FlashcardSet
+        
+        owners = db.select(FlashcardSet.session_id).where(FlashcardSet.id.in_(set_ids))
+        cls.query.filter(cls.id.in_(owners)).update(
+            {cls.sets_version: cls.sets_version + 1}, synchronize_session=False
+        )
+    
+    @classmethod
+    def touch(cls, session_id):
+        """Record activity, writing last_active at most once per activity_update_interval."""
+        now = datetime.utcnow()
+        entry = cls._validation_cache.get(session_id)
+        if entry is not None and entry['last_active'] is not None:
+            if (now - entry['last_active']).total_seconds() < cls.activity_update_interval:
+                return
+        
+        cls.query.filter_by(id=session_id).update({cls.last_active: now}, synchronize_session=False)
         db.session.commit()
-        return len(expired_sessions)
+        if entry is not None:
+            entry['last_active'] = now
+    
+    @classmethod
+    def delete_expired_batch(cls, batch_size=500, now=None):
+        """Delete up to batch_size expired sessions with set-based DELETEs.
+
+        Cards are removed first, then sets, then the sessions themselves, so
+        no ORM objects (or their cascades) are ever loaded.
+        """
+        from .flashcard import FlashcardSet, Flashcard
+        from .content_blob import ContentBlob
+        from .study import StudyEvent
+        from .search import SearchIndex
+        from .idempotency import IdempotencyKey
+
+        now = now or datetime.utcnow()
+        session_ids = [row[0] for row in db.session.query(cls.id)
+                       .filter(cls.expires_at < now)
+                       .limit(batch_size).all()]
+        if not session_ids:
+            return {'sessions': 0, 'sets': 0, 'cards': 0}
+
+        set_ids = db.session.query(FlashcardSet.id).filter(FlashcardSet.session_id.in_(session_ids))
+        blob_refs = dict(
+            db.session.query(FlashcardSet.content_hash, func.count(FlashcardSet.id))
+            .filter(FlashcardSet.session_id.in_(session_ids))
+            .group_by(FlashcardSet.content_hash)
+            .all()
+        )
+        StudyEvent.delete_for_sets(set_ids.scalar_subquery())
+        cards = Flashcard.query.filter(Flashcard.set_id.in_(set_ids.scalar_subquery())) \
+            .delete(synchronize_session=False)
+        sets = FlashcardSet.query.filter(FlashcardSet.session_id.in_(session_ids)) \
+            .delete(synchronize_session=False)
+        sessions = cls.query.filter(cls.id.in_(session_ids)).delete(synchronize_session=False)
+        ContentBlob.release(blob_refs)
+        SearchIndex.delete_for_sessions(session_ids)
+        IdempotencyKey.delete_for_sessions(session_ids)
+        db.session.commit()
+
+        return {'sessions': sessions, 'sets': sets, 'cards': cards}
+
+    @classmethod
+    def cleanup_expired_sessions(cls, batch_size=500):
+        """Remove expired sessions from database in bounded batches."""
+        total = 0
+        while True:
+            deleted = cls.delete_expired_batch(batch_size=batch_size)
+            total += deleted['sessions']
+            if deleted['sessions'] < batch_size:
+                return total
     
     def to_dict(self):
         """Convert session to dictionary."""
@@ -0,0 +1,131 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict
+from utils.bloom import BloomFilter
+from .base import db
+
+logger = logging.getLogger(__name__)
+
+class SessionIdFilter:
+    """Bloom filter of live session ids used to reject unknown ids without a query.
+
+    Built with a streaming scan of the sessions table and updated on every
+    session created in this process. Sessions created by other workers are
+    picked up by sync(), an incremental scan of live sessions created since
+    the high-water mark that the session filter sync worker runs every few
+    seconds; lookups never query. Each scan reaches sync_lookback seconds
+    behind the mark so a session committed late with an earlier created_at
+    is still picked up. Until then, a session created on another worker can
+    be rejected here. Expired sessions are never removed, which only adds
+    false positives (they still get rejected by the database lookup); the
+    filter is rebuilt at twice the size once it fills up.
+    """
+
+    def __init__(self, model, capacity: int = 100000, error_rate: float = 0.01,
+                 sync_lookback: float = 30, scan_batch_size: int = 10000):
+        self.model = model
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_lookback = sync_lookback
+        self.scan_batch_size = scan_batch_size
+
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._high_water_mark = None
+        self.rejections = 0
+        self.lookups = 0
+        self.syncs = 0
+        self.rebuilds = 0
+
+    def build(self):
+        """(Re)build the filter from a streaming scan of live sessions."""
+        model = self.model
+        live_count = db.session.query(db.func.count(model.id)).filter(
+            model.is_active.is_(True),
+            model.expires_at > datetime.utcnow()
+        ).scalar() or 0
+
+        capacity = self.capacity
+        while live_count > capacity * 0.75:
+            capacity *= 2
+
+        bloom = BloomFilter(capacity, self.error_rate)
+        high_water_mark = None
+        query = db.session.query(model.id, model.created_at).filter(
+            model.is_active.is_(True),
+            model.expires_at > datetime.utcnow()
+        ).yield_per(self.scan_batch_size)
+        for session_id, created_at in query:
+            bloom.add(session_id)
+            if high_water_mark is None or created_at > high_water_mark:
+                high_water_mark = created_at
+
+        with self._lock:
+            self.capacity = capacity
+            self._bloom = bloom
+            self._high_water_mark = high_water_mark
+            self.rebuilds += 1
+
+        logger.info(f"Built session id filter with {bloom.count} ids ({bloom.memory_bytes} bytes)")
+
+    def add(self, session_id: str):
+        with self._lock:
+            self._bloom.add(session_id)
+            needs_rebuild = self._bloom.count > self.capacity
+
+        if needs_rebuild:
+            self.capacity *= 2
+            self.build()
+
+    def sync(self):
+        """Add live sessions created by other workers since the last scan."""
+        model = self.model
+        query = db.session.query(model.id, model.created_at).filter(
+            model.is_active.is_(True),
+            model.expires_at > datetime.utcnow()
+        )
+        if self._high_water_mark is not None:
+            query = query.filter(model.created_at >= self._high_water_mark - timedelta(seconds=self.sync_lookback))
+
+        added = 0
+        for session_id, created_at in query.yield_per(self.scan_batch_size):
+            with self._lock:
+                # The lookback rescans ids already added; skip them so the count stays true
+                if session_id not in self._bloom:
+                    self._bloom.add(session_id)
+                    added += 1
+                if self._high_water_mark is None or created_at > self._high_water_mark:
+                    self._high_water_mark = created_at
+
+        with self._lock:
+            self.syncs += 1
+            needs_rebuild = self._bloom.count > self.capacity
+
+        if needs_rebuild:
+            self.capacity *= 2
+            self.build()
+        return added
+
+    def might_exist(self, session_id: str) -> bool:
+        """Return False only if the session id is definitely not a known session."""
+        self.lookups += 1
+        if session_id in self._bloom:
+            return True
+
+        self.rejections += 1
+        return False
+
+    def get_stats(self) -> Dict:
+        bloom = self._bloom
+        return {
+            'ids': bloom.count,
+            'capacity': self.capacity,
+            'memory_bytes': bloom.memory_bytes,
+            'target_error_rate': self.error_rate,
+            'estimated_error_rate': round(bloom.estimated_error_rate(), 6),
+            'lookups': self.lookups,
+            'syncs': self.syncs,
+            'rejections': self.rejections,
+            'rebuilds': self.rebuilds
+        }
@@ -0,0 +1,194 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from .base import db
+
+class StudyEvent(db.Model):
+    """Append-only log of individual study answers.
+
+    Rows are never updated; the integer id doubles as the rollup's
+    high-water mark. That relies on ids committing in order, which holds
+    on SQLite (one writer at a time); with concurrent writers (PostgreSQL,
+    MySQL) a lower id can commit after a higher one, so the rollup leaves
+    events younger than settle_seconds for a later pass.
+    """
+
+    __tablename__ = 'study_events'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    session_id = db.Column(db.String(36), nullable=False)
+    set_id = db.Column(db.String(36), nullable=False)
+    card_id = db.Column(db.String(36), nullable=False)
+    correct = db.Column(db.Boolean, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_study_events_set_created', 'set_id', 'created_at'),
+        db.Index('ix_study_events_set_id', 'set_id', 'id'),
+    )
+
+    @classmethod
+    def record_batch(cls, session_id, set_id, answers):
+        """Append (card_id, correct) answers with one multi-row INSERT."""
+        if not answers:
+            return 0
+
+        now = datetime.utcnow()
+        db.session.execute(cls.__table__.insert(), [
+            {
+                'session_id': session_id,
+                'set_id': set_id,
+                'card_id': card_id,
+                'correct': bool(correct),
+                'created_at': now
+            }
+            for card_id, correct in answers
+        ])
+        db.session.commit()
+        return len(answers)
+
+    @classmethod
+    def rollup_batch(cls, batch_size=5000, mark_name='study_events', settle_seconds=0):
+        """Fold the next batch of events into the per-card aggregates.
+        
+        Aggregates and the high-water mark move in one transaction, so each
+        event is counted exactly once. With settle_seconds the mark only
+        passes events at least that old, so an insert still in flight with
+        a lower id commits before the mark moves past it. Returns the counts
+        processed and the ids of sets whose cards changed.
+        """
+        from .flashcard import FlashcardSet, Flashcard
+        from .session import Session
+
+        high_water_mark = RollupState.get_mark(mark_name)
+        candidates = db.session.query(cls.id).filter(cls.id > high_water_mark)
+        if settle_seconds:
+            candidates = candidates.filter(cls.created_at <= datetime.utcnow() - timedelta(seconds=settle_seconds))
+        upper = db.session.query(func.max(cls.id)).filter(
+            cls.id.in_(candidates.order_by(cls.id).limit(batch_size))
+        ).scalar()
+        if upper is None:
+            return {'events': 0, 'cards': 0, 'sets': [], 'high_water_mark': high_water_mark}
+
+        correct_count = func.sum(db.case((cls.correct.is_(True), 1), else_=0))
+        window = (cls.id > high_water_mark, cls.id <= upper)
+
+        card_rows = db.session.query(
+            cls.card_id, cls.set_id, func.count(cls.id), correct_count, func.max(cls.created_at)
+        ).filter(*window).group_by(cls.card_id, cls.set_id).all()
+
+        cards = Flashcard.__table__
+        db.session.execute(
+            cards.update()
+            .where(cards.c.id == db.bindparam('b_card_id'))
+            .values(
+                times_studied=cards.c.times_studied + db.bindparam('b_attempts'),
+                times_correct=cards.c.times_correct + db.bindparam('b_correct'),
+                last_studied=db.case(
+                    (cards.c.last_studied.is_(None), db.bindparam('b_last')),
+                    (cards.c.last_studied < db.bindparam('b_last'), db.bindparam('b_last')),
+                    else_=cards.c.last_studied
+                )
+            ),
+            [
+                {'b_card_id': card_id, 'b_attempts': attempts, 'b_correct': correct, 'b_last': last}
+                for card_id, _, attempts, correct, last in card_rows
+            ]
+        )
+
+        set_ids = sorted({row[1] for row in card_rows})
+
+        # Card statistics are part of cached set payloads, and set versions
+        # part of the set list, whose ETag comes from the sessions' sets_version
+        FlashcardSet.query.filter(FlashcardSet.id.in_(set_ids)).update(
+            {FlashcardSet.version: FlashcardSet.version + 1}, synchronize_session=False
+        )
+        Session.bump_sets_version_for_sets(set_ids)
+
+        if not RollupState.advance_mark(mark_name, high_water_mark, upper):
+            # Another worker rolled this window up first
+            db.session.rollback()
+            return {'events': 0, 'cards': 0, 'sets': [], 'high_water_mark': high_water_mark}
+        db.session.commit()
+
+        return {
+            'events': sum(row[2] for row in card_rows),
+            'cards': len(card_rows),
+            'sets': set_ids,
+            'high_water_mark': upper
+        }
+
+    @classmethod
+    def pending_card_totals(cls, set_id=None, session_id=None, mark_name='study_events'):
+        """Subquery of per-card totals for events above the rollup mark.
+        
+        Columns: card_id, set_id, attempts, correct, last_studied. The mark is
+        read inside the same statement, so callers can join it in one query.
+        """
+        mark = db.session.query(RollupState.high_water_mark).filter(
+            RollupState.name == mark_name
+        ).scalar_subquery()
+        query = db.session.query(
+            cls.card_id.label('card_id'),
+            cls.set_id.label('set_id'),
+            func.count(cls.id).label('attempts'),
+            func.sum(db.case((cls.correct.is_(True), 1), else_=0)).label('correct'),
+            func.max(cls.created_at).label('last_studied')
+        ).filter(cls.id > func.coalesce(mark, 0))
+        if set_id is not None:
+            query = query.filter(cls.set_id == set_id)
+        if session_id is not None:
+            query = query.filter(cls.session_id == session_id)
+        return query.group_by(cls.card_id, cls.set_id).subquery()
+
+    @classmethod
+    def delete_for_sets(cls, set_ids):
+        """Remove events of deleted sets; the caller commits."""
+        cls.query.filter(cls.set_id.in_(set_ids)).delete(synchronize_session=False)
+
+    @classmethod
+    def accuracy_since(cls, set_id, since):
+        """Attempts and success rate for a set since a point in time."""
+        attempts, correct = db.session.query(
+            func.count(cls.id),
+            func.coalesce(func.sum(db.case((cls.correct.is_(True), 1), else_=0)), 0)
+        ).filter(cls.set_id == set_id, cls.created_at >= since).one()
+        return {
+            'attempts': attempts,
+            'success_rate': round(correct / attempts * 100, 1) if attempts else 0
+        }
+
+    @classmethod
+    def recent_accuracy(cls, set_id, days=7):
+        return cls.accuracy_since(set_id, datetime.utcnow() - timedelta(days=days))
+
+class RollupState(db.Model):
+    """High-water marks of incremental rollups, one row per rollup."""
+
+    __tablename__ = 'rollup_state'
+
+    name = db.Column(db.String(50), primary_key=True)
+    high_water_mark = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    @classmethod
+    def get_mark(cls, name):
+        row = db.session.query(cls.high_water_mark).filter_by(name=name).first()
+        return row[0] if row else 0
+
+    @classmethod
+    def advance_mark(cls, name, expected, high_water_mark):
+        """Move the mark from expected to high_water_mark in the current transaction.
+        
+        Returns False if the mark is no longer at expected (a concurrent
+        rollup won); the caller commits or rolls back.
+        """
+        updated = cls.query.filter_by(name=name, high_water_mark=expected).update(
+            {cls.high_water_mark: high_water_mark, cls.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        if updated:
+            return True
+        if expected == 0 and not cls.query.filter_by(name=name).first():
+            db.session.add(cls(name=name, high_water_mark=high_water_mark, updated_at=datetime.utcnow()))
+            return True
+        return False
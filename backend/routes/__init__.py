@@ -1,13 +1,28 @@
-from .api import api_bp
+from .api import api_bp, get_session_id
 from .health import health_bp
 
-def register_routes(app, flashcard_service=None, session_service=None, validator=None):
+def register_routes(app, flashcard_service=None, session_service=None, validator=None, health_monitor=None,
+                    set_cache=None, token_service=None, import_service=None, idempotency_service=None,
+                    rate_limiter=None):
     """Register all route blueprints with the Flask app and inject dependencies."""
     
     # Attach services + validator to api_bp
     api_bp.flashcard_service = flashcard_service
     api_bp.session_service = session_service
     api_bp.validator = validator
+    api_bp.token_service = token_service
+    api_bp.import_service = import_service
+    api_bp.idempotency_service = idempotency_service
+    
+    # Health checks and metrics only report on dependencies, they never probe or run them
+    health_bp.health_monitor = health_monitor
+    health_bp.set_cache = set_cache
+    health_bp.import_service = import_service
+    
+    # Load balancer probes are never rate limited; sessions are counted by resolved id
+    if rate_limiter is not None:
+        rate_limiter.exempt(health_bp)
+        rate_limiter.session_key_func = get_session_id
     
     app.register_blueprint(api_bp, url_prefix='/api')
-    app.register_blueprint(health_bp)
\ No newline at end of file
+    app.register_blueprint(health_bp)
@@ -1,8 +1,15 @@
 # routes/api.py
-from flask import Blueprint, request, jsonify, current_app
+import json
+from werkzeug.exceptions import RequestEntityTooLarge
+from flask import Blueprint, Response, g, request, jsonify, current_app, stream_with_context
 import logging
 
-from utils.helpers import create_json_response, sanitize_input
+from utils.helpers import (create_json_response, sanitize_input, decode_cursor, make_etag,
+                           not_modified_response, set_cache_validators)
+from models import FlashcardSet
+from utils.exporters import EXPORT_FORMATS
+from utils.rate_limit import rate_limit
+from utils.query_profiler import query_budget, uncounted_queries
 
 # Create blueprint
 api_bp = Blueprint('api', __name__)
@@ -12,20 +19,107 @@ logger = logging.getLogger(__name__)
 # -------------------------------
 # Helper Functions
 # -------------------------------
+def resolve_session_id(value):
+    """Map a signed session token to its session id; plain ids pass through."""
+    token_service = getattr(api_bp, 'token_service', None)
+    if token_service is None or not value:
+        return value
+    return token_service.resolve(value)
+
+
 def get_session_id():
-    """Get session ID from request headers or request body."""
+    """Get session ID (or signed session token) from request headers or request body."""
     session_id = request.headers.get('X-Session-ID')
     if not session_id:
         data = request.get_json(silent=True)
         if data:
             session_id = data.get('session_id')
-    return session_id
+    return resolve_session_id(session_id)
+
+
+def idempotent(view):
+    """Honour the Idempotency-Key header on this view (see idempotency_before_request)."""
+    view.idempotent = True
+    return view
+
+
+@api_bp.before_request
+def idempotency_before_request():
+    """Claim the request's Idempotency-Key, or wait for / replay the request holding it."""
+    idempotency_service = getattr(api_bp, 'idempotency_service', None)
+    key = request.headers.get('Idempotency-Key')
+    if idempotency_service is None or not key:
+        return None
+    view = current_app.view_functions.get(request.endpoint)
+    if not getattr(view, 'idempotent', False):
+        return None
+    if len(key) > 255:
+        return create_json_response(success=False, error="Idempotency-Key must be at most 255 characters",
+                                    status_code=400)
+
+    # Never replay one caller's response to another: with no session and no
+    # client address there is nothing to scope the key to
+    session_id = get_session_id()
+    if idempotency_service.scope(session_id, request.remote_addr) is None:
+        return None
+
+    try:
+        fingerprint = idempotency_service.fingerprint(request.method, request.path, request.get_data())
+        with uncounted_queries():
+            result = idempotency_service.begin(key, fingerprint, session_id=session_id,
+                                               client_address=request.remote_addr)
+    except Exception as e:
+        # Serve the request without replay protection rather than failing it
+        logger.error(f"Error checking idempotency key: {str(e)}")
+        return None
+
+    if result['action'] == idempotency_service.PROCEED:
+        g.idempotency_record = result['record_id']
+        return None
+    if result['action'] == idempotency_service.REPLAY:
+        body, status_code, content_type = result['response']
+        response = Response(body, status=status_code, content_type=content_type)
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+    if result['action'] == idempotency_service.MISMATCH:
+        return create_json_response(success=False, error="Idempotency-Key was already used for a different request",
+                                    status_code=422)
+
+    response, status_code = create_json_response(success=False, error="A request with this Idempotency-Key is still in progress",
+                                                 status_code=409)
+    response.headers['Retry-After'] = str(max(1, round(idempotency_service.poll_interval)))
+    return response, status_code
+
+
+@api_bp.after_request
+def idempotency_after_request(response):
+    """Store the response of a claimed request; server errors and 429s release the key for a retry."""
+    record_id = g.pop('idempotency_record', None)
+    if record_id is None:
+        return response
+
+    with uncounted_queries():
+        if response.status_code >= 500 or response.status_code == 429 or response.is_streamed:
+            api_bp.idempotency_service.abandon(record_id)
+        else:
+            api_bp.idempotency_service.complete(record_id, response.status_code, response.get_data(),
+                                                response.content_type)
+    return response
+
+
+@api_bp.teardown_request
+def idempotency_teardown_request(exc):
+    # after_request is skipped when the request dies with an unhandled error
+    record_id = g.pop('idempotency_record', None)
+    if record_id is not None:
+        api_bp.idempotency_service.abandon(record_id)
 
 
 # -------------------------------
 # Session Management Routes
 # -------------------------------
 @api_bp.route('/session', methods=['POST'])
+@query_budget(4)
 def create_session():
     """Create a new user session."""
     try:
@@ -53,7 +147,7 @@ def get_session(session_id):
         if not validation_result['valid']:
             return create_json_response(success=False, error=validation_result['error'], status_code=400)
 
-        result = session_service.get_session(session_id)
+        result = session_service.get_session(validation_result['session_id'])
         if result['success']:
             return create_json_response(success=True, data=result['session'])
         else:
@@ -69,7 +163,7 @@ def delete_session(session_id):
     """Deactivate a session."""
     try:
         session_service = api_bp.session_service
-        result = session_service.deactivate_session(session_id)
+        result = session_service.deactivate_session(resolve_session_id(session_id))
 
         if result['success']:
             return create_json_response(success=True, message=result['message'])
@@ -85,6 +179,9 @@ def delete_session(session_id):
 # Flashcard Routes
 # -------------------------------
 @api_bp.route('/process-notes', methods=['POST'])
+@query_budget(15)
+@rate_limit('RATELIMIT_PROCESS_NOTES')
+@idempotent
 def process_notes():
     """Process study notes and generate flashcards."""
     try:
@@ -97,12 +194,14 @@ def process_notes():
             return create_json_response(success=False, error="No JSON data provided", status_code=400)
 
         # Get or create session
-        session_id = data.get('session_id') or get_session_id()
+        session_id = resolve_session_id(data.get('session_id')) or get_session_id()
+        session_token = None
         if not session_id:
             session_result = session_service.create_session()
             if not session_result['success']:
                 return create_json_response(success=False, error="Failed to create session", status_code=500)
             session_id = session_result['session']['id']
+            session_token = session_result['session'].get('token')
 
         # Validate notes content
         content = data.get('notes', '').strip()
@@ -127,15 +226,14 @@ def process_notes():
         )
 
         if result['success']:
-            return create_json_response(
-                success=True,
-                data={
-                    'session_id': session_id,
-                    'flashcard_set': result['flashcard_set'],
-                    'generation_method': result['generation_method']
-                },
-                message=result['message']
-            )
+            response_data = {
+                'session_id': session_id,
+                'flashcard_set': result['flashcard_set'],
+                'generation_method': result['generation_method']
+            }
+            if session_token:
+                response_data['session_token'] = session_token
+            return create_json_response(success=True, data=response_data, message=result['message'])
         else:
             return create_json_response(success=False, error=result['error'], status_code=500)
 
@@ -145,21 +243,62 @@ def process_notes():
 
 
 @api_bp.route('/flashcards', methods=['GET'])
+@query_budget(5)
 def get_flashcards():
-    """Get all flashcard sets for a session."""
+    """Get a page of flashcard sets for a session.
+
+    Query parameters: limit, cursor (from a previous next_cursor) and
+    fields (comma-separated projection; original_content is only returned
+    when listed here).
+    """
     try:
         flashcard_service = api_bp.flashcard_service
+        validator = api_bp.validator
         session_id = get_session_id()
 
         if not session_id:
             return create_json_response(success=False, error="Session ID required", status_code=400)
 
-        result = flashcard_service.get_session_flashcard_sets(session_id)
+        limit_validation = validator.validate_limit(
+            request.args.get('limit'),
+            default=current_app.config.get('FLASHCARD_SETS_PAGE_SIZE', 20),
+            maximum=current_app.config.get('FLASHCARD_SETS_MAX_PAGE_SIZE', 100)
+        )
+        if not limit_validation['valid']:
+            return create_json_response(success=False, error=limit_validation['error'], status_code=400)
+
+        allowed_fields = list(FlashcardSet.__table__.columns.keys()) + ['original_content', 'flashcard_count']
+        fields_validation = validator.validate_fields(request.args.get('fields'), allowed_fields)
+        if not fields_validation['valid']:
+            return create_json_response(success=False, error=fields_validation['error'], status_code=400)
+
+        after = None
+        cursor = request.args.get('cursor')
+        if cursor:
+            after = decode_cursor(cursor)
+            if after is None:
+                return create_json_response(success=False, error="Invalid cursor", status_code=400)
+
+        # The page depends on the session's collection version and the query string
+        def page_etag(version):
+            return make_etag('flashcard_sets', session_id, version, request.query_string.decode('utf-8'))
+
+        max_age = current_app.config.get('HTTP_CACHE_MAX_AGE_SECONDS', 0)
+        result = flashcard_service.get_session_flashcard_sets(
+            session_id, limit=limit_validation['limit'], after=after, fields=fields_validation['fields'],
+            is_current=lambda version: request.if_none_match.contains_weak(page_etag(version))
+        )
         if result['success']:
-            return create_json_response(success=True, data={
+            etag = page_etag(result['version'])
+            if result.get('not_modified'):
+                return not_modified_response(etag, max_age)
+            response, status_code = create_json_response(success=True, data={
                 'flashcard_sets': result['flashcard_sets'],
-                'count': result['count']
+                'count': result['count'],
+                'next_cursor': result['next_cursor'],
+                'has_more': result['has_more']
             })
+            return set_cache_validators(response, etag, max_age), status_code
         else:
             return create_json_response(success=False, error=result['error'], status_code=404)
 
@@ -169,6 +308,7 @@ def get_flashcards():
 
 
 @api_bp.route('/flashcards/<set_id>', methods=['GET'])
+@query_budget(6)
 def get_flashcard_set(set_id):
     """Get a specific flashcard set."""
     try:
@@ -178,9 +318,19 @@ def get_flashcard_set(set_id):
         if not session_id:
             return create_json_response(success=False, error="Session ID required", status_code=400)
 
-        result = flashcard_service.get_flashcard_set(set_id, session_id)
+        def set_etag(version):
+            return make_etag('flashcard_set', set_id, version)
+
+        max_age = current_app.config.get('HTTP_CACHE_MAX_AGE_SECONDS', 0)
+        result = flashcard_service.get_flashcard_set(
+            set_id, session_id, is_current=lambda version: request.if_none_match.contains_weak(set_etag(version))
+        )
         if result['success']:
-            return create_json_response(success=True, data=result['flashcard_set'])
+            etag = set_etag(result['version'])
+            if result.get('not_modified'):
+                return not_modified_response(etag, max_age)
+            response, status_code = create_json_response(success=True, data=result['flashcard_set'])
+            return set_cache_validators(response, etag, max_age), status_code
         else:
             return create_json_response(success=False, error=result['error'], status_code=404)
 
@@ -190,6 +340,7 @@ def get_flashcard_set(set_id):
 
 
 @api_bp.route('/flashcards/<set_id>', methods=['PUT'])
+@query_budget(9)
 def update_flashcard_set(set_id):
     """Update flashcard set (currently only title)."""
     try:
@@ -197,7 +348,7 @@ def update_flashcard_set(set_id):
         validator = api_bp.validator
 
         data = request.get_json()
-        session_id = data.get('session_id') or get_session_id()
+        session_id = resolve_session_id(data.get('session_id')) or get_session_id()
 
         if not session_id:
             return create_json_response(success=False, error="Session ID required", status_code=400)
@@ -226,6 +377,7 @@ def update_flashcard_set(set_id):
 
 
 @api_bp.route('/flashcards/<set_id>', methods=['DELETE'])
+@query_budget(12)
 def delete_flashcard_set(set_id):
     """Delete a flashcard set."""
     try:
@@ -247,13 +399,14 @@ def delete_flashcard_set(set_id):
 
 
 @api_bp.route('/flashcards/<set_id>/study', methods=['POST'])
+@query_budget(8)
 def record_study_session(set_id):
     """Record a study session with performance data."""
     try:
         flashcard_service = api_bp.flashcard_service
 
         data = request.get_json()
-        session_id = data.get('session_id') or get_session_id()
+        session_id = resolve_session_id(data.get('session_id')) or get_session_id()
 
         if not session_id:
             return create_json_response(success=False, error="Session ID required", status_code=400)
@@ -273,7 +426,171 @@ def record_study_session(set_id):
         return create_json_response(success=False, error="Failed to record study session", status_code=500)
 
 
+@api_bp.route('/import', methods=['POST'])
+@rate_limit('RATELIMIT_IMPORT')
+def import_notes():
+    """Generate flashcard sets from a zip or tar archive of .txt/.md notes.
+
+    Expects a multipart upload with the archive in the "archive" field. The
+    response streams one JSON progress event per line: "started", one
+    "file" event per note file as it finishes, and a final "summary".
+    """
+    try:
+        import_service = api_bp.import_service
+        session_id = get_session_id()
+
+        if not session_id:
+            return create_json_response(success=False, error="Session ID required", status_code=400)
+
+        upload = request.files.get('archive')
+        if upload is None or not upload.filename:
+            return create_json_response(success=False, error="No archive uploaded", status_code=400)
+
+        result = import_service.start_import(session_id, upload.stream, upload.filename)
+        if not result['success']:
+            status_code = 400 if result.get('invalid_archive') else 404
+            return create_json_response(success=False, error=result['error'], status_code=status_code)
+
+        lines = (json.dumps(event) + '\n' for event in result['events'])
+        response = Response(stream_with_context(lines), mimetype='application/x-ndjson')
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    except RequestEntityTooLarge:
+        return create_json_response(success=False, error="Upload is too large", status_code=413)
+    except Exception as e:
+        logger.error(f"Error importing notes: {str(e)}")
+        return create_json_response(success=False, error="Failed to import notes", status_code=500)
+
+
+@api_bp.route('/export', methods=['GET'])
+def export_flashcards():
+    """Stream every card of the session as a download.
+
+    Query parameters: format (ndjson, csv or anki) and compress=gzip for a
+    gzip-compressed file. The body is generated while it is being sent, so
+    memory use does not grow with the size of the export.
+    """
+    try:
+        flashcard_service = api_bp.flashcard_service
+        session_id = get_session_id()
+
+        if not session_id:
+            return create_json_response(success=False, error="Session ID required", status_code=400)
+
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return create_json_response(
+                success=False,
+                error=f"Format must be one of: {', '.join(EXPORT_FORMATS)}",
+                status_code=400
+            )
+
+        compress = request.args.get('compress', '').lower()
+        if compress not in ('', 'gzip'):
+            return create_json_response(success=False, error="compress must be gzip", status_code=400)
+
+        result = flashcard_service.export_session(session_id, export_format, compress=compress == 'gzip')
+        if not result['success']:
+            return create_json_response(success=False, error=result['error'], status_code=404)
+
+        response = Response(stream_with_context(result['chunks']), mimetype=result['mimetype'])
+        response.headers['Content-Disposition'] = f"attachment; filename={result['filename']}"
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    except Exception as e:
+        logger.error(f"Error exporting flashcards: {str(e)}")
+        return create_json_response(success=False, error="Failed to export flashcards", status_code=500)
+
+
+@api_bp.route('/search', methods=['GET'])
+@query_budget(3)
+def search():
+    """Full-text search over the session's sets and cards.
+
+    Query parameters: q, limit and offset (from a previous next_offset).
+    Matches are wrapped in <mark> tags in the title and snippet.
+    """
+    try:
+        flashcard_service = api_bp.flashcard_service
+        validator = api_bp.validator
+        session_id = get_session_id()
+
+        if not session_id:
+            return create_json_response(success=False, error="Session ID required", status_code=400)
+
+        query_validation = validator.validate_search_query(request.args.get('q'))
+        if not query_validation['valid']:
+            return create_json_response(success=False, error=query_validation['error'], status_code=400)
+
+        limit_validation = validator.validate_limit(
+            request.args.get('limit'),
+            default=current_app.config.get('SEARCH_PAGE_SIZE', 20),
+            maximum=current_app.config.get('SEARCH_MAX_PAGE_SIZE', 100)
+        )
+        if not limit_validation['valid']:
+            return create_json_response(success=False, error=limit_validation['error'], status_code=400)
+
+        offset_validation = validator.validate_offset(request.args.get('offset'))
+        if not offset_validation['valid']:
+            return create_json_response(success=False, error=offset_validation['error'], status_code=400)
+
+        result = flashcard_service.search(
+            session_id, query_validation['query'],
+            limit=limit_validation['limit'], offset=offset_validation['offset']
+        )
+        if result['success']:
+            return create_json_response(success=True, data={
+                'results': result['results'],
+                'count': result['count'],
+                'next_offset': result['next_offset'],
+                'has_more': result['has_more']
+            })
+        else:
+            return create_json_response(success=False, error=result['error'], status_code=404)
+
+    except Exception as e:
+        logger.error(f"Error searching flashcards: {str(e)}")
+        return create_json_response(success=False, error="Failed to search flashcards", status_code=500)
+
+
+@api_bp.route('/study/next', methods=['GET'])
+@query_budget(3)
+def get_next_cards():
+    """Get the session's most overdue cards across all of its sets."""
+    try:
+        flashcard_service = api_bp.flashcard_service
+        validator = api_bp.validator
+        session_id = get_session_id()
+
+        if not session_id:
+            return create_json_response(success=False, error="Session ID required", status_code=400)
+
+        limit_validation = validator.validate_limit(
+            request.args.get('limit'),
+            default=current_app.config.get('STUDY_QUEUE_PAGE_SIZE', 20),
+            maximum=current_app.config.get('STUDY_QUEUE_MAX_PAGE_SIZE', 100)
+        )
+        if not limit_validation['valid']:
+            return create_json_response(success=False, error=limit_validation['error'], status_code=400)
+
+        result = flashcard_service.get_next_cards(session_id, limit=limit_validation['limit'])
+        if result['success']:
+            return create_json_response(success=True, data={
+                'cards': result['cards'],
+                'count': result['count']
+            })
+        else:
+            return create_json_response(success=False, error=result['error'], status_code=404)
+
+    except Exception as e:
+        logger.error(f"Error retrieving due cards: {str(e)}")
+        return create_json_response(success=False, error="Failed to retrieve due cards", status_code=500)
+
+
 @api_bp.route('/flashcards/<set_id>/statistics', methods=['GET'])
+@query_budget(6)
 def get_study_statistics(set_id):
     """Get study statistics for a flashcard set."""
     try:
@@ -294,9 +611,36 @@ def get_study_statistics(set_id):
         return create_json_response(success=False, error="Failed to retrieve statistics", status_code=500)
 
 
+@api_bp.route('/statistics', methods=['GET'])
+@query_budget(3)
+def get_session_statistics():
+    """Get study statistics across all flashcard sets of a session."""
+    try:
+        flashcard_service = api_bp.flashcard_service
+        session_id = get_session_id()
+
+        if not session_id:
+            return create_json_response(success=False, error="Session ID required", status_code=400)
+
+        result = flashcard_service.get_session_statistics(session_id)
+        if result['success']:
+            return create_json_response(success=True, data=result['statistics'])
+        else:
+            return create_json_response(success=False, error=result['error'], status_code=404)
+
+    except Exception as e:
+        logger.error(f"Error retrieving session statistics: {str(e)}")
+        return create_json_response(success=False, error="Failed to retrieve statistics", status_code=500)
+
+
 # -------------------------------
 # Error Handlers
 # -------------------------------
+@api_bp.errorhandler(413)
+def too_large_handler(e):
+    return create_json_response(success=False, error="Upload is too large", status_code=413)
+
+
 @api_bp.errorhandler(429)
 def ratelimit_handler(e):
     return create_json_response(success=False, error="Rate limit exceeded. Please try again later.", status_code=429)
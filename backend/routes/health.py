@@ -1,13 +1,18 @@
-from flask import Blueprint, current_app
-from models.base import db
-from services import SessionService
-from utils.helpers import create_json_response
+from flask import Blueprint, Response, current_app, jsonify
+from models import Session
+from utils.helpers import create_json_response, format_response
+from utils import metrics
 import logging
 
 health_bp = Blueprint('health', __name__)
-session_service = SessionService()
 logger = logging.getLogger(__name__)
 
+def _probe_response(ok: bool, data, error: str):
+    """Like create_json_response, but failing probes still say which checks failed."""
+    body = format_response(ok, error=error)
+    body['data'] = data
+    return jsonify(body), 200 if ok else 503
+
 @health_bp.route('/health', methods=['GET'])
 def health_check():
     """Basic health check endpoint."""
@@ -29,70 +34,58 @@ def health_check():
             status_code=500
         )
 
-@health_bp.route('/health/detailed', methods=['GET'])
-def detailed_health_check():
-    """Detailed health check including dependencies."""
+@health_bp.route('/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is up and serving; never touches a dependency."""
     
-    health_status = {
-        'status': 'healthy',
-        'checks': {}
-    }
+    return create_json_response(success=True, data={'status': 'alive'})
+
+@health_bp.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: answered from the health monitor's last snapshot."""
     
-    overall_healthy = True
+    health_monitor = health_bp.health_monitor
+    snapshot = health_monitor.get_snapshot()
+    ready = health_monitor.is_ready(snapshot)
+    failing = [name for name, check in snapshot['checks'].items() if check['status'] == 'unhealthy']
     
-    # Database check
-    try:
-        db.session.execute('SELECT 1')
-        health_status['checks']['database'] = {
-            'status': 'healthy',
-            'message': 'Database connection successful'
-        }
-    except Exception as e:
-        health_status['checks']['database'] = {
-            'status': 'unhealthy',
-            'message': f'Database connection failed: {str(e)}'
-        }
-        overall_healthy = False
+    return _probe_response(ready, {
+        'status': 'ready' if ready else 'not_ready',
+        'checked_at': snapshot['checked_at'],
+        'age_seconds': snapshot['age_seconds'],
+        'stale': snapshot['stale'],
+        'failing_checks': failing
+    }, error="Service not ready")
+
+@health_bp.route('/health/detailed', methods=['GET'])
+def detailed_health_check():
+    """Detailed health check including dependencies, from the health monitor's last snapshot."""
     
-    # Hugging Face API token check
-    hf_token = current_app.config.get('HUGGING_FACE_API_TOKEN')
-    if hf_token:
-        health_status['checks']['hugging_face_token'] = {
-            'status': 'healthy',
-            'message': 'API token configured'
-        }
-    else:
-        health_status['checks']['hugging_face_token'] = {
-            'status': 'warning',
-            'message': 'API token not configured, using fallback generation'
-        }
+    health_monitor = health_bp.health_monitor
+    snapshot = health_monitor.get_snapshot()
+    
+    return _probe_response(health_monitor.is_ready(snapshot), snapshot, error="Service unhealthy")
+
+@health_bp.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics for this worker process."""
     
-    # Session cleanup check
     try:
-        cleanup_result = session_service.cleanup_expired_sessions()
-        health_status['checks']['session_cleanup'] = {
-            'status': 'healthy',
-            'message': f'Cleaned up {cleanup_result["cleaned_sessions"]} expired sessions'
-        }
+        set_cache = getattr(health_bp, 'set_cache', None)
+        if set_cache is not None:
+            metrics.update_cache_gauges('set_cache', set_cache.get_stats())
+        metrics.update_cache_gauges('session_validation', Session._validation_cache.get_stats())
+        
+        import_service = getattr(health_bp, 'import_service', None)
+        if import_service is not None:
+            queue = import_service.get_queue_stats()
+            metrics.JOBS_QUEUED.set(queue['queued'], ('import',))
+            metrics.JOBS_RUNNING.set(queue['running'], ('import',))
+        
+        return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
     except Exception as e:
-        health_status['checks']['session_cleanup'] = {
-            'status': 'warning',
-            'message': f'Session cleanup issue: {str(e)}'
-        }
-    
-    # Set overall status
-    if not overall_healthy:
-        health_status['status'] = 'unhealthy'
-    elif any(check['status'] == 'warning' for check in health_status['checks'].values()):
-        health_status['status'] = 'degraded'
-    
-    status_code = 200 if overall_healthy else 503
-    
-    return create_json_response(
-        success=overall_healthy,
-        data=health_status,
-        status_code=status_code
-    )
+        logger.error(f"Metrics endpoint failed: {str(e)}")
+        return create_json_response(success=False, error="Failed to collect metrics", status_code=500)
 
 @health_bp.route('/test', methods=['GET'])
 def test_endpoint():
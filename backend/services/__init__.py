@@ -1,5 +1,13 @@
 from .ai_service import AIService
 from .flashcard_service import FlashcardService
+from .health_monitor import HealthMonitor
+from .idempotency_service import IdempotencyService
+from .import_service import ImportService
+from .session_filter_sync import SessionFilterSync
 from .session_service import SessionService
+from .session_reaper import SessionReaper
+from .session_token_service import SessionTokenService
+from .study_rollup import StudyRollup
 
-__all__ = ['AIService', 'FlashcardService', 'SessionService']
\ No newline at end of file
+__all__ = ['AIService', 'FlashcardService', 'HealthMonitor', 'IdempotencyService', 'ImportService', 'SessionFilterSync',
+           'SessionService', 'SessionReaper', 'SessionTokenService', 'StudyRollup']
\ No newline at end of file
@@ -1,18 +1,59 @@
+import os
 import requests
 import logging
 import re
-from typing import List, Dict, Optional
-from flask import current_app
+import time
+from typing import List, Dict, Mapping, Optional
+from utils.metrics import GENERATIONS, INFERENCE_LATENCY, record_time
 
 logger = logging.getLogger(__name__)
 
+# Compiled once at import, so a preloading server shares them with every worker
+QUESTION_MARKER = re.compile(r'Q:\s*', re.IGNORECASE)
+ANSWER_MARKER = re.compile(r'A:\s*', re.IGNORECASE)
+YEAR_PATTERN = re.compile(r'\b\d{4}\b')
+
 class AIService:
     """Service for AI-powered flashcard generation using Hugging Face API."""
     
-    def __init__(self):
-        self.api_token = current_app.config.get('HUGGING_FACE_API_TOKEN')
-        self.available_models = current_app.config.get('AVAILABLE_MODELS', [])
-        self.timeout = 30
+    # Fixed questions asked of extractive Q&A models
+    QA_QUESTIONS = [
+        "What is the main topic discussed?",
+        "What are the key concepts mentioned?",
+        "What should someone remember from this?",
+        "How does this process work?",
+        "What are the important details?",
+        "What is the significance of this information?",
+        "What are the main points covered?"
+    ]
+    
+    # Each Q&A call is short; a hung one should not hold the whole request
+    qa_timeout = 15
+    
+    def __init__(self, api_token: Optional[str] = None, available_models: Optional[List[str]] = None,
+                 timeout: float = 30):
+        self.api_token = api_token
+        self.available_models = list(available_models or [])
+        self.timeout = timeout
+        self._http = None
+        self._http_pid = None
+    
+    @classmethod
+    def from_config(cls, config: Mapping) -> 'AIService':
+        """Create the service from app configuration."""
+        return cls(
+            api_token=config.get('HUGGING_FACE_API_TOKEN'),
+            available_models=config.get('AVAILABLE_MODELS', []),
+            timeout=config.get('AI_REQUEST_TIMEOUT_SECONDS', 30)
+        )
+    
+    @property
+    def http(self) -> requests.Session:
+        """Keep-alive HTTP session, created per process so no socket crosses a fork."""
+        if self._http is None or self._http_pid != os.getpid():
+            self._http = requests.Session()
+            self._http_pid = os.getpid()
+        return self._http
     
     def generate_flashcards(self, content: str, count: int = 5) -> List[Dict[str, str]]:
         """Generate flashcards from content using AI or fallback methods."""
@@ -25,104 +66,62 @@ class AIService:
         
         # Try each available model
         for model_url in self.available_models:
+            started = time.perf_counter()
             try:
                 result = self._try_model(model_url, content, count)
-                if result and len(result) >= 2:
-                    logger.info(f"Successfully generated {len(result)} flashcards using {model_url}")
-                    return result[:count]
             except Exception as e:
                 logger.error(f"Model {model_url} failed: {str(e)}")
+                self._record_inference(model_url, 'error', time.perf_counter() - started)
                 continue
+            
+            usable = bool(result and len(result) >= 2)
+            self._record_inference(model_url, 'success' if usable else 'failed', time.perf_counter() - started)
+            if usable:
+                logger.info(f"Successfully generated {len(result)} flashcards using {model_url}")
+                GENERATIONS.inc(('model',))
+                return result[:count]
         
         logger.warning("All AI models failed, using fallback generation")
         return self._generate_fallback_flashcards(content, count)
     
-    def _try_model(self, model_url: str, content: str, count: int) -> Optional[List[Dict[str, str]]]:
-        """Try a specific model for generating flashcards."""
-        
-        headers = {
+    def _record_inference(self, model_url: str, outcome: str, seconds: float):
+        """Per-model latency and outcome metrics, plus the request's inference time."""
+        INFERENCE_LATENCY.observe(seconds, (model_url.rsplit('/models/', 1)[-1], outcome))
+        record_time('inference', seconds)
+    
+    def _model_kind(self, model_url: str) -> str:
+        """Pick the prompt strategy for a model from its URL."""
+        url = model_url.lower()
+        if "bart" in url:
+            return 'bart'
+        if "distilbert" in url and "squad" in url:
+            return 'qa'
+        if "flan-t5" in url:
+            return 'flan'
+        return 'gpt'
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_token}",
             "Content-Type": "application/json"
         }
-        
-        # Choose strategy based on model type
-        if "bart" in model_url.lower():
-            return self._try_bart_model(model_url, headers, content, count)
-        elif "distilbert" in model_url.lower() and "squad" in model_url.lower():
-            return self._try_qa_model(model_url, headers, content, count)
-        elif "flan-t5" in model_url.lower():
-            return self._try_flan_model(model_url, headers, content, count)
-        else:
-            return self._try_gpt_model(model_url, headers, content, count)
     
-    def _try_bart_model(self, model_url: str, headers: dict, content: str, count: int) -> Optional[List[Dict[str, str]]]:
-        """Try BART model for summarization-based flashcard generation."""
-        
-        payload = {
-            "inputs": content[:500],  # BART has token limits
-            "parameters": {
-                "max_length": 150,
-                "min_length": 30,
-                "do_sample": True,
-                "temperature": 0.7
-            }
-        }
-        
-        try:
-            response = requests.post(model_url, headers=headers, json=payload, timeout=self.timeout)
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, list) and len(data) > 0 and 'summary_text' in data[0]:
-                    summary = data[0]['summary_text']
-                    return self._create_flashcards_from_summary(summary, content, count)
-        except Exception as e:
-            logger.error(f"BART model error: {e}")
-        
-        return None
-    
-    def _try_qa_model(self, model_url: str, headers: dict, content: str, count: int) -> Optional[List[Dict[str, str]]]:
-        """Try Q&A model with predefined questions."""
-        
-        questions = [
-            "What is the main topic discussed?",
-            "What are the key concepts mentioned?",
-            "What should someone remember from this?",
-            "How does this process work?",
-            "What are the important details?",
-            "What is the significance of this information?",
-            "What are the main points covered?"
-        ]
-        
-        flashcards = []
-        for question in questions[:count]:
-            payload = {
-                "inputs": {
-                    "question": question,
-                    "context": content[:400]  # Context length limit
+    def _model_payload(self, kind: str, content: str, count: int) -> Dict:
+        """Build the inference request for a generative model (bart, flan or gpt)."""
+        
+        if kind == 'bart':
+            return {
+                "inputs": content[:500],  # BART has token limits
+                "parameters": {
+                    "max_length": 150,
+                    "min_length": 30,
+                    "do_sample": True,
+                    "temperature": 0.7
                 }
             }
-            
-            try:
-                response = requests.post(model_url, headers=headers, json=payload, timeout=15)
-                if response.status_code == 200:
-                    data = response.json()
-                    answer = data.get('answer', '').strip()
-                    if answer and len(answer) > 10:
-                        flashcards.append({
-                            "question": question,
-                            "answer": answer,
-                            "difficulty": "medium"
-                        })
-            except Exception as e:
-                logger.error(f"Q&A model error for question '{question}': {e}")
-                continue
         
-        return flashcards if len(flashcards) >= 2 else None
-    
-    def _try_flan_model(self, model_url: str, headers: dict, content: str, count: int) -> Optional[List[Dict[str, str]]]:
-        """Try FLAN-T5 model for question generation."""
-        
-        prompt = f"""Based on this text, create {count} study questions with answers:
+        if kind == 'flan':
+            prompt = f"""Based on this text, create {count} study questions with answers:
 
 {content[:300]}
 
@@ -131,34 +130,17 @@ Q: [question]
 A: [answer]
 Q: [question]
 A: [answer]"""
-        
-        payload = {
-            "inputs": prompt,
-            "parameters": {
-                "max_new_tokens": 300,
-                "temperature": 0.7,
-                "do_sample": True
+            return {
+                "inputs": prompt,
+                "parameters": {
+                    "max_new_tokens": 300,
+                    "temperature": 0.7,
+                    "do_sample": True
+                }
             }
-        }
-        
-        try:
-            response = requests.post(model_url, headers=headers, json=payload, timeout=self.timeout)
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, list) and len(data) > 0 and 'generated_text' in data[0]:
-                    generated_text = data[0]['generated_text']
-                    return self._parse_qa_format(generated_text)
-        except Exception as e:
-            logger.error(f"FLAN model error: {e}")
-        
-        return None
-    
-    def _try_gpt_model(self, model_url: str, headers: dict, content: str, count: int) -> Optional[List[Dict[str, str]]]:
-        """Try GPT-style model for question generation."""
         
         prompt = f"Create {count} study questions from this text:\n\n{content[:400]}\n\nQ:"
-        
-        payload = {
+        return {
             "inputs": prompt,
             "parameters": {
                 "max_new_tokens": 200,
@@ -167,35 +149,93 @@ A: [answer]"""
                 "do_sample": True
             }
         }
+    
+    def _parse_model_response(self, kind: str, data, content: str, count: int) -> Optional[List[Dict[str, str]]]:
+        """Turn a generative model's JSON response into flashcards."""
+        
+        if not isinstance(data, list) or len(data) == 0:
+            return None
+        
+        if kind == 'bart':
+            if 'summary_text' in data[0]:
+                return self._create_flashcards_from_summary(data[0]['summary_text'], content, count)
+            return None
+        
+        if 'generated_text' not in data[0]:
+            return None
+        if kind == 'flan':
+            return self._parse_qa_format(data[0]['generated_text'])
+        return self._parse_generated_text(data[0]['generated_text'], content)
+    
+    def _qa_payload(self, question: str, content: str) -> Dict:
+        return {
+            "inputs": {
+                "question": question,
+                "context": content[:400]  # Context length limit
+            }
+        }
+    
+    def _qa_card(self, question: str, data) -> Optional[Dict[str, str]]:
+        answer = data.get('answer', '').strip() if isinstance(data, dict) else ''
+        if answer and len(answer) > 10:
+            return {
+                "question": question,
+                "answer": answer,
+                "difficulty": "medium"
+            }
+        return None
+    
+    def _try_model(self, model_url: str, content: str, count: int) -> Optional[List[Dict[str, str]]]:
+        """Try a specific model for generating flashcards."""
+        
+        kind = self._model_kind(model_url)
+        if kind == 'qa':
+            return self._try_qa_model(model_url, content, count)
         
+        payload = self._model_payload(kind, content, count)
         try:
-            response = requests.post(model_url, headers=headers, json=payload, timeout=self.timeout)
+            response = self.http.post(model_url, headers=self._headers(), json=payload, timeout=self.timeout)
             if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, list) and len(data) > 0 and 'generated_text' in data[0]:
-                    generated_text = data[0]['generated_text']
-                    return self._parse_generated_text(generated_text, content)
+                return self._parse_model_response(kind, response.json(), content, count)
         except Exception as e:
-            logger.error(f"GPT model error: {e}")
+            logger.error(f"{kind} model error: {e}")
         
         return None
     
+    def _try_qa_model(self, model_url: str, content: str, count: int) -> Optional[List[Dict[str, str]]]:
+        """Try Q&A model with predefined questions."""
+        
+        flashcards = []
+        for question in self.QA_QUESTIONS[:count]:
+            try:
+                response = self.http.post(model_url, headers=self._headers(),
+                                          json=self._qa_payload(question, content), timeout=self.qa_timeout)
+                if response.status_code == 200:
+                    card = self._qa_card(question, response.json())
+                    if card:
+                        flashcards.append(card)
+            except Exception as e:
+                logger.error(f"Q&A model error for question '{question}': {e}")
+                continue
+        
+        return flashcards if len(flashcards) >= 2 else None
+    
     def _parse_qa_format(self, text: str) -> List[Dict[str, str]]:
         """Parse Q: A: formatted text into flashcards."""
         
         flashcards = []
         # Split by Q: and process each section
-        sections = re.split(r'Q:\s*', text, flags=re.IGNORECASE)[1:]  # Skip first empty split
+        sections = QUESTION_MARKER.split(text)[1:]  # Skip first empty split
         
         for section in sections:
             if 'A:' in section or 'a:' in section:
                 # Split on A: (case insensitive)
-                parts = re.split(r'A:\s*', section, maxsplit=1, flags=re.IGNORECASE)
+                parts = ANSWER_MARKER.split(section, maxsplit=1)
                 if len(parts) == 2:
                     question = parts[0].strip().rstrip('?').strip()
                     answer_part = parts[1].strip()
                     # Remove next Q: if present
-                    answer = re.split(r'Q:\s*', answer_part, flags=re.IGNORECASE)[0].strip()
+                    answer = QUESTION_MARKER.split(answer_part)[0].strip()
                     
                     if len(question) > 10 and len(answer) > 10:
                         flashcards.append({
@@ -259,6 +299,8 @@ A: [answer]"""
     def _generate_fallback_flashcards(self, content: str, count: int = 5) -> List[Dict[str, str]]:
         """Generate intelligent fallback flashcards based on content analysis."""
         
+        GENERATIONS.inc(('fallback',))
+        
         logger.info("Using intelligent fallback flashcard generation")
         
         flashcards = []
@@ -367,8 +409,7 @@ A: [answer]"""
         flashcards = []
         
         # Look for dates and events
-        import re
-        dates = re.findall(r'\b\d{4}\b', content)  # Find years
+        dates = YEAR_PATTERN.findall(content)  # Find years
         if dates:
             flashcards.append({
                 "question": "What years or time periods are mentioned?",
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Mapping, Optional
+from utils.metrics import GENERATIONS, record_time
+from .ai_service import AIService
+
+logger = logging.getLogger(__name__)
+
+class AsyncAIService(AIService):
+    """AIService whose inference calls run as coroutines (requires aiohttp).
+
+    Each process owns one event loop on a daemon thread, with one pooled
+    HTTP client and a semaphore capping in-flight inference requests
+    across all of the process's request threads and import jobs. Models
+    are raced (first usable answer wins, the rest are cancelled) and Q&A
+    questions are asked concurrently. Callers use generate_flashcards(),
+    which blocks only the calling thread while the loop does the I/O.
+    """
+
+    def __init__(self, api_token: Optional[str] = None, available_models: Optional[List[str]] = None,
+                 timeout: float = 30, max_concurrency: int = 100, race_models: bool = True):
+        super().__init__(api_token=api_token, available_models=available_models, timeout=timeout)
+        self.max_concurrency = max_concurrency
+        self.race_models = race_models
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._loop_pid = None
+        self._client = None
+        self._limit = None
+
+    @classmethod
+    def from_config(cls, config: Mapping) -> 'AsyncAIService':
+        """Create the service from app configuration."""
+        return cls(
+            api_token=config.get('HUGGING_FACE_API_TOKEN'),
+            available_models=config.get('AVAILABLE_MODELS', []),
+            timeout=config.get('AI_REQUEST_TIMEOUT_SECONDS', 30),
+            max_concurrency=config.get('AI_MAX_CONCURRENCY', 100),
+            race_models=config.get('AI_RACE_MODELS', True)
+        )
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start this process's inference loop on first use (again after a fork)."""
+        with self._lock:
+            if self._loop is not None and self._loop_pid == os.getpid():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='ai-inference-loop', daemon=True)
+            thread.start()
+            asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+
+            self._loop = loop
+            self._loop_pid = os.getpid()
+            logger.info(f"Started inference loop (max_concurrency={self.max_concurrency})")
+            return loop
+
+    async def _open(self):
+        import aiohttp  # optional dependency
+
+        self._limit = asyncio.Semaphore(self.max_concurrency)
+        self._client = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            headers=self._headers()
+        )
+
+    def submit(self, coroutine) -> Future:
+        """Schedule a coroutine on the inference loop; returns a thread-safe future."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
+    def generate_flashcards(self, content: str, count: int = 5) -> List[Dict[str, str]]:
+        """Blocking wrapper for threads: waits while the loop does the I/O."""
+        started = time.perf_counter()
+        try:
+            return self.submit(self._generate(content, count)).result()
+        finally:
+            # Models race on the loop thread, so the request is charged the wall time
+            record_time('inference', time.perf_counter() - started)
+
+    async def _generate(self, content: str, count: int) -> List[Dict[str, str]]:
+        if not self.api_token:
+            logger.warning("Hugging Face API token not set, using fallback generation")
+            return self._generate_fallback_flashcards(content, count)
+
+        logger.info(f"Attempting AI flashcard generation for {len(content)} characters")
+
+        if self.race_models:
+            result = await self._race_models(content, count)
+        else:
+            result = None
+            for model_url in self.available_models:
+                result = await self._usable(model_url, content, count)
+                if result:
+                    break
+
+        if result:
+            GENERATIONS.inc(('model',))
+            return result[:count]
+
+        logger.warning("All AI models failed, using fallback generation")
+        return self._generate_fallback_flashcards(content, count)
+
+    async def _race_models(self, content: str, count: int) -> Optional[List[Dict[str, str]]]:
+        """Query every model at once and keep the first usable result."""
+        tasks = [asyncio.ensure_future(self._usable(model_url, content, count))
+                 for model_url in self.available_models]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result:
+                    return result
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _usable(self, model_url: str, content: str, count: int) -> Optional[List[Dict[str, str]]]:
+        started = time.perf_counter()
+        try:
+            result = await self._try_model_async(model_url, content, count)
+        except asyncio.CancelledError:
+            self._record_inference(model_url, 'cancelled', time.perf_counter() - started)
+            raise
+        except Exception as e:
+            logger.error(f"Model {model_url} failed: {str(e)}")
+            self._record_inference(model_url, 'error', time.perf_counter() - started)
+            return None
+        if result and len(result) >= 2:
+            logger.info(f"Successfully generated {len(result)} flashcards using {model_url}")
+            self._record_inference(model_url, 'success', time.perf_counter() - started)
+            return result
+        self._record_inference(model_url, 'failed', time.perf_counter() - started)
+        return None
+
+    async def _post_json(self, model_url: str, payload: Dict, timeout: float):
+        """POST to the inference API under the concurrency limit; None unless 200."""
+        import aiohttp
+
+        async with self._limit:
+            async with self._client.post(model_url, json=payload,
+                                         timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                if response.status != 200:
+                    return None
+                return await response.json(content_type=None)
+
+    async def _try_model_async(self, model_url: str, content: str, count: int) -> Optional[List[Dict[str, str]]]:
+        kind = self._model_kind(model_url)
+        if kind == 'qa':
+            return await self._try_qa_model_async(model_url, content, count)
+
+        try:
+            data = await self._post_json(model_url, self._model_payload(kind, content, count), self.timeout)
+        except Exception as e:
+            logger.error(f"{kind} model error: {e}")
+            return None
+        return self._parse_model_response(kind, data, content, count) if data is not None else None
+
+    async def _try_qa_model_async(self, model_url: str, content: str, count: int) -> Optional[List[Dict[str, str]]]:
+        """Ask all Q&A questions concurrently."""
+        questions = self.QA_QUESTIONS[:count]
+        responses = await asyncio.gather(
+            *(self._post_json(model_url, self._qa_payload(question, content), self.qa_timeout)
+              for question in questions),
+            return_exceptions=True
+        )
+
+        flashcards = []
+        for question, data in zip(questions, responses):
+            if isinstance(data, BaseException):
+                logger.error(f"Q&A model error for question '{question}': {data}")
+                continue
+            card = self._qa_card(question, data) if data is not None else None
+            if card:
+                flashcards.append(card)
+
+        return flashcards if len(flashcards) >= 2 else None
+
+def create_ai_service(config: Mapping) -> AIService:
+    """Build the inference client selected by ASYNC_INFERENCE_ENABLED."""
+
+    if config.get('ASYNC_INFERENCE_ENABLED'):
+        try:
+            import aiohttp  # noqa: F401  optional dependency
+            return AsyncAIService.from_config(config)
+        except ImportError:
+            logger.warning("aiohttp package not installed, falling back to blocking inference")
+
+    return AIService.from_config(config)
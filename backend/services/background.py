@@ -0,0 +1,48 @@
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class PeriodicWorker:
+    """Run run_once() inside an app context on a daemon thread every `interval` seconds."""
+
+    thread_name = 'periodic-worker'
+
+    def __init__(self, app=None, interval: float = 60):
+        self.app = app
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        raise NotImplementedError
+
+    def start(self):
+        """Start the worker on a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, name=self.thread_name, daemon=True)
+        self._thread.start()
+        logger.info(f"Started {self.thread_name} (interval={self.interval}s)")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Signal the worker thread to stop and wait for it."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                with self.app.app_context():
+                    self.run_once()
+            except Exception as e:
+                logger.error(f"{self.thread_name} run failed: {str(e)}")
+            self._stop_event.wait(self.interval)
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
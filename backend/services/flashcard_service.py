@@ -1,69 +1,62 @@
 import logging
-from typing import List, Dict, Optional
-from models import FlashcardSet, Flashcard, Session
+import time
+from typing import Callable, List, Dict, Optional, Tuple
+from datetime import datetime
+from flask import current_app
+from models import FlashcardSet, Flashcard, Session, StudyEvent, SearchIndex
 from services.ai_service import AIService
+from services.async_ai_service import create_ai_service
 from utils.validators import ContentValidator
+from utils.helpers import encode_cursor
+from utils.metrics import record_time
+from utils.spaced_repetition import answer_quality
+from utils.exporters import EXPORT_FORMATS, export_chunks, gzip_chunks
 
 logger = logging.getLogger(__name__)
 
 class FlashcardService:
     """Service for managing flashcard operations."""
     
-    def __init__(self):
-        self.ai_service = AIService()
-        self.validator = ContentValidator()
+    # Card columns returned by the study queue
+    STUDY_CARD_FIELDS = ('id', 'set_id', 'question', 'answer', 'difficulty_level',
+                         'ease_factor', 'interval_days', 'repetitions', 'due_at')
+    
+    def __init__(self, set_cache=None, ai_service: Optional[AIService] = None,
+                 validator: Optional[ContentValidator] = None):
+        self._ai_service = ai_service
+        self.validator = validator or ContentValidator()
+        self.set_cache = set_cache
+    
+    @property
+    def ai_service(self) -> AIService:
+        """The AI client, created from the app config on first use (inside a request or job)."""
+        if self._ai_service is None:
+            self._ai_service = create_ai_service(current_app.config)
+        return self._ai_service
+    
+    def _set_cache_key(self, set_id: str, version: int) -> str:
+        return f"flashcard_set:{set_id}:v{version}"
+    
+    def _invalidate_cached_set(self, set_id: str, version: int):
+        """Drop a cached set payload (readers already skip it once the version moves on)."""
+        if self.set_cache is not None:
+            self.set_cache.delete(self._set_cache_key(set_id, version))
     
     def create_flashcard_set(self, session_id: str, content: str, title: Optional[str] = None) -> Dict:
         """Create a new flashcard set from content."""
         
         try:
-            # Validate session
-            session = Session.get_active_session(session_id)
-            if not session:
-                raise ValueError("Invalid or expired session")
-            
-            # Validate content
-            validation_result = self.validator.validate_content(content)
-            if not validation_result['valid']:
-                raise ValueError(validation_result['error'])
+            self._check_new_set(session_id, content)
             
             logger.info(f"Creating flashcard set for session {session_id}")
             
             # Generate flashcards using AI service
+            started = time.perf_counter()
             flashcards_data = self.ai_service.generate_flashcards(content)
+            validated_flashcards = self._validate_generated(flashcards_data)
+            record_time('generation', time.perf_counter() - started)
             
-            if not flashcards_data:
-                raise ValueError("Failed to generate flashcards from content")
-            
-            # Validate generated flashcards
-            validated_flashcards = self.ai_service.validate_flashcards(flashcards_data)
-            
-            if len(validated_flashcards) < 2:
-                raise ValueError("Could not generate sufficient quality flashcards")
-            
-            # Determine generation method
-            generation_method = 'ai' if self.ai_service.api_token else 'fallback'
-            
-            # Create flashcard set
-            flashcard_set = FlashcardSet.create_set_with_flashcards(
-                session_id=session_id,
-                original_content=content,
-                flashcards_data=validated_flashcards,
-                title=title,
-                generation_method=generation_method
-            )
-            
-            logger.info(f"Created flashcard set {flashcard_set.id} with {len(validated_flashcards)} cards")
-            
-            # Update session activity
-            session.update_activity()
-            
-            return {
-                'success': True,
-                'flashcard_set': flashcard_set.to_dict(include_flashcards=True),
-                'generation_method': generation_method,
-                'message': f'Generated {len(validated_flashcards)} flashcards successfully!'
-            }
+            return self._save_new_set(session_id, content, validated_flashcards, title)
             
         except Exception as e:
             logger.error(f"Error creating flashcard set: {str(e)}")
@@ -72,30 +65,104 @@ class FlashcardService:
                 'error': str(e)
             }
     
-    def get_flashcard_set(self, set_id: str, session_id: str) -> Dict:
-        """Get a flashcard set by ID."""
+    def _check_new_set(self, session_id: str, content: str):
+        # Validate session
+        if not Session.is_session_active(session_id, fresh=True):
+            raise ValueError("Invalid or expired session")
+        
+        # Validate content
+        validation_result = self.validator.validate_content(content)
+        if not validation_result['valid']:
+            raise ValueError(validation_result['error'])
+    
+    def _validate_generated(self, flashcards_data: List[Dict]) -> List[Dict]:
+        if not flashcards_data:
+            raise ValueError("Failed to generate flashcards from content")
+        
+        # Validate generated flashcards
+        validated_flashcards = self.ai_service.validate_flashcards(flashcards_data)
+        
+        if len(validated_flashcards) < 2:
+            raise ValueError("Could not generate sufficient quality flashcards")
+        return validated_flashcards
+    
+    def _save_new_set(self, session_id: str, content: str, validated_flashcards: List[Dict],
+                      title: Optional[str]) -> Dict:
+        # Determine generation method
+        generation_method = 'ai' if self.ai_service.api_token else 'fallback'
+        
+        # Create flashcard set
+        flashcard_set = FlashcardSet.create_set_with_flashcards(
+            session_id=session_id,
+            original_content=content,
+            flashcards_data=validated_flashcards,
+            title=title,
+            generation_method=generation_method
+        )
+        
+        logger.info(f"Created flashcard set {flashcard_set.id} with {len(validated_flashcards)} cards")
+        
+        # Update session activity
+        Session.touch(session_id)
+        
+        return {
+            'success': True,
+            'flashcard_set': flashcard_set.to_dict(include_flashcards=True),
+            'generation_method': generation_method,
+            'message': f'Generated {len(validated_flashcards)} flashcards successfully!'
+        }
+    
+    def get_flashcard_set(self, set_id: str, session_id: str,
+                          is_current: Optional[Callable[[int], bool]] = None) -> Dict:
+        """Get a flashcard set by ID.
+        
+        is_current(version) lets the caller match a conditional request: when
+        it returns True the result is {'not_modified': True} and nothing else
+        is loaded or serialized.
+        """
         
         try:
             # Validate session
-            session = Session.get_active_session(session_id)
-            if not session:
+            if not Session.is_session_active(session_id):
                 raise ValueError("Invalid or expired session")
             
-            # Get flashcard set
-            flashcard_set = FlashcardSet.query.filter_by(
-                id=set_id,
-                session_id=session_id
-            ).first()
-            
-            if not flashcard_set:
+            # Cheap version lookup doubles as the ownership check
+            version = FlashcardSet.get_version(set_id, session_id)
+            if version is None:
                 raise ValueError("Flashcard set not found")
             
+            if is_current is not None and is_current(version):
+                return {
+                    'success': True,
+                    'not_modified': True,
+                    'version': version
+                }
+            
+            payload = None
+            if self.set_cache is not None:
+                payload = self.set_cache.get_json(self._set_cache_key(set_id, version))
+            
+            if payload is None:
+                flashcard_set = FlashcardSet.query.filter_by(
+                    id=set_id,
+                    session_id=session_id
+                ).first()
+                
+                if not flashcard_set:
+                    raise ValueError("Flashcard set not found")
+                
+                payload = flashcard_set.to_dict(include_flashcards=True)
+                version = flashcard_set.version
+                if self.set_cache is not None:
+                    self.set_cache.set_json(self._set_cache_key(set_id, version), payload)
+            
             # Update session activity
-            session.update_activity()
+            Session.touch(session_id)
             
             return {
                 'success': True,
-                'flashcard_set': flashcard_set.to_dict(include_flashcards=True)
+                'flashcard_set': payload,
+                'version': version
             }
             
         except Exception as e:
@@ -105,27 +172,53 @@ class FlashcardService:
                 'error': str(e)
             }
     
-    def get_session_flashcard_sets(self, session_id: str) -> Dict:
-        """Get all flashcard sets for a session."""
+    def get_session_flashcard_sets(self, session_id: str, limit: int = 20,
+                                   after: Optional[Tuple[datetime, str]] = None,
+                                   fields: Optional[List[str]] = None,
+                                   is_current: Optional[Callable[[int], bool]] = None) -> Dict:
+        """Get one page of flashcard sets for a session, newest first.
+        
+        is_current(sets_version) works as in get_flashcard_set, against the
+        session's collection version.
+        """
         
         try:
             # Validate session
-            session = Session.get_active_session(session_id)
-            if not session:
+            if not Session.is_session_active(session_id):
                 raise ValueError("Invalid or expired session")
             
+            sets_version = Session.get_sets_version(session_id)
+            if is_current is not None and is_current(sets_version):
+                return {
+                    'success': True,
+                    'not_modified': True,
+                    'version': sets_version
+                }
+            
             # Get flashcard sets
-            flashcard_sets = FlashcardSet.query.filter_by(
-                session_id=session_id
-            ).order_by(FlashcardSet.created_at.desc()).all()
+            flashcard_sets, counts, has_more = FlashcardSet.get_page_for_session(
+                session_id, limit=limit, after=after, fields=fields
+            )
+            
+            fields = fields or FlashcardSet.LIST_FIELDS
+            next_cursor = None
+            if has_more:
+                last = flashcard_sets[-1]
+                next_cursor = encode_cursor(last.created_at, last.id)
             
             # Update session activity
-            session.update_activity()
+            Session.touch(session_id)
             
             return {
                 'success': True,
-                'flashcard_sets': [fs.to_dict() for fs in flashcard_sets],
-                'count': len(flashcard_sets)
+                'flashcard_sets': [
+                    fs.to_dict(fields=fields, flashcard_count=counts.get(fs.id, 0))
+                    for fs in flashcard_sets
+                ],
+                'count': len(flashcard_sets),
+                'next_cursor': next_cursor,
+                'has_more': has_more,
+                'version': sets_version
             }
             
         except Exception as e:
@@ -140,8 +233,7 @@ class FlashcardService:
         
         try:
             # Validate session
-            session = Session.get_active_session(session_id)
-            if not session:
+            if not Session.is_session_active(session_id, fresh=True):
                 raise ValueError("Invalid or expired session")
             
             # Get flashcard set
@@ -154,12 +246,14 @@ class FlashcardService:
                 raise ValueError("Flashcard set not found")
             
             # Delete flashcard set (cascades to flashcards)
+            version = flashcard_set.version
             flashcard_set.delete()
+            self._invalidate_cached_set(set_id, version)
             
             logger.info(f"Deleted flashcard set {set_id}")
             
             # Update session activity
-            session.update_activity()
+            Session.touch(session_id)
             
             return {
                 'success': True,
@@ -178,8 +272,7 @@ class FlashcardService:
         
         try:
             # Validate session
-            session = Session.get_active_session(session_id)
-            if not session:
+            if not Session.is_session_active(session_id, fresh=True):
                 raise ValueError("Invalid or expired session")
             
             # Get flashcard set
@@ -192,12 +285,16 @@ class FlashcardService:
                 raise ValueError("Flashcard set not found")
             
             # Update title
-            flashcard_set.update(title=new_title.strip())
+            version = flashcard_set.version
+            Session.bump_sets_version(session_id)
+            flashcard_set.update(title=new_title.strip(), version=FlashcardSet.version + 1)
+            self._invalidate_cached_set(set_id, version)
+            SearchIndex.update_set_title(set_id, new_title.strip())
             
             logger.info(f"Updated flashcard set {set_id} title")
             
             # Update session activity
-            session.update_activity()
+            Session.touch(session_id)
             
             return {
                 'success': True,
@@ -217,36 +314,32 @@ class FlashcardService:
         
         try:
             # Validate session
-            session = Session.get_active_session(session_id)
-            if not session:
+            if not Session.is_session_active(session_id, fresh=True):
                 raise ValueError("Invalid or expired session")
             
-            # Get flashcard set
-            flashcard_set = FlashcardSet.query.filter_by(
-                id=set_id,
-                session_id=session_id
-            ).first()
-            
-            if not flashcard_set:
+            # Ownership check without loading the set
+            if FlashcardSet.get_version(set_id, session_id) is None:
                 raise ValueError("Flashcard set not found")
             
-            # Update individual card statistics
-            for card_data in cards_studied:
-                card_id = card_data.get('card_id')
-                correct = card_data.get('correct', False)
-                
-                flashcard = Flashcard.query.filter_by(
-                    id=card_id,
-                    set_id=set_id
-                ).first()
-                
-                if flashcard:
-                    flashcard.record_study_attempt(correct=correct)
+            card_ids = [card_data.get('card_id') for card_data in cards_studied if card_data.get('card_id')]
+            valid_ids = Flashcard.filter_ids_in_set(set_id, card_ids)
+            studied = [card_data for card_data in cards_studied if card_data.get('card_id') in valid_ids]
+            answers = [(card_data['card_id'], bool(card_data.get('correct', False))) for card_data in studied]
+            
+            # Reschedule the cards now, so the next due-card query sees it
+            Flashcard.schedule_answers(set_id, [
+                (card_data['card_id'], answer_quality(correct, card_data.get('quality')))
+                for card_data, (_, correct) in zip(studied, answers)
+            ])
+            
+            # Append answers to the event log (committing the schedule with it); the
+            # study rollup folds them into per-card aggregates in the background
+            StudyEvent.record_batch(session_id, set_id, answers)
             
             logger.info(f"Recorded study session for flashcard set {set_id}")
             
             # Update session activity
-            session.update_activity()
+            Session.touch(session_id)
             
             return {
                 'success': True,
@@ -260,54 +353,150 @@ class FlashcardService:
                 'error': str(e)
             }
     
+    def export_session(self, session_id: str, export_format: str = 'ndjson', compress: bool = False) -> Dict:
+        """Prepare a streaming export of all of a session's cards.
+        
+        The returned chunks generator runs the query lazily, so it must be
+        consumed inside the request (stream_with_context).
+        """
+        
+        try:
+            # Validate session
+            if not Session.is_session_active(session_id):
+                raise ValueError("Invalid or expired session")
+            
+            if export_format not in EXPORT_FORMATS:
+                raise ValueError(f"Unsupported export format: {export_format}")
+            
+            def generate():
+                rows = Flashcard.stream_for_session(session_id)
+                try:
+                    yield from export_chunks(rows, export_format)
+                finally:
+                    rows.close()
+            
+            chunks = generate()
+            fmt = EXPORT_FORMATS[export_format]
+            filename = f"flashcards.{fmt['extension']}"
+            mimetype = fmt['mimetype']
+            if compress:
+                chunks = gzip_chunks(chunks)
+                filename += '.gz'
+                mimetype = 'application/gzip'
+            
+            # Update session activity
+            Session.touch(session_id)
+            
+            return {
+                'success': True,
+                'chunks': chunks,
+                'mimetype': mimetype,
+                'filename': filename
+            }
+            
+        except Exception as e:
+            logger.error(f"Error exporting session {session_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def get_next_cards(self, session_id: str, limit: int = 20) -> Dict:
+        """Get the session's most overdue cards across all of its sets."""
+        
+        try:
+            # Validate session
+            if not Session.is_session_active(session_id):
+                raise ValueError("Invalid or expired session")
+            
+            cards = Flashcard.get_due(session_id, limit, include=self.STUDY_CARD_FIELDS)
+            
+            # Update session activity
+            Session.touch(session_id)
+            
+            return {
+                'success': True,
+                'cards': cards,
+                'count': len(cards)
+            }
+            
+        except Exception as e:
+            logger.error(f"Error getting due cards for session {session_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def search(self, session_id: str, query: str, limit: int = 20, offset: int = 0) -> Dict:
+        """Full-text search over a session's sets and cards."""
+        
+        try:
+            # Validate session
+            if not Session.is_session_active(session_id):
+                raise ValueError("Invalid or expired session")
+            
+            if not SearchIndex.is_available():
+                raise ValueError("Search is not available on this database")
+            
+            results, has_more = SearchIndex.search(session_id, query, limit=limit, offset=offset)
+            
+            # Update session activity
+            Session.touch(session_id)
+            
+            return {
+                'success': True,
+                'results': results,
+                'count': len(results),
+                'next_offset': offset + len(results) if has_more else None,
+                'has_more': has_more
+            }
+            
+        except Exception as e:
+            logger.error(f"Error searching session {session_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
     def get_study_statistics(self, set_id: str, session_id: str) -> Dict:
         """Get study statistics for a flashcard set."""
         
         try:
             # Validate session
-            session = Session.get_active_session(session_id)
-            if not session:
+            if not Session.is_session_active(session_id):
                 raise ValueError("Invalid or expired session")
             
-            # Get flashcard set
-            flashcard_set = FlashcardSet.query.filter_by(
-                id=set_id,
-                session_id=session_id
-            ).first()
-            
-            if not flashcard_set:
+            # Ownership check without loading the set
+            if FlashcardSet.get_version(set_id, session_id) is None:
                 raise ValueError("Flashcard set not found")
             
-            # Calculate statistics
-            flashcards = flashcard_set.get_flashcards_ordered()
-            total_cards = len(flashcards)
-            studied_cards = sum(1 for card in flashcards if card.times_studied > 0)
-            total_attempts = sum(card.times_studied for card in flashcards)
-            total_correct = sum(card.times_correct for card in flashcards)
-            
-            overall_success_rate = (total_correct / total_attempts * 100) if total_attempts > 0 else 0
+            # Set totals from one aggregate query; cards streamed as plain tuples
+            totals, rows = Flashcard.get_set_statistics(set_id)
+            total_attempts = totals['total_attempts']
+            overall_success_rate = (totals['total_correct'] / total_attempts * 100) if total_attempts > 0 else 0
             
             # Card-level statistics
             card_stats = []
-            for card in flashcards:
+            for card_id, question, times_studied, times_correct, last_studied in rows:
                 card_stats.append({
-                    'id': card.id,
-                    'question': card.question[:50] + '...' if len(card.question) > 50 else card.question,
-                    'times_studied': card.times_studied,
-                    'success_rate': card.get_success_rate(),
-                    'last_studied': card.last_studied.isoformat() if card.last_studied else None
+                    'id': card_id,
+                    'question': question,
+                    'times_studied': times_studied,
+                    'success_rate': (times_correct / times_studied * 100) if times_studied else 0,
+                    'last_studied': last_studied
                 })
             
             # Update session activity
-            session.update_activity()
+            Session.touch(session_id)
             
             return {
                 'success': True,
                 'statistics': {
-                    'total_cards': total_cards,
-                    'studied_cards': studied_cards,
+                    'total_cards': totals['total_cards'],
+                    'studied_cards': totals['studied_cards'],
                     'total_attempts': total_attempts,
                     'overall_success_rate': round(overall_success_rate, 1),
+                    'last_7_days': StudyEvent.recent_accuracy(set_id, days=7),
                     'card_statistics': card_stats
                 }
             }
@@ -317,4 +506,51 @@ class FlashcardService:
             return {
                 'success': False,
                 'error': str(e)
-            }
\ No newline at end of file
+            }
+    
+    def get_session_statistics(self, session_id: str) -> Dict:
+        """Get study statistics across all flashcard sets of a session."""
+        
+        try:
+            # Validate session
+            if not Session.is_session_active(session_id):
+                raise ValueError("Invalid or expired session")
+            
+            set_stats = []
+            totals = {'total_sets': 0, 'total_cards': 0, 'studied_cards': 0, 'total_attempts': 0}
+            total_correct = 0
+            for set_id, title, cards, studied, attempts, correct in FlashcardSet.get_session_statistics(session_id):
+                set_stats.append({
+                    'id': set_id,
+                    'title': title,
+                    'total_cards': cards,
+                    'studied_cards': studied,
+                    'total_attempts': attempts,
+                    'success_rate': round(correct / attempts * 100, 1) if attempts else 0
+                })
+                totals['total_sets'] += 1
+                totals['total_cards'] += cards
+                totals['studied_cards'] += studied
+                totals['total_attempts'] += attempts
+                total_correct += correct
+            
+            overall_success_rate = (total_correct / totals['total_attempts'] * 100) if totals['total_attempts'] else 0
+            
+            # Update session activity
+            Session.touch(session_id)
+            
+            return {
+                'success': True,
+                'statistics': {
+                    **totals,
+                    'overall_success_rate': round(overall_success_rate, 1),
+                    'set_statistics': set_stats
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Error getting study statistics for session {session_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
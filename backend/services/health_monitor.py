@@ -0,0 +1,216 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import requests
+from sqlalchemy import text
+from models import Session
+from models.base import db
+from .background import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+HEALTHY = 'healthy'
+WARNING = 'warning'
+UNHEALTHY = 'unhealthy'
+
+class HealthMonitor(PeriodicWorker):
+    """Background prober whose last results the health endpoints serve.
+
+    Every `interval` seconds it checks the database round trip, whether
+    the configured inference models are reachable and the import queue
+    backlog, and swaps in a new snapshot with each check's status,
+    timestamp and latency. Reading the snapshot is O(1), so load
+    balancer probes never touch a dependency themselves.
+    """
+
+    thread_name = 'health-monitor'
+
+    def __init__(self, app=None, interval: float = 15, probe_timeout: float = 3, stale_after: float = 60,
+                 queue_backlog_warning: int = 50, session_reaper=None, set_cache=None, import_service=None):
+        super().__init__(interval=interval)
+        self.probe_timeout = probe_timeout
+        self.stale_after = stale_after
+        self.queue_backlog_warning = queue_backlog_warning
+        self.session_reaper = session_reaper
+        self.set_cache = set_cache
+        self.import_service = import_service
+        self.api_token = None
+        self.models: List[str] = []
+
+        self._snapshot: Optional[Dict] = None
+        self._refreshed_at = None
+        self._refresh_lock = threading.Lock()
+        self._http = None
+        self._http_pid = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read health check settings from the app configuration."""
+        self.app = app
+        self.interval = app.config.get('HEALTH_CHECK_INTERVAL_SECONDS', self.interval)
+        self.probe_timeout = app.config.get('HEALTH_PROBE_TIMEOUT_SECONDS', self.probe_timeout)
+        self.stale_after = app.config.get('HEALTH_STALE_SECONDS', self.stale_after)
+        self.queue_backlog_warning = app.config.get('HEALTH_QUEUE_BACKLOG_WARNING', self.queue_backlog_warning)
+        self.api_token = app.config.get('HUGGING_FACE_API_TOKEN')
+        self.models = list(app.config.get('AVAILABLE_MODELS', []))
+
+    @property
+    def http(self) -> requests.Session:
+        """Keep-alive HTTP session, created per process so no socket crosses a fork."""
+        if self._http is None or self._http_pid != os.getpid():
+            self._http = requests.Session()
+            self._http_pid = os.getpid()
+        return self._http
+
+    def run_once(self, probe_models: bool = True) -> Dict:
+        """Probe every dependency and publish a new snapshot; must be called inside an app context.
+
+        With probe_models=False the inference models are not contacted, so
+        the run never waits on an outbound HTTP call.
+        """
+
+        started = time.perf_counter()
+        checks = {
+            'database': self._timed(self._check_database),
+            'inference': self._timed(self._check_inference, probe_models),
+            'import_queue': self._timed(self._check_import_queue),
+            'session_cleanup': self._timed(self._check_session_cleanup)
+        }
+        if self.set_cache is not None:
+            checks['set_cache'] = {'status': HEALTHY, 'message': 'Flashcard set cache enabled',
+                                   **self.set_cache.get_stats()}
+        if Session._id_filter is not None:
+            checks['session_filter'] = {'status': HEALTHY, 'message': 'Session id filter enabled',
+                                        **Session._id_filter.get_stats()}
+
+        statuses = {check['status'] for check in checks.values()}
+        if UNHEALTHY in statuses:
+            status = UNHEALTHY
+        elif WARNING in statuses:
+            status = 'degraded'
+        else:
+            status = HEALTHY
+
+        snapshot = {
+            'status': status,
+            'checked_at': datetime.utcnow().isoformat(),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            'checks': checks
+        }
+        # Readers only ever see a complete snapshot; swapping the reference is atomic
+        self._snapshot = snapshot
+        self._refreshed_at = time.monotonic()
+        return snapshot
+
+    def get_snapshot(self) -> Dict:
+        """Return the last snapshot with its age, refreshing inline only when no prober thread runs.
+
+        The inline refresh runs inside a probe request, so it skips the
+        inference model probes; only the prober thread makes those calls.
+        """
+
+        if not self.is_running() and self._needs_refresh():
+            # Non-blocking so concurrent probes share one refresh instead of queueing behind it
+            if self._refresh_lock.acquire(blocking=self._snapshot is None):
+                try:
+                    if self._needs_refresh():
+                        self.run_once(probe_models=False)
+                finally:
+                    self._refresh_lock.release()
+
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {'status': 'starting', 'checked_at': None, 'age_seconds': None, 'stale': True, 'checks': {}}
+
+        age = time.monotonic() - self._refreshed_at
+        return {**snapshot, 'age_seconds': round(age, 2), 'stale': age > self.stale_after}
+
+    def is_ready(self, snapshot: Dict) -> bool:
+        """Ready to take traffic: a fresh snapshot with no unhealthy check (warnings are tolerated)."""
+        return snapshot['status'] in (HEALTHY, 'degraded') and not snapshot['stale']
+
+    def _needs_refresh(self) -> bool:
+        return self._snapshot is None or time.monotonic() - self._refreshed_at >= self.interval
+
+    def _timed(self, check, *args) -> Dict:
+        started = time.perf_counter()
+        try:
+            result = check(*args)
+        except Exception as e:
+            logger.error(f"Health check {check.__name__} failed: {str(e)}")
+            result = {'status': UNHEALTHY, 'message': str(e)}
+        result['checked_at'] = datetime.utcnow().isoformat()
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    def _check_database(self) -> Dict:
+        try:
+            db.session.execute(text('SELECT 1'))
+        except Exception as e:
+            db.session.rollback()
+            return {'status': UNHEALTHY, 'message': f'Database connection failed: {str(e)}'}
+        return {'status': HEALTHY, 'message': 'Database connection successful'}
+
+    def _check_inference(self, probe_models: bool = True) -> Dict:
+        if not self.api_token:
+            return {'status': WARNING, 'message': 'API token not configured, using fallback generation'}
+        if not self.models:
+            return {'status': WARNING, 'message': 'No inference models configured, using fallback generation'}
+        if not probe_models:
+            return {'status': WARNING,
+                    'message': f'{len(self.models)} models configured, not probed without the health monitor thread'}
+
+        models = {}
+        for model_url in self.models:
+            models[model_url.rsplit('/models/', 1)[-1]] = self._probe_model(model_url)
+
+        reachable = sum(1 for model in models.values() if model['status'] == HEALTHY)
+        if reachable == len(models):
+            return {'status': HEALTHY, 'message': f'All {reachable} models reachable', 'models': models}
+        # Generation falls back to the next model, and to local generation after the last
+        return {'status': WARNING, 'message': f'{reachable} of {len(models)} models reachable', 'models': models}
+
+    def _probe_model(self, model_url: str) -> Dict:
+        started = time.perf_counter()
+        try:
+            response = self.http.get(model_url, headers={"Authorization": f"Bearer {self.api_token}"},
+                                     timeout=self.probe_timeout)
+        except requests.RequestException as e:
+            return {'status': UNHEALTHY, 'message': f'Unreachable: {type(e).__name__}',
+                    'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+        if response.status_code in (401, 403):
+            status, message = UNHEALTHY, 'API token rejected'
+        elif response.status_code >= 500:
+            status, message = UNHEALTHY, f'Unavailable (HTTP {response.status_code})'
+        else:
+            status, message = HEALTHY, f'Reachable (HTTP {response.status_code})'
+        return {'status': status, 'message': message,
+                'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+    def _check_import_queue(self) -> Dict:
+        if self.import_service is None:
+            return {'status': WARNING, 'message': 'Import service not configured'}
+
+        queue = self.import_service.get_queue_stats()
+        if queue['queued'] > self.queue_backlog_warning:
+            return {'status': WARNING, 'message': f'{queue["queued"]} import jobs waiting for a worker', **queue}
+        return {'status': HEALTHY, 'message': 'Import queue keeping up', **queue}
+
+    def _check_session_cleanup(self) -> Dict:
+        # Reported only; cleanup itself runs on the session reaper's thread
+        if self.session_reaper is None:
+            return {'status': WARNING, 'message': 'Session reaper not configured'}
+
+        reaper_status = self.session_reaper.get_status()
+        if reaper_status['last_error']:
+            return {'status': WARNING, 'message': f'Session cleanup issue: {reaper_status["last_error"]}',
+                    'last_run': reaper_status['last_run_finished']}
+        return {'status': HEALTHY,
+                'message': f'Last run removed {reaper_status["last_run_sessions_deleted"]} expired sessions',
+                'last_run': reaper_status['last_run_finished']}
@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+class IdempotencyService:
+    """Run a request at most once per Idempotency-Key.
+
+    The first request claims the key and records an in-progress marker
+    with a fingerprint of the request. A concurrent retry waits for that
+    request to finish (woken in-process, polling the database across
+    workers) and later retries replay the stored response.
+    """
+
+    PROCEED = 'proceed'
+    REPLAY = 'replay'
+    MISMATCH = 'mismatch'
+    IN_PROGRESS = 'in_progress'
+
+    def __init__(self, ttl: int = 86400, wait_timeout: float = 60, poll_interval: float = 0.25,
+                 lock_timeout: int = 300):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.lock_timeout = lock_timeout
+
+        # Requests claimed by this process; waiters here are woken without polling
+        self._events = {}
+        self._events_lock = threading.Lock()
+
+    @staticmethod
+    def scope(session_id: Optional[str], client_address: Optional[str]) -> Optional[str]:
+        """Who a key belongs to: the session, else the client address; None if neither is known."""
+        if session_id:
+            return session_id
+        if client_address:
+            return f"client:{client_address}"
+        return None
+
+    @staticmethod
+    def record_id(key: str, scope: str) -> str:
+        """Keys are scoped to the caller so different callers cannot collide."""
+        if not scope:
+            raise ValueError("Idempotency keys need a caller scope")
+        return hashlib.sha256(f"{scope}\0{key}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def fingerprint(method: str, path: str, body: bytes) -> str:
+        digest = hashlib.sha256(f"{method} {path}\n".encode('utf-8'))
+        digest.update(body or b'')
+        return digest.hexdigest()
+
+    def begin(self, key: str, fingerprint: str, session_id: Optional[str] = None,
+              client_address: Optional[str] = None) -> Dict:
+        """Claim a key, or wait for and return the outcome of the request holding it.
+
+        Keys are scoped to the session, or to the client address for callers
+        without one (see scope()). Returns a dict with 'action' (proceed,
+        replay, mismatch or in_progress) and 'record_id'; replays also carry
+        'response' as (body, status_code, content_type).
+        """
+        record_id = self.record_id(key, self.scope(session_id, client_address))
+        deadline = time.monotonic() + self.wait_timeout
+
+        while True:
+            if IdempotencyKey.claim(record_id, fingerprint, session_id=session_id,
+                                    ttl=self.ttl, lock_timeout=self.lock_timeout):
+                with self._events_lock:
+                    self._events[record_id] = threading.Event()
+                return {'action': self.PROCEED, 'record_id': record_id}
+
+            state = IdempotencyKey.get_state(record_id)
+            if state is None:
+                continue  # released between our claim and read; try again
+
+            if state.fingerprint != fingerprint:
+                return {'action': self.MISMATCH, 'record_id': record_id}
+            if state.status == IdempotencyKey.COMPLETED:
+                return {
+                    'action': self.REPLAY,
+                    'record_id': record_id,
+                    'response': (state.response_body, state.response_status, state.response_type)
+                }
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return {'action': self.IN_PROGRESS, 'record_id': record_id}
+            self._wait(record_id, min(self.poll_interval, remaining))
+
+    def complete(self, record_id: str, status_code: int, body: bytes, content_type: str):
+        """Store the response of a claimed request and wake local waiters."""
+        try:
+            IdempotencyKey.complete(record_id, status_code, body, content_type)
+        except Exception as e:
+            logger.error(f"Error storing idempotent response {record_id}: {str(e)}")
+        finally:
+            self._notify(record_id)
+
+    def abandon(self, record_id: str):
+        """Release a claimed request that failed so a retry runs it again."""
+        try:
+            IdempotencyKey.release(record_id)
+        except Exception as e:
+            logger.error(f"Error releasing idempotency key {record_id}: {str(e)}")
+        finally:
+            self._notify(record_id)
+
+    def _wait(self, record_id: str, timeout: float):
+        with self._events_lock:
+            event = self._events.get(record_id)
+        if event is not None:
+            event.wait(timeout)
+        else:
+            time.sleep(timeout)  # owned by another worker process
+
+    def _notify(self, record_id: str):
+        with self._events_lock:
+            event = self._events.pop(record_id, None)
+        if event is not None:
+            event.set()
@@ -0,0 +1,216 @@
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import IO, Dict, Iterator, List, Optional
+from flask import current_app
+from models import Session
+from utils.archives import ArchiveError, EntryTooLarge, NoteArchive, iter_text_chunks, split_documents
+from utils.helpers import sanitize_input
+
+logger = logging.getLogger(__name__)
+
+class _FileProgress:
+    """Per-file bookkeeping while its documents are being generated."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.documents = 0
+        self.pending = 0
+        self.set_ids: List[str] = []
+        self.errors: List[str] = []
+        self.read_done = False
+        self.reported = False
+
+    def to_event(self) -> Dict:
+        if self.set_ids:
+            status = 'completed' if not self.errors else 'partial'
+        else:
+            status = 'failed' if self.documents else 'skipped'
+        return {
+            'event': 'file',
+            'file': self.name,
+            'status': status,
+            'documents': self.documents,
+            'sets_created': len(self.set_ids),
+            'set_ids': self.set_ids,
+            'errors': self.errors
+        }
+
+class ImportService:
+    """Bulk import of note files from an uploaded zip or tar archive.
+
+    Entries are read and decoded as streams and split into documents the
+    size ContentValidator accepts; each document becomes one flashcard
+    generation job on a bounded thread pool. At most max_workers jobs run
+    and as many again wait, so the reader blocks instead of queueing the
+    whole archive; memory is bounded by a read chunk plus the in-flight
+    documents. Progress events are yielded as each file finishes.
+    """
+
+    def __init__(self, flashcard_service, max_workers: int = 4, max_files: int = 500,
+                 max_entry_bytes: int = 5 * 1024 * 1024, max_documents: int = 200):
+        self.flashcard_service = flashcard_service
+        self.max_workers = max_workers
+        self.max_files = max_files
+        self.max_entry_bytes = max_entry_bytes
+        self.max_documents = max_documents
+        
+        # Generation jobs across all imports in this process, for the metrics endpoint
+        self._jobs_lock = threading.Lock()
+        self._jobs_queued = 0
+        self._jobs_running = 0
+
+    def start_import(self, session_id: str, fileobj: IO[bytes], filename: Optional[str] = None) -> Dict:
+        """Validate the session and archive; returns a lazy stream of progress events.
+
+        The events generator does the actual work, so it must be consumed
+        inside the request (stream_with_context).
+        """
+
+        try:
+            # Validate session
+            if not Session.is_session_active(session_id, fresh=True):
+                raise ValueError("Invalid or expired session")
+
+            archive = NoteArchive(fileobj, filename)
+            app = current_app._get_current_object()
+
+            # Update session activity
+            Session.touch(session_id)
+
+            return {
+                'success': True,
+                'events': self._run(app, session_id, archive)
+            }
+
+        except ArchiveError as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'invalid_archive': True
+            }
+        except Exception as e:
+            logger.error(f"Error starting import for session {session_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def get_queue_stats(self) -> Dict:
+        with self._jobs_lock:
+            return {'queued': self._jobs_queued, 'running': self._jobs_running}
+    
+    def _generate(self, app, session_id: str, content: str, title: str) -> Dict:
+        with self._jobs_lock:
+            self._jobs_queued -= 1
+            self._jobs_running += 1
+        try:
+            with app.app_context():
+                return self.flashcard_service.create_flashcard_set(session_id=session_id, content=content, title=title)
+        finally:
+            with self._jobs_lock:
+                self._jobs_running -= 1
+
+    def _run(self, app, session_id: str, archive: NoteArchive) -> Iterator[Dict]:
+        validator = self.flashcard_service.validator
+        slots = threading.Semaphore(self.max_workers * 2)
+        lock = threading.Lock()
+        files: List[_FileProgress] = []
+        outstanding = []
+        totals = {'files': 0, 'documents': 0, 'sets_created': 0, 'failed_documents': 0}
+
+        def finished(progress: _FileProgress, future):
+            if future.cancelled():
+                with self._jobs_lock:
+                    self._jobs_queued -= 1
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            with lock:
+                progress.pending -= 1
+                if result['success']:
+                    progress.set_ids.append(result['flashcard_set']['id'])
+                else:
+                    progress.errors.append(result['error'])
+            slots.release()
+
+        def completed_files() -> Iterator[Dict]:
+            with lock:
+                done = [progress for progress in files
+                        if not progress.reported and progress.read_done and progress.pending == 0]
+                for progress in done:
+                    progress.reported = True
+            for progress in done:
+                totals['sets_created'] += len(progress.set_ids)
+                totals['failed_documents'] += progress.documents - len(progress.set_ids)
+                yield progress.to_event()
+
+        yield {'event': 'started', 'archive': archive.kind}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='note-import')
+        try:
+            for name, stream, skip_reason in archive.entries(self.max_entry_bytes):
+                if totals['files'] >= self.max_files:
+                    yield {'event': 'limit', 'error': f"Only the first {self.max_files} files are imported"}
+                    break
+                totals['files'] += 1
+
+                progress = _FileProgress(name)
+                with lock:
+                    files.append(progress)
+                if skip_reason:
+                    progress.errors.append(skip_reason)
+                    progress.read_done = True
+                    yield from completed_files()
+                    continue
+
+                stem = os.path.splitext(os.path.basename(name))[0]
+                try:
+                    documents = split_documents(
+                        iter_text_chunks(stream, self.max_entry_bytes), validator.min_length, validator.max_length
+                    )
+                    for document, long_enough in documents:
+                        if not long_enough:
+                            progress.errors.append(f"Skipped {len(document)} characters: too short for a flashcard set")
+                            continue
+                        if totals['documents'] >= self.max_documents:
+                            progress.errors.append(f"Import limit of {self.max_documents} documents reached")
+                            break
+
+                        # Wait for a free slot, reporting files that finish meanwhile
+                        while not slots.acquire(timeout=0.1):
+                            yield from completed_files()
+
+                        progress.documents += 1
+                        totals['documents'] += 1
+                        title = stem if progress.documents == 1 else f"{stem} (part {progress.documents})"
+                        with lock:
+                            progress.pending += 1
+                        with self._jobs_lock:
+                            self._jobs_queued += 1
+                        future = executor.submit(self._generate, app, session_id, sanitize_input(document), title[:255])
+                        future.add_done_callback(lambda f, p=progress: finished(p, f))
+                        outstanding = [f for f in outstanding if not f.done()] + [future]
+                except EntryTooLarge as e:
+                    progress.errors.append(str(e))
+
+                with lock:
+                    progress.read_done = True
+                yield from completed_files()
+
+            # Report the remaining files as their jobs finish
+            while outstanding:
+                wait(outstanding, timeout=0.5, return_when=FIRST_COMPLETED)
+                outstanding = [f for f in outstanding if not f.done()]
+                yield from completed_files()
+        except ArchiveError as e:
+            yield {'event': 'error', 'error': str(e)}
+        finally:
+            # Also reached when the client disconnects: drop jobs not yet started.
+            # Waiting here also guarantees every done-callback has run.
+            executor.shutdown(wait=True, cancel_futures=True)
+            archive.close()
+
+        yield from completed_files()
+        yield {'event': 'summary', **totals}
@@ -0,0 +1,64 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Dict
+from models import Session
+from .background import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+class SessionFilterSync(PeriodicWorker):
+    """Background worker that adds sessions created by other workers to the session id filter."""
+
+    thread_name = 'session-filter-sync'
+
+    def __init__(self, app=None, interval: float = 1.0):
+        super().__init__(interval=interval)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'runs': 0,
+            'ids_added': 0,
+            'last_run_finished': None,
+            'last_error': None
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read the sync interval from the app configuration."""
+        self.app = app
+        self.interval = app.config.get('SESSION_FILTER_SYNC_SECONDS', self.interval)
+
+    def run_once(self) -> Dict:
+        """Run one incremental scan; must be called inside an app context."""
+
+        added = 0
+        error = None
+        if Session._id_filter is not None:
+            try:
+                added = Session._id_filter.sync()
+            except Exception as e:
+                error = str(e)
+                logger.error(f"Session filter sync failed: {error}")
+
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['ids_added'] += added
+            self._stats['last_run_finished'] = datetime.utcnow()
+            self._stats['last_error'] = error
+
+        return self.get_status()
+
+    def get_status(self) -> Dict:
+        """Return a snapshot of sync progress metrics."""
+        with self._lock:
+            status = dict(self._stats)
+
+        if status['last_run_finished']:
+            status['last_run_finished'] = status['last_run_finished'].isoformat()
+
+        status['running'] = self.is_running()
+        status['interval_seconds'] = self.interval
+        return status
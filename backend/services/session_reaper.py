@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict
+from models import IdempotencyKey, Session
+from .background import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+class SessionReaper(PeriodicWorker):
+    """Background worker that deletes expired sessions and idempotency keys in bounded batches."""
+
+    thread_name = 'session-reaper'
+
+    def __init__(self, app=None, interval: int = 300, batch_size: int = 500,
+                 batch_pause: float = 0.05, max_batches: int = 100):
+        super().__init__(interval=interval)
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.max_batches = max_batches
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'runs': 0,
+            'batches': 0,
+            'sessions_deleted': 0,
+            'sets_deleted': 0,
+            'cards_deleted': 0,
+            'idempotency_keys_deleted': 0,
+            'last_run_started': None,
+            'last_run_finished': None,
+            'last_run_duration_ms': None,
+            'last_run_sessions_deleted': 0,
+            'last_error': None
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read reaper settings from the app configuration."""
+        self.app = app
+        self.interval = app.config.get('SESSION_REAPER_INTERVAL_SECONDS', self.interval)
+        self.batch_size = app.config.get('SESSION_REAPER_BATCH_SIZE', self.batch_size)
+        self.batch_pause = app.config.get('SESSION_REAPER_BATCH_PAUSE_SECONDS', self.batch_pause)
+        self.max_batches = app.config.get('SESSION_REAPER_MAX_BATCHES', self.max_batches)
+
+    def run_once(self) -> Dict:
+        """Run one reaping pass; must be called inside an app context."""
+
+        started = datetime.utcnow()
+        start_time = time.perf_counter()
+        with self._lock:
+            self._stats['last_run_started'] = started
+
+        run_sessions = 0
+        error = None
+        try:
+            for _ in range(self.max_batches):
+                deleted = Session.delete_expired_batch(batch_size=self.batch_size, now=started)
+                run_sessions += deleted['sessions']
+                self._record_batch(deleted)
+
+                if deleted['sessions'] < self.batch_size or self._stop_event.is_set():
+                    break
+
+                # Yield between batches so request traffic can get the write lock
+                time.sleep(self.batch_pause)
+
+            for _ in range(self.max_batches):
+                keys = IdempotencyKey.delete_expired_batch(batch_size=self.batch_size, now=started)
+                with self._lock:
+                    self._stats['idempotency_keys_deleted'] += keys
+
+                if keys < self.batch_size or self._stop_event.is_set():
+                    break
+                time.sleep(self.batch_pause)
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Session reaper run failed: {error}")
+
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['last_run_finished'] = datetime.utcnow()
+            self._stats['last_run_duration_ms'] = round(duration_ms, 2)
+            self._stats['last_run_sessions_deleted'] = run_sessions
+            self._stats['last_error'] = error
+
+        if run_sessions:
+            logger.info(f"Session reaper removed {run_sessions} expired sessions in {duration_ms:.0f}ms")
+
+        return self.get_status()
+
+    def _record_batch(self, deleted: Dict):
+        """Accumulate per-batch progress counters."""
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['sessions_deleted'] += deleted['sessions']
+            self._stats['sets_deleted'] += deleted['sets']
+            self._stats['cards_deleted'] += deleted['cards']
+
+    def get_status(self) -> Dict:
+        """Return a snapshot of reaper progress metrics."""
+        with self._lock:
+            status = dict(self._stats)
+
+        for key in ('last_run_started', 'last_run_finished'):
+            if status[key]:
+                status[key] = status[key].isoformat()
+
+        status['running'] = self.is_running()
+        status['interval_seconds'] = self.interval
+        status['batch_size'] = self.batch_size
+        return status
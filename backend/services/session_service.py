@@ -8,6 +8,9 @@ logger = logging.getLogger(__name__)
 class SessionService:
     """Service for managing user sessions."""
     
+    def __init__(self, token_service=None):
+        self.token_service = token_service
+    
     def create_session(self) -> Dict:
         """Create a new user session."""
         
@@ -17,9 +20,13 @@ class SessionService:
             
             logger.info(f"Created new session: {session.id}")
             
+            session_data = session.to_dict()
+            if self.token_service is not None:
+                session_data['token'] = self.token_service.issue(session)
+            
             return {
                 'success': True,
-                'session': session.to_dict(),
+                'session': session_data,
                 'message': 'Session created successfully'
             }
             
@@ -96,6 +103,8 @@ class SessionService:
                 }
             
             session.deactivate()
+            if self.token_service is not None:
+                self.token_service.revoke(session_id)
             
             logger.info(f"Deactivated session: {session_id}")
             
@@ -136,8 +145,7 @@ class SessionService:
         """Validate if session is active and not expired."""
         
         try:
-            session = Session.get_active_session(session_id)
-            return session is not None
+            return Session.is_session_active(session_id)
             
         except Exception as e:
             logger.error(f"Error validating session {session_id}: {str(e)}")
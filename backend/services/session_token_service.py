@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+from typing import Optional
+from models import Session
+from utils.session_tokens import SessionTokenSigner, is_session_token
+
+logger = logging.getLogger(__name__)
+
+class SessionTokenService:
+    """Issue signed session tokens and verify them without a database round-trip.
+
+    Deactivated sessions are tracked in an in-memory revocation list that is
+    reloaded from the database at most once per refresh interval.
+    """
+
+    def __init__(self, secret_key: str, refresh_interval: int = 30):
+        self.signer = SessionTokenSigner(secret_key)
+        self.refresh_interval = refresh_interval
+        self._revoked = frozenset()
+        self._refreshed_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def issue(self, session) -> str:
+        """Create a token for a Session row."""
+        return self.signer.sign(session.id, session.expires_at)
+
+    def revoke(self, session_id: str):
+        """Revoke a session locally right away (other workers pick it up on refresh)."""
+        with self._refresh_lock:
+            self._revoked = self._revoked | {session_id}
+
+    def is_revoked(self, session_id: str) -> bool:
+        self._refresh_if_stale()
+        return session_id in self._revoked
+
+    def _refresh_if_stale(self):
+        if time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # another thread is already refreshing; use the current list
+
+        try:
+            self._revoked = frozenset(Session.get_revoked_ids())
+            self._refreshed_at = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error refreshing session revocation list: {str(e)}")
+        finally:
+            self._refresh_lock.release()
+
+    def resolve(self, value: Optional[str]) -> Optional[str]:
+        """Map a token or plain session id to a session id.
+
+        Plain UUIDs pass through unchanged. Valid tokens prime the session
+        validation cache so the request never queries the sessions table;
+        revoked tokens return the id uncached so the database path rejects
+        it. Forged or expired tokens return None.
+        """
+        if not is_session_token(value):
+            return value
+
+        verified = self.signer.verify(value)
+        if verified is None:
+            return None
+
+        session_id, expires_at = verified
+        if self.is_revoked(session_id):
+            Session.forget_validation(session_id)
+        else:
+            Session.remember_validation(session_id, expires_at)
+        return session_id
+
+    def get_stats(self):
+        return {
+            'revoked_sessions': len(self._revoked),
+            'revocation_list_age_seconds': round(time.monotonic() - self._refreshed_at, 1)
+            if self._refreshed_at else None
+        }
@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict
+from models import StudyEvent
+from models.engine import is_sqlite_url
+from .background import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+class StudyRollup(PeriodicWorker):
+    """Background worker folding new study events into the per-card aggregates."""
+
+    thread_name = 'study-rollup'
+
+    def __init__(self, app=None, interval: float = 5, batch_size: int = 5000,
+                 max_batches: int = 20, settle_seconds: float = 0):
+        super().__init__(interval=interval)
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.settle_seconds = settle_seconds
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'runs': 0,
+            'events_rolled_up': 0,
+            'high_water_mark': None,
+            'last_run_finished': None,
+            'last_run_duration_ms': None,
+            'last_error': None
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read rollup settings from the app configuration."""
+        self.app = app
+        self.interval = app.config.get('STUDY_ROLLUP_INTERVAL_SECONDS', self.interval)
+        self.batch_size = app.config.get('STUDY_ROLLUP_BATCH_SIZE', self.batch_size)
+        self.max_batches = app.config.get('STUDY_ROLLUP_MAX_BATCHES', self.max_batches)
+        # SQLite commits event ids in order; other databases need the settle window
+        settle_seconds = app.config.get('STUDY_ROLLUP_SETTLE_SECONDS')
+        if settle_seconds is None:
+            settle_seconds = 0 if is_sqlite_url(app.config['SQLALCHEMY_DATABASE_URI']) else 60
+        self.settle_seconds = settle_seconds
+
+    def run_once(self) -> Dict:
+        """Roll up pending events; must be called inside an app context."""
+
+        start_time = time.perf_counter()
+        events = 0
+        high_water_mark = None
+        error = None
+        try:
+            for _ in range(self.max_batches):
+                result = StudyEvent.rollup_batch(batch_size=self.batch_size,
+                                                 settle_seconds=self.settle_seconds)
+                events += result['events']
+                high_water_mark = result['high_water_mark']
+                if result['events'] < self.batch_size:
+                    break
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Study rollup failed: {error}")
+
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['events_rolled_up'] += events
+            if high_water_mark is not None:
+                self._stats['high_water_mark'] = high_water_mark
+            self._stats['last_run_finished'] = datetime.utcnow()
+            self._stats['last_run_duration_ms'] = round(duration_ms, 2)
+            self._stats['last_error'] = error
+
+        return self.get_status()
+
+    def get_status(self) -> Dict:
+        """Return a snapshot of rollup progress."""
+        with self._lock:
+            status = dict(self._stats)
+
+        if status['last_run_finished']:
+            status['last_run_finished'] = status['last_run_finished'].isoformat()
+        status['running'] = self.is_running()
+        status['interval_seconds'] = self.interval
+        status['settle_seconds'] = self.settle_seconds
+        return status
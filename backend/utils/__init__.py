@@ -1,4 +1,13 @@
 from .validators import ContentValidator
 from .helpers import generate_session_id, sanitize_input, format_response
+from .cache import CacheBackend, MemoryCache, create_cache_backend
+from .json_codec import FastJSONProvider
+from .compression import ResponseCompressor
+from .rate_limit import RateLimiter, rate_limit, rate_limit_exempt
+from .metrics import RequestMetrics
+from .query_profiler import QueryProfiler, assert_max_queries, query_budget
 
-__all__ = ['ContentValidator', 'generate_session_id', 'sanitize_input', 'format_response']
\ No newline at end of file
+__all__ = ['ContentValidator', 'generate_session_id', 'sanitize_input', 'format_response',
+           'CacheBackend', 'MemoryCache', 'create_cache_backend', 'FastJSONProvider',
+           'ResponseCompressor', 'RateLimiter', 'rate_limit', 'rate_limit_exempt',
+           'RequestMetrics', 'QueryProfiler', 'assert_max_queries', 'query_budget']
\ No newline at end of file
@@ -0,0 +1,129 @@
+import codecs
+import os
+import tarfile
+import zipfile
+from typing import IO, Iterator, Optional, Tuple
+
+# Files picked out of an uploaded archive; everything else is skipped
+NOTE_EXTENSIONS = ('.txt', '.md', '.markdown')
+
+READ_CHUNK_SIZE = 64 * 1024
+
+class ArchiveError(ValueError):
+    """Raised when an upload is not a readable zip or tar archive."""
+
+class EntryTooLarge(ValueError):
+    """Raised while reading an entry that exceeds the per-file size limit."""
+
+def is_note_file(name: str) -> bool:
+    base = os.path.basename(name)
+    if not base or base.startswith('.') or '__MACOSX/' in name:
+        return False
+    return base.lower().endswith(NOTE_EXTENSIONS)
+
+class NoteArchive:
+    """Sequential reader over the note files of a zip or tar archive.
+
+    Entries are opened one at a time as decompressing streams; nothing is
+    extracted to disk and at most one read chunk is held in memory. Zip
+    needs a seekable file (uploads are spooled by Werkzeug); tar archives,
+    compressed or not, are read in a single forward pass.
+    """
+
+    def __init__(self, fileobj: IO[bytes], filename: Optional[str] = None):
+        self.fileobj = fileobj
+        self.filename = filename or ''
+
+        if zipfile.is_zipfile(fileobj):
+            fileobj.seek(0)
+            self.kind = 'zip'
+            self._zip = zipfile.ZipFile(fileobj)
+            return
+
+        fileobj.seek(0)
+        try:
+            self._tar = tarfile.open(fileobj=fileobj, mode='r|*')
+        except tarfile.TarError:
+            raise ArchiveError("Upload must be a zip or tar archive")
+        self.kind = 'tar'
+
+    def entries(self, max_entry_bytes: int) -> Iterator[Tuple[str, Optional[IO[bytes]], Optional[str]]]:
+        """Yield (name, stream, skip_reason) for each note file, in archive order.
+
+        stream is None when the entry is skipped; a stream must be fully
+        read (or abandoned) before advancing to the next entry.
+        """
+        if self.kind == 'zip':
+            for info in self._zip.infolist():
+                if info.is_dir() or not is_note_file(info.filename):
+                    continue
+                if info.file_size > max_entry_bytes:
+                    yield info.filename, None, f"File is larger than {max_entry_bytes} bytes"
+                    continue
+                with self._zip.open(info) as stream:
+                    yield info.filename, stream, None
+            return
+
+        try:
+            for member in self._tar:
+                if not member.isfile() or not is_note_file(member.name):
+                    continue
+                if member.size > max_entry_bytes:
+                    yield member.name, None, f"File is larger than {max_entry_bytes} bytes"
+                    continue
+                yield member.name, self._tar.extractfile(member), None
+        except tarfile.TarError as e:
+            raise ArchiveError(f"Corrupt tar archive: {e}")
+
+    def close(self):
+        if self.kind == 'zip':
+            self._zip.close()
+        else:
+            self._tar.close()
+
+def iter_text_chunks(stream: IO[bytes], max_bytes: int, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[str]:
+    """Decode a byte stream as UTF-8 incrementally (invalid bytes are replaced)."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    total = 0
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        total += len(data)
+        if total > max_bytes:
+            raise EntryTooLarge(f"File is larger than {max_bytes} bytes")
+        text = decoder.decode(data)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+def _split_point(text: str, max_length: int) -> int:
+    """Best place to cut text to at most max_length: paragraph, then sentence, then word."""
+    window = text[:max_length]
+    for separator in ('\n\n', '\n', '. ', ' '):
+        cut = window.rfind(separator)
+        if cut > max_length // 2:
+            return cut + len(separator)
+    return max_length
+
+def split_documents(chunks: Iterator[str], min_length: int, max_length: int) -> Iterator[Tuple[str, bool]]:
+    """Split streamed text into documents of at most max_length characters.
+
+    Yields (document, long_enough); pieces shorter than min_length (such as
+    a short tail) are reported rather than silently dropped.
+    """
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) > max_length:
+            cut = _split_point(buffer, max_length)
+            document = buffer[:cut].strip()
+            buffer = buffer[cut:]
+            if document:
+                yield document, len(document) >= min_length
+
+    document = buffer.strip()
+    if document:
+        yield document, len(document) >= min_length
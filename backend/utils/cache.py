@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from . import json_codec
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend:
+    """Base class for byte-oriented cache backends.
+
+    Subclasses implement _get/_set/_delete/_bytes_used; hit and miss
+    accounting lives here so every backend reports the same statistics.
+    """
+
+    name = 'base'
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        self._set(key, value, ttl)
+
+    def delete(self, key: str):
+        self._delete(key)
+
+    def get_json(self, key: str) -> Any:
+        value = self.get(key)
+        return json_codec.loads(value) if value is not None else None
+
+    def set_json(self, key: str, value: Any, ttl: Optional[int] = None):
+        self.set(key, json_codec.dumps(value), ttl)
+
+    def get_stats(self) -> Dict:
+        """Return hit ratio and memory usage statistics."""
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'backend': self.name,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'bytes_used': self._bytes_used()
+        }
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def _delete(self, key):
+        raise NotImplementedError
+
+    def _bytes_used(self):
+        return None
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache bounded by the total size of stored values."""
+
+    name = 'memory'
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self.evictions = 0
+
+    def _get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value, ttl):
+        entry_size = len(key) + len(value)
+        if entry_size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(key) + len(previous)
+
+            self._entries[key] = value
+            self._size += entry_size
+
+            while self._size > self.max_bytes:
+                old_key, old_value = self._entries.popitem(last=False)
+                self._size -= len(old_key) + len(old_value)
+                self.evictions += 1
+
+    def _delete(self, key):
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self._size -= len(key) + len(value)
+
+    def _bytes_used(self):
+        return self._size
+
+    def get_stats(self) -> Dict:
+        stats = super().get_stats()
+        stats.update({
+            'entries': len(self._entries),
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions
+        })
+        return stats
+
+class RedisCache(CacheBackend):
+    """Shared cache backend for multi-worker deployments (requires redis-py)."""
+
+    name = 'redis'
+
+    def __init__(self, url: str, default_ttl: int = 3600, prefix: str = 'studybuddy:'):
+        super().__init__()
+        import redis  # optional dependency
+
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def _get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def _set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=ttl or self.default_ttl)
+
+    def _delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def _bytes_used(self):
+        try:
+            return self.client.info('memory').get('used_memory')
+        except Exception:
+            return None
+
+def create_cache_backend(url: str = 'memory://', max_bytes: int = 32 * 1024 * 1024) -> CacheBackend:
+    """Create a cache backend from a storage URL (memory:// or redis://)."""
+
+    if url and url.startswith(('redis://', 'rediss://')):
+        try:
+            return RedisCache(url)
+        except ImportError:
+            logger.warning("redis package not installed, falling back to in-memory cache")
+
+    return MemoryCache(max_bytes=max_bytes)
+
+class TTLCache:
+    """Small thread-safe LRU mapping whose entries expire after a fixed TTL."""
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            hits, misses, entries = self.hits, self.misses, len(self._entries)
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl
+        }
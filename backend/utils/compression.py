@@ -0,0 +1,137 @@
+import zlib
+from typing import Iterable, Iterator, Optional
+from flask import request
+
+try:
+    import brotli  # optional dependency
+except ImportError:
+    brotli = None
+
+# Text types worth compressing; everything else (gzip exports, images) passes through
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/tab-separated-values',
+    'text/plain', 'text/html', 'text/event-stream'
+)
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        # Sync flush: everything so far is decodable, the stream stays open
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+def compress_stream(chunks: Iterable, encoder) -> Iterator[bytes]:
+    """Compress a streamed body chunk by chunk, flushing after each one so the
+    client receives every chunk (export block, progress event) without delay."""
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = encoder.compress(chunk) + encoder.flush()
+            if data:
+                yield data
+        yield encoder.finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+class ResponseCompressor:
+    """Compress responses with brotli or gzip, negotiated from Accept-Encoding.
+
+    Buffered bodies below COMPRESSION_MIN_SIZE are sent as-is; streamed
+    bodies are compressed incrementally. Compressed variants get a weak
+    ETag, as their bytes differ from the identity representation.
+    """
+
+    def __init__(self, app=None):
+        self.min_size = 500
+        self.gzip_level = 6
+        self.brotli_quality = 4
+        self.mimetypes = COMPRESSIBLE_MIMETYPES
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read compression settings from the app configuration and register the hook."""
+        self.min_size = app.config.get('COMPRESSION_MIN_SIZE', self.min_size)
+        self.gzip_level = app.config.get('COMPRESSION_GZIP_LEVEL', self.gzip_level)
+        self.brotli_quality = app.config.get('COMPRESSION_BROTLI_QUALITY', self.brotli_quality)
+        if app.config.get('COMPRESSION_ENABLED', True):
+            app.after_request(self.after_request)
+
+    def choose_encoding(self, accept_encodings) -> Optional[str]:
+        """Best supported coding the client accepts (brotli first), or None."""
+        if brotli is not None and accept_encodings['br'] > 0:
+            return 'br'
+        if accept_encodings['gzip'] > 0:
+            return 'gzip'
+        return None
+
+    def make_encoder(self, encoding: str):
+        if encoding == 'br':
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+    def after_request(self, response):
+        if response.mimetype not in self.mimetypes:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        if ('Content-Encoding' in response.headers
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        encoding = self.choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.status_code == 304:
+            # Revalidating the compressed variant: echo its (weak) validator
+            self._weaken_etag(response)
+            return response
+        if response.status_code < 200 or response.status_code in (204, 206) or request.method == 'HEAD':
+            return response
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, self.make_encoder(encoding))
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            encoder = self.make_encoder(encoding)
+            response.set_data(encoder.compress(body) + encoder.finish())
+
+        response.headers['Content-Encoding'] = encoding
+        self._weaken_etag(response)
+        return response
+
+    @staticmethod
+    def _weaken_etag(response):
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
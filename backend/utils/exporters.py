@@ -0,0 +1,78 @@
+import csv
+import html
+import io
+import json
+import re
+import zlib
+from typing import Callable, Dict, Iterable, Iterator
+
+# Rows are (set_id, set_title, card_id, question, answer, difficulty_level, card_order)
+EXPORT_COLUMNS = ['set_id', 'set_title', 'card_id', 'question', 'answer', 'difficulty', 'card_order']
+
+# Target size of each streamed chunk; small enough that the first bytes go out at once
+CHUNK_SIZE = 64 * 1024
+
+def _buffered(lines: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Join small text pieces into chunks of about chunk_size bytes."""
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+def ndjson_lines(rows: Iterable[tuple]) -> Iterator[str]:
+    """One JSON object per card."""
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n'
+
+def csv_lines(rows: Iterable[tuple]) -> Iterator[str]:
+    """RFC 4180 CSV with a header row, one line per card."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone, for an empty export
+    yield buffer.getvalue()
+
+def _anki_field(value: str) -> str:
+    return html.escape(value or '', quote=False).replace('\t', ' ').replace('\r\n', '<br>').replace('\n', '<br>')
+
+def _anki_tag(title: str) -> str:
+    return re.sub(r'\s+', '_', (title or 'flashcards').strip()) or 'flashcards'
+
+def anki_lines(rows: Iterable[tuple]) -> Iterator[str]:
+    """Anki plain-text import: front, back and a tag naming the set, tab-separated."""
+    yield '#separator:tab\n#html:true\n#tags column:3\n'
+    for set_id, set_title, card_id, question, answer, difficulty, card_order in rows:
+        yield f"{_anki_field(question)}\t{_anki_field(answer)}\t{_anki_tag(set_title)}\n"
+
+EXPORT_FORMATS: Dict[str, Dict] = {
+    'ndjson': {'lines': ndjson_lines, 'mimetype': 'application/x-ndjson', 'extension': 'ndjson'},
+    'csv': {'lines': csv_lines, 'mimetype': 'text/csv', 'extension': 'csv'},
+    'anki': {'lines': anki_lines, 'mimetype': 'text/tab-separated-values', 'extension': 'txt'},
+}
+
+def export_chunks(rows: Iterable[tuple], export_format: str) -> Iterator[bytes]:
+    """Encode a row stream in the given format as a stream of byte chunks."""
+    lines: Callable = EXPORT_FORMATS[export_format]['lines']
+    return _buffered(lines(rows))
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a stream of byte chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,8 +1,15 @@
 import uuid
 import re
-from typing import Dict, Any
+import base64
+import hashlib
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
-from flask import jsonify
+from flask import Response, jsonify
+
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+SCRIPT_PATTERN = re.compile(r'<script.*?</script>', re.DOTALL | re.IGNORECASE)
+UNSAFE_CHARS_PATTERN = re.compile(r'[<>"\']')
+WHITESPACE_PATTERN = re.compile(r'\s+')
 
 def generate_session_id() -> str:
     """Generate a unique session ID."""
@@ -14,24 +21,24 @@ def sanitize_input(text: str) -> str:
         return ''
     
     # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
+    text = HTML_TAG_PATTERN.sub('', text)
     
     # Remove script tags content
-    text = re.sub(r'<script.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
+    text = SCRIPT_PATTERN.sub('', text)
     
     # Remove potentially dangerous characters
-    text = re.sub(r'[<>"\']', '', text)
+    text = UNSAFE_CHARS_PATTERN.sub('', text)
     
     # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = WHITESPACE_PATTERN.sub(' ', text).strip()
     
     return text
 
 def format_response(success: bool, data: Any = None, error: str = None, message: str = None) -> Dict:
-    """Format consistent API responses."""
+    """Format consistent API responses (datetimes are left to the JSON encoder)."""
     response = {
         'success': success,
-        'timestamp': datetime.utcnow().isoformat()
+        'timestamp': datetime.utcnow()
     }
     
     if success:
@@ -54,6 +61,41 @@ def create_json_response(success: bool, data: Any = None, error: str = None,
     
     return jsonify(response_data), status_code
 
+def make_etag(*parts) -> str:
+    """Opaque strong ETag (unquoted) for the representation identified by parts."""
+    key = '\x1f'.join(str(part) for part in parts)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]
+
+def set_cache_validators(response, etag: str, max_age: int = 0):
+    """Attach an ETag and private caching headers to a per-session response.
+    
+    With max_age 0 the browser may store the response but must revalidate
+    it (If-None-Match) before each use.
+    """
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'private, max-age={max_age}' if max_age else 'private, no-cache'
+    response.vary.add('X-Session-ID')
+    return response
+
+def not_modified_response(etag: str, max_age: int = 0):
+    """Empty 304 for a matched If-None-Match (compared weakly, as RFC 9110 requires)."""
+    return set_cache_validators(Response(status=304), etag, max_age)
+
+def encode_cursor(created_at: datetime, record_id: str) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor string."""
+    raw = f"{created_at.isoformat()}|{record_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, str]]:
+    """Decode a cursor produced by encode_cursor. Returns None if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        created_at, record_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), record_id
+    except (ValueError, UnicodeError):
+        return None
+
 def extract_keywords(text: str, max_keywords: int = 10) -> list:
     """Extract keywords from text for search/tagging purposes."""
     # Simple keyword extraction (can be enhanced with NLP libraries)
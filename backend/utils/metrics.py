@@ -0,0 +1,256 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+from flask import request
+
+# Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DB_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class MetricsRegistry:
+    """Collection of metrics rendered together by the /metrics endpoint.
+
+    Metrics live in this process only; with several workers each one
+    reports its own numbers.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+                    lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 registry: Optional[MetricsRegistry] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _labels(self, values) -> Tuple[Tuple[str, str], ...]:
+        return tuple(zip(self.labelnames, values))
+
+    def samples(self) -> Iterator[Tuple[str, Tuple, float]]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield self.name, self._labels(labels), value
+
+class Counter(_Metric):
+    """Monotonic count per label set; labels are passed as a tuple of values."""
+
+    type = 'counter'
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(_Metric):
+    """Point-in-time value per label set, usually refreshed just before rendering."""
+
+    type = 'gauge'
+
+    def set(self, value: float, labels: Tuple = ()):
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram: observing a value is a bisect and two additions."""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS, registry: Optional[MetricsRegistry] = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, labels: Tuple = ()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            cell = self._values.get(labels)
+            if cell is None:
+                # One count per bucket, one for +Inf, then the running sum
+                cell = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            cell[index] += 1
+            cell[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = [(labels, list(cell)) for labels, cell in self._values.items()]
+        for labels, cell in values:
+            label_pairs = self._labels(labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), cell):
+                cumulative += count
+                yield f"{self.name}_bucket", label_pairs + (('le', _format_value(bound)),), cumulative
+            yield f"{self.name}_sum", label_pairs, cell[-1]
+            yield f"{self.name}_count", label_pairs, cumulative
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency by route.', ('route',))
+REQUESTS = Counter('http_requests_total', 'Requests by route, method and status.', ('route', 'method', 'status'))
+REQUEST_DB_QUERIES = Histogram('http_request_db_queries', 'Database queries per request by route.',
+                               ('route',), buckets=QUERY_COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram('http_request_db_seconds', 'Database time per request by route.',
+                            ('route',), buckets=DB_LATENCY_BUCKETS)
+DB_QUERY_LATENCY = Histogram('db_query_duration_seconds', 'Latency of individual database queries.',
+                             buckets=DB_LATENCY_BUCKETS)
+INFERENCE_LATENCY = Histogram('ai_inference_duration_seconds',
+                              'Inference latency by model and outcome (success, failed, error, cancelled).',
+                              ('model', 'outcome'))
+GENERATIONS = Counter('flashcard_generations_total', 'Flashcard generations by method (model or fallback).',
+                      ('method',))
+CACHE_HITS = Gauge('cache_hits', 'Cache hits since start.', ('cache',))
+CACHE_MISSES = Gauge('cache_misses', 'Cache misses since start.', ('cache',))
+CACHE_HIT_RATIO = Gauge('cache_hit_ratio', 'Cache hit ratio since start.', ('cache',))
+JOBS_QUEUED = Gauge('jobs_queued', 'Background jobs waiting for a worker.', ('queue',))
+JOBS_RUNNING = Gauge('jobs_running', 'Background jobs in progress.', ('queue',))
+
+class RequestTiming:
+    """Time spent per phase of one request; the only per-request allocation."""
+
+    __slots__ = ('started', 'db', 'db_queries', 'inference', 'generation', 'serialization')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.db_queries = 0
+        self.inference = 0.0
+        self.generation = 0.0
+        self.serialization = 0.0
+
+    def server_timing(self, total: float) -> str:
+        return (f'db;dur={self.db * 1000:.2f};desc="{self.db_queries} queries", '
+                f'inference;dur={self.inference * 1000:.2f}, gen;dur={self.generation * 1000:.2f}, '
+                f'ser;dur={self.serialization * 1000:.2f}, total;dur={total * 1000:.2f}')
+
+# Set for the request being served on this thread; unset in worker pools
+_current_timing: ContextVar[Optional[RequestTiming]] = ContextVar('request_timing', default=None)
+
+def record_time(phase: str, seconds: float):
+    """Add seconds to a phase (inference, generation, serialization) of the current request."""
+    timing = _current_timing.get()
+    if timing is not None:
+        setattr(timing, phase, getattr(timing, phase) + seconds)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    DB_QUERY_LATENCY.observe(elapsed)
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.db += elapsed
+        timing.db_queries += 1
+
+_database_instrumented = False
+
+def instrument_database():
+    """Time every SQL statement on every engine (installed once per process)."""
+    global _database_instrumented
+    if _database_instrumented:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _database_instrumented = True
+
+def update_cache_gauges(name: str, stats: Dict):
+    """Copy a cache's get_stats() counters into the cache gauges."""
+    CACHE_HITS.set(stats.get('hits', 0), (name,))
+    CACHE_MISSES.set(stats.get('misses', 0), (name,))
+    CACHE_HIT_RATIO.set(stats.get('hit_ratio', 0.0), (name,))
+
+class RequestMetrics:
+    """Record per-route latency, status counts and per-request database use.
+
+    Each response gets a Server-Timing header breaking the request down
+    into db, inference, gen (generation) and ser (serialization) time.
+    Latency of streamed responses is measured to the first byte.
+    """
+
+    def __init__(self, app=None):
+        self.server_timing = True
+        self._status_labels = {}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read metrics settings from the app configuration and register the hooks."""
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        self.server_timing = app.config.get('SERVER_TIMING_ENABLED', True)
+        instrument_database()
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def before_request(self):
+        _current_timing.set(RequestTiming())
+
+    def after_request(self, response):
+        timing = _current_timing.get()
+        if timing is None:
+            return response
+
+        total = time.perf_counter() - timing.started
+        route = (request.endpoint or 'unmatched',)
+        REQUEST_LATENCY.observe(total, route)
+        REQUESTS.inc((route[0], request.method, self._status_label(response.status_code)))
+        REQUEST_DB_QUERIES.observe(timing.db_queries, route)
+        REQUEST_DB_TIME.observe(timing.db, route)
+
+        if self.server_timing:
+            response.headers['Server-Timing'] = timing.server_timing(total)
+        return response
+
+    def teardown_request(self, exc):
+        # Worker threads are reused; never leave a finished request's record behind
+        _current_timing.set(None)
+
+    def _status_label(self, status_code: int) -> str:
+        label = self._status_labels.get(status_code)
+        if label is None:
+            label = self._status_labels[status_code] = str(status_code)
+        return label
@@ -0,0 +1,189 @@
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, List, Optional
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Literals and IN-lists vary between otherwise identical statements
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%s|:\w+|__\[POSTCOMPILE_\w+\])(?:\s*,\s*(?:\?|%s|:\w+))*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more queries than its declared @query_budget."""
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """Normalise a SQL statement so repeats of the same query compare equal."""
+    shape = STRING_LITERAL.sub('?', statement)
+    shape = NUMBER_LITERAL.sub('?', shape)
+    shape = PLACEHOLDER_LIST.sub('(...)', shape)
+    return WHITESPACE.sub(' ', shape).strip()
+
+def query_budget(max_queries: int):
+    """Declare the most queries a view may run; checked when the query profiler is enabled."""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+def _format_params(parameters, limit: int = 200) -> str:
+    text = repr(parameters)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+class RequestQueryLog:
+    """Queries run while serving one request, grouped by statement shape."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Dict[str, List] = {}
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.duration += elapsed
+        entry = self.shapes.get(statement)
+        if entry is None:
+            self.shapes[statement] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def repeated(self, threshold: int) -> List[tuple]:
+        """(shape, count, seconds) for shapes run at least threshold times, most frequent first."""
+        grouped = {}
+        for statement, (count, elapsed) in self.shapes.items():
+            entry = grouped.setdefault(statement_shape(statement), [0, 0.0])
+            entry[0] += count
+            entry[1] += elapsed
+        return sorted(((shape, count, elapsed) for shape, (count, elapsed) in grouped.items()
+                       if count >= threshold), key=lambda item: -item[1])
+
+_current_log: ContextVar[Optional[RequestQueryLog]] = ContextVar('request_query_log', default=None)
+
+@contextmanager
+def uncounted_queries():
+    """Leave queries run inside the block (request bookkeeping, not the view) out of its budget."""
+    token = _current_log.set(None)
+    try:
+        yield
+    finally:
+        _current_log.reset(token)
+
+class QueryProfiler:
+    """Opt-in SQL profiling per request (QUERY_PROFILER_ENABLED).
+
+    Counts and times every statement run on the app's engine, logs slow
+    statements with their parameters, and warns when one statement
+    shape repeats within a request (a likely N+1). Views may declare a
+    @query_budget; with QUERY_BUDGET_ENFORCE (tests) exceeding it raises
+    QueryBudgetExceeded, otherwise it is logged.
+    """
+
+    def __init__(self, app=None):
+        self.slow_threshold = 0.1
+        self.n_plus_one_threshold = 5
+        self.enforce_budgets = False
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read profiler settings and attach to the app's engine; call after init_db."""
+        if not app.config.get('QUERY_PROFILER_ENABLED', False):
+            return
+        self.slow_threshold = app.config.get('QUERY_SLOW_MS', 100) / 1000
+        self.n_plus_one_threshold = app.config.get('QUERY_N_PLUS_ONE_THRESHOLD', self.n_plus_one_threshold)
+        self.enforce_budgets = app.config.get('QUERY_BUDGET_ENFORCE', False)
+
+        with app.app_context():
+            engine = app.extensions['sqlalchemy'].engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profiler_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_profiler_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+
+        query_log = _current_log.get()
+        if query_log is not None:
+            query_log.record(statement, elapsed)
+        if elapsed >= self.slow_threshold:
+            logger.warning(f"Slow query ({elapsed * 1000:.1f} ms): {WHITESPACE.sub(' ', statement)} "
+                           f"params={_format_params(parameters)}")
+
+    def before_request(self):
+        _current_log.set(RequestQueryLog())
+
+    def after_request(self, response):
+        query_log = _current_log.get()
+        if query_log is None:
+            return response
+        label = f"{request.method} {request.path}"
+
+        for shape, count, elapsed in query_log.repeated(self.n_plus_one_threshold):
+            logger.warning(f"Possible N+1 in {label}: {count} queries ({elapsed * 1000:.1f} ms) of {shape}")
+
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        if budget is not None and query_log.count > budget:
+            message = f"{label} ran {query_log.count} queries, budget is {budget}"
+            if self.enforce_budgets:
+                raise QueryBudgetExceeded(message + ''.join(
+                    f"\n  {count} x {shape}" for shape, count, _ in query_log.repeated(1)
+                ))
+            logger.warning(message)
+
+        logger.debug(f"{label}: {query_log.count} queries in {query_log.duration * 1000:.1f} ms")
+        return response
+
+    def teardown_request(self, exc):
+        _current_log.set(None)
+
+@contextmanager
+def assert_max_queries(max_queries: int, engine=None):
+    """Fail with AssertionError if the block runs more than max_queries statements.
+
+        with assert_max_queries(4):
+            client.get(f'/api/flashcards/{set_id}', headers=headers)
+
+    Counts statements on the given engine, or on every engine.
+    """
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    target = engine if engine is not None else Engine
+    event.listen(target, 'after_cursor_execute', count)
+    try:
+        yield statements
+    finally:
+        event.remove(target, 'after_cursor_execute', count)
+
+    if len(statements) > max_queries:
+        shapes = {}
+        for statement in statements:
+            shape = statement_shape(statement)
+            shapes[shape] = shapes.get(shape, 0) + 1
+        details = ''.join(f"\n  {count} x {shape}" for shape, count in
+                          sorted(shapes.items(), key=lambda item: -item[1]))
+        raise AssertionError(f"{len(statements)} queries ran, budget is {max_queries}{details}")
@@ -0,0 +1,357 @@
+import logging
+import math
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from flask import current_app, g, request
+from werkzeug.exceptions import TooManyRequests
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+LIMIT_PATTERN = re.compile(r'^\s*(\d+)\s*(?:/|per)\s*(\d+)?\s*(second|minute|hour|day)s?\s*$', re.IGNORECASE)
+
+class RateLimit(NamedTuple):
+    amount: int
+    window: int  # seconds
+
+    def __str__(self):
+        return f"{self.amount};w={self.window}"
+
+def parse_limits(value: str) -> Tuple[RateLimit, ...]:
+    """Parse '10/minute; 100 per day' (also '30/5 minutes') into RateLimit tuples."""
+    limits = []
+    for part in filter(None, (part.strip() for part in (value or '').split(';'))):
+        match = LIMIT_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"Invalid rate limit: {part!r}")
+        amount, multiple, unit = match.groups()
+        limits.append(RateLimit(int(amount), int(multiple or 1) * WINDOW_SECONDS[unit.lower()]))
+    return tuple(limits)
+
+def rate_limit(config_key: str, per: Iterable[str] = ('session', 'ip')):
+    """Apply the limits named by config_key to a view, counted per session and/or client IP.
+
+    The view's own limits are checked in addition to RATELIMIT_DEFAULT.
+    """
+    def decorator(view):
+        view.rate_limits = getattr(view, 'rate_limits', ()) + ((config_key, tuple(per)),)
+        return view
+    return decorator
+
+def rate_limit_exempt(view):
+    """Opt a view out of rate limiting, including the default limit."""
+    view.rate_limit_exempt = True
+    return view
+
+class RateLimitBackend:
+    """Base class for rate limit counters.
+
+    Limits use a sliding window counter: hits in the current fixed window
+    plus the previous window's hits weighted by how much of it still
+    overlaps the sliding window. Subclasses count hits in fixed windows;
+    acquire() checks every limit and takes nothing if any is exceeded.
+    """
+
+    name = 'base'
+
+    def acquire(self, hits: List[Tuple[str, RateLimit]], now: float) -> List[Tuple[RateLimit, bool, int, int]]:
+        """Count one request against each (key, limit); returns (limit, allowed, remaining, reset) per hit."""
+        counts = self._incr(hits, now)
+
+        results = []
+        for (key, limit), (current, previous) in zip(hits, counts):
+            elapsed = now % limit.window
+            used = current + previous * (1 - elapsed / limit.window)
+            remaining = max(0, math.floor(limit.amount - used))
+            results.append((limit, used <= limit.amount, remaining, math.ceil(limit.window - elapsed)))
+
+        if not all(allowed for _, allowed, _, _ in results):
+            # Rejected requests do not use up quota, so a client retrying steadily still gets through
+            self._decr(hits, now)
+        return results
+
+    @staticmethod
+    def window_index(limit: RateLimit, now: float) -> int:
+        return int(now // limit.window)
+
+    def _incr(self, hits, now) -> List[Tuple[int, int]]:
+        """Add a hit to each key's current window; returns (current, previous) window counts."""
+        raise NotImplementedError
+
+    def _decr(self, hits, now):
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict:
+        return {'backend': self.name}
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Per-process counters that never take a lock.
+
+    Each window's count is the length of a bytearray: dict.setdefault,
+    bytearray.append and pop are single C calls, so concurrent requests
+    cannot lose updates. Windows older than the previous one are dropped
+    by an occasional sweep that swaps in a pruned dict; a hit racing the
+    swap may go uncounted, which errs on the side of allowing it.
+    """
+
+    name = 'memory'
+
+    def __init__(self, sweep_interval: float = 60):
+        self.sweep_interval = sweep_interval
+        self._windows = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def _incr(self, hits, now):
+        self._maybe_sweep()
+        windows = self._windows
+        counts = []
+        for key, limit in hits:
+            index = self.window_index(limit, now)
+            current = windows.setdefault((key, limit.window, index), bytearray())
+            current.append(1)
+            previous = windows.get((key, limit.window, index - 1))
+            counts.append((len(current), len(previous) if previous is not None else 0))
+        return counts
+
+    def _decr(self, hits, now):
+        windows = self._windows
+        for key, limit in hits:
+            current = windows.get((key, limit.window, self.window_index(limit, now)))
+            if current:
+                try:
+                    current.pop()
+                except IndexError:
+                    pass
+
+    def _maybe_sweep(self):
+        if time.monotonic() < self._next_sweep:
+            return
+        self._next_sweep = time.monotonic() + self.sweep_interval
+        now = time.time()
+        self._windows = {
+            (key, window, index): counter
+            for (key, window, index), counter in self._windows.copy().items()
+            if index >= now // window - 1
+        }
+
+    def get_stats(self) -> Dict:
+        return {'backend': self.name, 'windows': len(self._windows)}
+
+class SharedRateLimitBackend(RateLimitBackend):
+    """Counters kept in a store shared by every worker (Redis, or LocalCounterStore in tests).
+
+    One store round trip per request covers all of its limits. If the
+    store is unreachable requests are allowed rather than rejected.
+    """
+
+    name = 'shared'
+
+    def __init__(self, store, prefix: str = 'studybuddy:ratelimit:'):
+        self.store = store
+        self.prefix = prefix
+
+    def _keys(self, key, limit, now):
+        index = self.window_index(limit, now)
+        base = f"{self.prefix}{key}:{limit.window}:"
+        return base + str(index), base + str(index - 1)
+
+    def _incr(self, hits, now):
+        # Counters live for two windows: the current one and its use as 'previous'
+        return self.store.incr_many([
+            (*self._keys(key, limit, now), limit.window * 2) for key, limit in hits
+        ])
+
+    def _decr(self, hits, now):
+        self.store.decr_many([self._keys(key, limit, now)[0] for key, limit in hits])
+
+    def get_stats(self) -> Dict:
+        return {'backend': self.name, 'store': self.store.name}
+
+class RedisCounterStore:
+    """Window counters in Redis, pipelined into one round trip (requires redis-py)."""
+
+    name = 'redis'
+
+    def __init__(self, url: str):
+        import redis  # optional dependency
+
+        self.client = redis.Redis.from_url(url)
+
+    def incr_many(self, items):
+        pipe = self.client.pipeline(transaction=False)
+        for current, previous, ttl in items:
+            pipe.incr(current)
+            pipe.expire(current, ttl)
+            pipe.get(previous)
+        values = pipe.execute()
+        return [(int(values[i]), int(values[i + 2] or 0)) for i in range(0, len(values), 3)]
+
+    def decr_many(self, keys):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.decr(key)
+        pipe.execute()
+
+class LocalCounterStore:
+    """In-process stand-in for RedisCounterStore with the same semantics, for tests."""
+
+    name = 'local'
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, now):
+        entry = self._counters.get(key)
+        if entry is None or entry[1] <= now:
+            return 0
+        return entry[0]
+
+    def incr_many(self, items):
+        now = self.clock()
+        with self._lock:
+            counts = []
+            for current, previous, ttl in items:
+                value = self._get(current, now) + 1
+                self._counters[current] = (value, now + ttl)
+                counts.append((value, self._get(previous, now)))
+            return counts
+
+    def decr_many(self, keys):
+        with self._lock:
+            for key in keys:
+                if key in self._counters:
+                    value, expires = self._counters[key]
+                    self._counters[key] = (value - 1, expires)
+
+def create_rate_limit_backend(url: str = 'memory://') -> RateLimitBackend:
+    """Create a rate limit backend from a storage URL (memory://, redis:// or local://)."""
+
+    if url and url.startswith(('redis://', 'rediss://')):
+        try:
+            return SharedRateLimitBackend(RedisCounterStore(url))
+        except ImportError:
+            logger.warning("redis package not installed, falling back to per-process rate limits")
+    elif url and url.startswith('local://'):
+        return SharedRateLimitBackend(LocalCounterStore())
+
+    return MemoryRateLimitBackend()
+
+class RateLimiter:
+    """Enforce request rate limits per client IP and per session.
+
+    RATELIMIT_DEFAULT applies per IP to every view except those marked
+    @rate_limit_exempt or in an exempt blueprint; views add their own
+    limits with @rate_limit. Responses carry RateLimit-Limit,
+    RateLimit-Remaining and RateLimit-Reset for the tightest limit, and
+    rejected requests get a 429 with Retry-After.
+    """
+
+    def __init__(self, app=None, backend: Optional[RateLimitBackend] = None,
+                 session_key_func: Optional[Callable[[], Optional[str]]] = None):
+        self.backend = backend
+        self.session_key_func = session_key_func or (lambda: request.headers.get('X-Session-ID'))
+        self.headers_enabled = True
+        self.exempt_blueprints = set()
+        self._parsed = {}
+        self._plans = {}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create the backend from RATELIMIT_STORAGE_URL and register the request hooks."""
+        if self.backend is None:
+            self.backend = create_rate_limit_backend(app.config.get('RATELIMIT_STORAGE_URL', 'memory://'))
+        self.headers_enabled = app.config.get('RATELIMIT_HEADERS_ENABLED', True)
+        # Fail at start-up, not on the first request, if a configured limit is malformed
+        for key, value in app.config.items():
+            if key.startswith('RATELIMIT_') and isinstance(value, str) and key != 'RATELIMIT_STORAGE_URL':
+                self.limits(value)
+        if app.config.get('RATELIMIT_ENABLED', True):
+            app.before_request(self.before_request)
+            app.after_request(self.after_request)
+
+    def exempt(self, blueprint):
+        """Exempt every view of a blueprint (e.g. health checks) from rate limiting."""
+        self.exempt_blueprints.add(blueprint.name)
+
+    def limits(self, value: str) -> Tuple[RateLimit, ...]:
+        parsed = self._parsed.get(value)
+        if parsed is None:
+            parsed = self._parsed[value] = parse_limits(value)
+        return parsed
+
+    def _plan(self, view):
+        """Per-endpoint (default limits, [(counter prefix, scope, limits)]), resolved once from config."""
+        plan = self._plans.get(request.endpoint)
+        if plan is None:
+            config = current_app.config
+            plan = self._plans[request.endpoint] = (
+                self.limits(config.get('RATELIMIT_DEFAULT', '')),
+                [(f"{request.endpoint}:{scope}:", scope, self.limits(config.get(config_key, '')))
+                 for config_key, per in getattr(view, 'rate_limits', ()) for scope in per]
+            )
+        return plan
+
+    def hits_for_request(self, view) -> List[Tuple[str, RateLimit]]:
+        """The (counter key, limit) pairs the current request counts against."""
+        default_limits, route_limits = self._plan(view)
+        ip = request.remote_addr or 'unknown'
+        hits = [("default:ip:" + ip, limit) for limit in default_limits]
+
+        session_id = None
+        for prefix, scope, limits in route_limits:
+            if scope == 'session':
+                session_id = session_id or self.session_key_func()
+                # Without a session the IP limit is what applies
+                if not session_id:
+                    continue
+                key = prefix + session_id
+            else:
+                key = prefix + ip
+            hits.extend((key, limit) for limit in limits)
+        return hits
+
+    def before_request(self):
+        if request.method == 'OPTIONS' or request.blueprint in self.exempt_blueprints:
+            return None
+        view = current_app.view_functions.get(request.endpoint)
+        if view is None or getattr(view, 'rate_limit_exempt', False):
+            return None
+
+        hits = self.hits_for_request(view)
+        if not hits:
+            return None
+        try:
+            results = self.backend.acquire(hits, time.time())
+        except Exception as e:
+            logger.error(f"Rate limit backend error, allowing request: {str(e)}")
+            return None
+
+        # Report the limit closest to running out (or the one that was exceeded)
+        limit, allowed, remaining, reset = min(results, key=lambda result: (result[1], result[2]))
+        g.rate_limit = (limit, remaining, reset)
+        if not allowed:
+            raise TooManyRequests(retry_after=reset)
+        return None
+
+    def after_request(self, response):
+        state = g.pop('rate_limit', None)
+        if state is None or not self.headers_enabled:
+            return response
+
+        limit, remaining, reset = state
+        response.headers['RateLimit-Limit'] = str(limit.amount)
+        response.headers['RateLimit-Remaining'] = str(remaining)
+        response.headers['RateLimit-Reset'] = str(reset)
+        response.headers['RateLimit-Policy'] = str(limit)
+        if response.status_code == 429:
+            response.headers['Retry-After'] = str(reset)
+        return response
+
+    def get_stats(self) -> Dict:
+        return self.backend.get_stats()
@@ -0,0 +1,49 @@
+import base64
+import hashlib
+import hmac
+import re
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+
+# <session uuid>.<expiry as unix seconds>.<urlsafe base64 HMAC-SHA256>
+TOKEN_PATTERN = re.compile(
+    r'^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})\.(\d{1,12})\.([A-Za-z0-9_-]{43})$',
+    re.IGNORECASE
+)
+
+def is_session_token(value: str) -> bool:
+    """Check if a value has the signed session token shape (signature not checked)."""
+    return isinstance(value, str) and TOKEN_PATTERN.match(value) is not None
+
+class SessionTokenSigner:
+    """Issue and verify stateless session tokens signed with the app secret."""
+
+    def __init__(self, secret_key: str):
+        self._key = hashlib.sha256(f"session-token:{secret_key}".encode('utf-8')).digest()
+
+    def _signature(self, payload: str) -> str:
+        digest = hmac.new(self._key, payload.encode('utf-8'), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode('ascii').rstrip('=')
+
+    def sign(self, session_id: str, expires_at: datetime) -> str:
+        """Create a token for a session id that is valid until expires_at (naive UTC)."""
+        expires = int((expires_at - datetime(1970, 1, 1)).total_seconds())
+        payload = f"{session_id}.{expires}"
+        return f"{payload}.{self._signature(payload)}"
+
+    def verify(self, token: str) -> Optional[Tuple[str, datetime]]:
+        """Return (session_id, expires_at) for a valid, unexpired token, otherwise None."""
+        match = TOKEN_PATTERN.match(token or '')
+        if not match:
+            return None
+
+        session_id, expires, signature = match.groups()
+        expected = self._signature(f"{session_id}.{expires}")
+        if not hmac.compare_digest(signature, expected):
+            return None
+
+        if int(expires) < time.time():
+            return None
+
+        return session_id, datetime.utcfromtimestamp(int(expires))
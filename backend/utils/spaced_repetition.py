@@ -0,0 +1,40 @@
+import math
+from typing import Optional, Tuple
+
+# SM-2 parameters
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+PASSING_QUALITY = 3
+FIRST_INTERVAL_DAYS = 1
+SECOND_INTERVAL_DAYS = 6
+MAX_INTERVAL_DAYS = 3650
+
+def answer_quality(correct: bool, quality: Optional[int] = None) -> int:
+    """Get the SM-2 recall quality (0-5) for an answer.
+
+    Clients that only report right/wrong get 4 ("correct after hesitation")
+    or 1 ("incorrect, but remembered on seeing the answer").
+    """
+    if quality is not None:
+        return max(0, min(5, int(quality)))
+    return 4 if correct else 1
+
+def ease_delta(quality: int) -> float:
+    """Change to a card's ease factor after an answer of the given quality."""
+    miss = 5 - quality
+    return 0.1 - miss * (0.08 + miss * 0.02)
+
+def next_schedule(ease: float, interval_days: int, repetitions: int, quality: int) -> Tuple[float, int, int]:
+    """SM-2 step: a card's (ease, interval_days, repetitions) after one answer."""
+    if quality < PASSING_QUALITY:
+        interval, repetitions = FIRST_INTERVAL_DAYS, 0
+    else:
+        if repetitions == 0:
+            interval = FIRST_INTERVAL_DAYS
+        elif repetitions == 1:
+            interval = SECOND_INTERVAL_DAYS
+        else:
+            # Half-up, like SQL ROUND, rather than Python's round-half-even
+            interval = min(int(math.floor(interval_days * ease + 0.5)), MAX_INTERVAL_DAYS)
+        repetitions += 1
+    return round(max(ease + ease_delta(quality), MIN_EASE), 2), interval, repetitions
@@ -1,12 +1,16 @@
 import re
-from typing import Dict, Union
+from typing import Dict, Union, Iterable, Optional
+from .session_tokens import is_session_token
+
+UUID_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
 
 class ContentValidator:
     """Validator for user input content."""
     
-    def __init__(self, min_length: int = 50, max_length: int = 2000):
+    def __init__(self, min_length: int = 50, max_length: int = 2000, token_signer=None):
         self.min_length = min_length
         self.max_length = max_length
+        self.token_signer = token_signer
 
     def validate_content(self, content: str) -> Dict[str, Union[bool, str]]:
         """Validate study notes content."""
@@ -75,19 +79,24 @@ class ContentValidator:
                 'error': 'Session ID is required'
             }
         
-        # UUID format validation
-        uuid_pattern = re.compile(
-            r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$',
-            re.IGNORECASE
-        )
+        # Signed token format: verified against the secret, no database access
+        if is_session_token(session_id):
+            verified = self.token_signer.verify(session_id) if self.token_signer else None
+            if verified is None:
+                return {
+                    'valid': False,
+                    'error': 'Invalid or expired session token'
+                }
+            return {'valid': True, 'session_id': verified[0]}
         
-        if not uuid_pattern.match(session_id):
+        # UUID format validation
+        if not UUID_PATTERN.match(session_id):
             return {
                 'valid': False,
                 'error': 'Invalid session ID format'
             }
         
-        return {'valid': True}
+        return {'valid': True, 'session_id': session_id}
     
     def validate_title(self, title: str) -> Dict[str, Union[bool, str]]:
         """Validate flashcard set title."""
@@ -120,6 +129,85 @@ class ContentValidator:
             'cleaned_title': title
         }
     
+    def validate_limit(self, limit: Optional[str], default: int = 20, maximum: int = 100) -> Dict[str, Union[bool, str, int]]:
+        """Validate a page size query parameter."""
+        
+        if limit is None or limit == '':
+            return {'valid': True, 'limit': default}
+        
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            return {
+                'valid': False,
+                'error': 'Limit must be a number'
+            }
+        
+        if limit < 1 or limit > maximum:
+            return {
+                'valid': False,
+                'error': f'Limit must be between 1 and {maximum}'
+            }
+        
+        return {'valid': True, 'limit': limit}
+    
+    def validate_offset(self, offset: Optional[str]) -> Dict[str, Union[bool, str, int]]:
+        """Validate a result offset query parameter."""
+        
+        if offset is None or offset == '':
+            return {'valid': True, 'offset': 0}
+        
+        try:
+            offset = int(offset)
+        except (TypeError, ValueError):
+            return {
+                'valid': False,
+                'error': 'Offset must be a number'
+            }
+        
+        if offset < 0:
+            return {
+                'valid': False,
+                'error': 'Offset cannot be negative'
+            }
+        
+        return {'valid': True, 'offset': offset}
+    
+    def validate_search_query(self, query: Optional[str], max_length: int = 200) -> Dict[str, Union[bool, str]]:
+        """Validate a full-text search query."""
+        
+        query = (query or '').strip()
+        if not re.search(r'\w', query):
+            return {
+                'valid': False,
+                'error': 'Search query must contain at least one word'
+            }
+        
+        if len(query) > max_length:
+            return {
+                'valid': False,
+                'error': f'Search query cannot exceed {max_length} characters'
+            }
+        
+        return {'valid': True, 'query': query}
+    
+    def validate_fields(self, fields: Optional[str], allowed: Iterable[str]) -> Dict[str, Union[bool, str, list]]:
+        """Validate a comma-separated fields= projection parameter."""
+        
+        if not fields:
+            return {'valid': True, 'fields': None}
+        
+        allowed = set(allowed)
+        requested = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = [field for field in requested if field not in allowed]
+        if unknown:
+            return {
+                'valid': False,
+                'error': f'Unknown fields: {", ".join(unknown)}'
+            }
+        
+        return {'valid': True, 'fields': requested}
+    
     def sanitize_input(self, text: str) -> str:
         """Sanitize user input to prevent XSS and other issues."""
         